@@ -0,0 +1,201 @@
+# ai_batcher.py
+"""
+Micro-batching of AI-bound questions into single upstream calls.
+
+- submit() parks a question for up to window_secs (or until max_items are waiting),
+  then the whole group goes to the AI pool as ONE call with a numbered multi-question
+  prompt: one pool thread and one upstream round trip instead of one per question
+- build_batch_prompt() / parse_numbered_answers() define the "[n] ..." format; an
+  answer that can't be matched to its number comes back as None, and that question
+  falls back to an individual call (the rest of the batch is still used)
+- A lone question in its window skips the batch prompt and is sent as a normal call
+- Admission still goes through AIDispatcher: a rejected batch resolves every waiting
+  caller with None (the "not admitted" result of ask_gemini_async)
+- abandon() gives up the shared upstream call only once every caller waiting on it has
+"""
+
+import asyncio
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from ai_dispatch import AIDispatcher
+
+Item = Tuple[str, str, str]  # (cache key, message, grounding)
+
+# "[n]" at the start of a line, optionally bolded ("**[n]**") and followed by ":" / "." / ")"
+_ANSWER_MARK = re.compile(r"^[ \t]*(?:\*\*|__)?\[(\d+)\](?:\*\*|__)?[:.)]?[ \t]*", re.MULTILINE)
+
+
+def build_batch_prompt(questions: Sequence[Tuple[str, str]]) -> str:
+    """questions: (message, grounding) pairs. Grounding goes on one indented line per question."""
+    n = len(questions)
+    lines = [
+        f"Answer each of the {n} questions below separately. Reply with exactly {n} answers in the "
+        f"same order, each starting on a new line with its number in square brackets ([1] ... [{n}]). "
+        "Do not repeat the questions.",
+        "",
+    ]
+    for i, (message, grounding) in enumerate(questions, 1):
+        lines.append(f"[{i}] {' '.join(message.split())}")
+        if grounding:
+            lines.append("    FAQ entries that may help: " + " | ".join(grounding.splitlines()))
+    return "\n".join(lines)
+
+
+def parse_numbered_answers(text: str, n: int) -> List[Optional[str]]:
+    """Split "[1] ... [2] ..." into n answers; missing, empty or repeated numbers give None."""
+    answers: List[Optional[str]] = [None] * n
+    seen: Set[int] = set()
+    marks = list(_ANSWER_MARK.finditer(text or ""))
+    for j, m in enumerate(marks):
+        i = int(m.group(1)) - 1
+        end = marks[j + 1].start() if j + 1 < len(marks) else len(text)
+        body = text[m.end():end].strip()
+        if not 0 <= i < n:
+            continue
+        if i in seen:
+            answers[i] = None  # ambiguous: let the individual call answer it
+            continue
+        seen.add(i)
+        answers[i] = body or None
+    return answers
+
+
+class _Upstream:
+    """One dispatched call (batch or individual) and the callers still waiting on it."""
+    __slots__ = ("future", "waiting")
+
+    def __init__(self, future: asyncio.Future, waiting: Set[asyncio.Future]):
+        self.future = future
+        self.waiting = waiting
+
+
+class MicroBatcher:
+    def __init__(self, dispatcher: AIDispatcher, batch_fn: Callable[..., List[Optional[str]]],
+                 single_fn: Callable[..., Any], window_secs: float = 0.05, max_items: int = 8):
+        """
+        batch_fn(items, timeout=...) -> one answer (or None) per item, run in the AI pool.
+        single_fn(key, message, grounding, timeout=...) -> answer, for lone and unparsed items.
+        """
+        self.dispatcher = dispatcher
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.window_secs = window_secs
+        self.max_items = max_items
+        self._pending: List[Tuple[Item, float, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._upstream: Dict[asyncio.Future, _Upstream] = {}
+        self._open: Set[asyncio.Future] = set()  # submitted and not yet answered
+        self.stats = {"submitted": 0, "batches": 0, "batched_items": 0, "singles": 0,
+                      "parse_fallbacks": 0, "rejected": 0}
+
+    def submit(self, key: str, message: str, grounding: str, deadline: float) -> asyncio.Future:
+        """Event loop only. The future resolves to the answer, or None if the pool rejected the call."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self.stats["submitted"] += 1
+        self._open.add(fut)
+        fut.add_done_callback(self._open.discard)
+        self._pending.append(((key, message, grounding), deadline, fut))
+        if len(self._pending) >= self.max_items:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_secs, self.flush)
+        return fut
+
+    def owns(self, fut: asyncio.Future) -> bool:
+        return fut in self._open
+
+    def abandon(self, fut: asyncio.Future):
+        """A caller stopped waiting; abandon the upstream call once nobody waits on it."""
+        up = self._upstream.get(fut)
+        if up is None:
+            return
+        up.waiting.discard(fut)
+        if not up.waiting:
+            self.dispatcher.abandon(up.future)
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending = [p for p in self._pending if not p[2].done()]
+        self._pending = []
+        if len(pending) == 1:
+            item, deadline, fut = pending[0]
+            self._single(item, deadline, fut)
+        elif pending:
+            self._batch(pending)
+
+    def _track(self, upstream: asyncio.Future, futs: List[asyncio.Future]) -> _Upstream:
+        up = _Upstream(upstream, set(futs))
+        for f in futs:
+            self._upstream[f] = up
+            f.add_done_callback(lambda f: self._upstream.pop(f, None))
+        return up
+
+    def _single(self, item: Item, deadline: float, fut: asyncio.Future):
+        self.stats["singles"] += 1
+        upstream = self.dispatcher.submit(self.single_fn, *item, deadline=deadline)
+        if upstream is None:
+            self.stats["rejected"] += 1
+            logging.warning("AI pool saturated; rejecting message: %.50s", item[1])
+            _resolve(fut, None)
+            return
+        self._track(upstream, [fut])
+        upstream.add_done_callback(lambda u: _copy(u, fut))
+
+    def _batch(self, pending: List[Tuple[Item, float, asyncio.Future]]):
+        items = [p[0] for p in pending]
+        futs = [p[2] for p in pending]
+        # the shared call has to finish before its most urgent caller gives up
+        upstream = self.dispatcher.submit(self.batch_fn, items, deadline=min(p[1] for p in pending))
+        if upstream is None:
+            self.stats["rejected"] += 1
+            logging.warning("AI pool saturated; rejecting a batch of %d messages", len(futs))
+            for f in futs:
+                _resolve(f, None)
+            return
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(items)
+        up = self._track(upstream, futs)
+
+        def done(u: asyncio.Future):
+            if u.cancelled() or u.exception() is not None:
+                for f in futs:
+                    _copy(u, f)
+                return
+            for (item, deadline, f), answer in zip(pending, u.result()):
+                if f.done():
+                    continue
+                if answer is not None:
+                    f.set_result(answer)
+                elif f not in up.waiting:
+                    f.set_result(None)  # its caller already gave up: don't retry on its behalf
+                else:
+                    self.stats["parse_fallbacks"] += 1
+                    self._upstream.pop(f, None)
+                    self._single(item, deadline, f)
+
+        upstream.add_done_callback(done)
+
+    def snapshot_stats(self) -> dict:
+        avg = self.stats["batched_items"] / self.stats["batches"] if self.stats["batches"] else 0.0
+        return dict(self.stats, pending=len(self._pending), avg_batch_size=round(avg, 2))
+
+
+def _resolve(fut: asyncio.Future, value):
+    if not fut.done():
+        fut.set_result(value)
+
+
+def _copy(src: asyncio.Future, dst: asyncio.Future):
+    if dst.done():
+        return
+    if src.cancelled():
+        dst.cancel()
+    elif src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
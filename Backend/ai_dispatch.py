@@ -0,0 +1,133 @@
+# ai_dispatch.py
+"""
+Admission-controlled dispatch of blocking AI calls to a dedicated thread pool.
+
+- Admission is deadline-based: submit() estimates how long the call would wait for a
+  thread (calls ahead of it / threads serving them x the running average call time)
+  and rejects immediately when that wait plus one call wouldn't fit before the
+  caller's deadline, so callers can serve a fallback instead of queueing into a timeout
+- max_queue is only a hard ceiling on calls waiting for a thread (memory/backlog bound);
+  until a few calls have been timed, admission falls back to that ceiling alone
+- Every call carries an absolute deadline; calls that waited in the queue past it
+  are dropped before reaching the upstream, and the remaining time is passed on
+  (capped by call_timeout(), e.g. an adaptive upstream timeout: the deadline bounds
+  queueing plus the call, the cap bounds the upstream call alone)
+- Calls whose callers already timed out ("abandoned") still occupy a thread;
+  extra headroom threads absorb them, and beyond that they take threads from live calls
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Set
+
+SERVICE_EWMA_ALPHA = 0.2   # weight of the newest call in the running average call time
+MIN_SERVICE_SAMPLES = 5    # timed calls needed before admission trusts the estimate
+
+
+class DeadlineExceeded(Exception):
+    """The call sat in the queue until its deadline passed; the upstream was never contacted."""
+
+
+class AIDispatcher:
+    def __init__(self, workers: int, max_queue: int, abandon_headroom: int = 0,
+                 call_timeout: Optional[Callable[[], float]] = None):
+        self.workers = workers
+        self.call_timeout = call_timeout
+        self.max_queue = max_queue
+        self.abandon_headroom = abandon_headroom
+        self.executor = ThreadPoolExecutor(max_workers=workers + abandon_headroom, thread_name_prefix="ai")
+        self.in_flight = 0                        # submitted and not finished (abandoned included)
+        self.abandoned: Set[asyncio.Future] = set()
+        self.service_secs = 0.0                   # running average time a call holds a thread
+        self.service_samples = 0
+        self._lock = threading.Lock()             # service time is updated from pool threads
+        self.stats = {"admitted": 0, "rejected": 0, "rejected_full": 0, "rejected_deadline": 0,
+                      "expired": 0, "abandoned": 0}
+
+    @property
+    def live(self) -> int:
+        return self.in_flight - len(self.abandoned)
+
+    def serving_threads(self) -> int:
+        # live calls get `workers` threads; abandoned ones first use the headroom threads
+        overflow = max(0, len(self.abandoned) - self.abandon_headroom)
+        return max(1, self.workers - overflow)
+
+    def queued(self) -> int:
+        """Live calls waiting for a thread."""
+        return max(0, self.live - self.serving_threads())
+
+    def expected_wait(self) -> float:
+        """Seconds a call submitted now would wait for a thread (0 until calls have been timed)."""
+        if self.service_samples < MIN_SERVICE_SAMPLES:
+            return 0.0
+        threads = self.serving_threads()
+        ahead = self.live - threads + 1  # calls that must finish before a thread frees up for this one
+        return max(0, ahead) * self.service_secs / threads
+
+    def admits(self, deadline: float) -> Optional[str]:
+        """None if a call due at `deadline` is admitted, else the reason it isn't ("full" / "deadline")."""
+        if self.queued() >= self.max_queue:
+            return "full"
+        if self.service_samples >= MIN_SERVICE_SAMPLES:
+            if self.expected_wait() + self.service_secs > deadline - time.monotonic():
+                return "deadline"
+        return None
+
+    def submit(self, fn: Callable[..., Any], *args, deadline: float) -> Optional[asyncio.Future]:
+        """
+        Schedule fn(*args, timeout=<seconds left, at most call_timeout()>) on the pool.
+        Must be called on the event loop.
+        Returns None (without queueing anything) when the call can't finish by its deadline.
+        """
+        reason = self.admits(deadline)
+        if reason is not None:
+            self.stats["rejected"] += 1
+            self.stats["rejected_" + reason] += 1
+            return None
+        self.stats["admitted"] += 1
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self.executor, self._run, fn, args, deadline)
+        fut.add_done_callback(self._done)
+        return fut
+
+    def abandon(self, fut: asyncio.Future):
+        """Caller gave up waiting; the thread keeps running until the upstream call returns."""
+        if not fut.done() and fut not in self.abandoned:
+            self.abandoned.add(fut)
+            self.stats["abandoned"] += 1
+
+    def _run(self, fn, args, deadline):
+        started = time.monotonic()
+        remaining = deadline - started
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        if self.call_timeout is not None:
+            remaining = min(remaining, self.call_timeout())
+        try:
+            return fn(*args, timeout=remaining)
+        finally:
+            self._observe(time.monotonic() - started)
+
+    def _observe(self, secs: float):
+        with self._lock:
+            self.service_samples += 1
+            if self.service_samples == 1:
+                self.service_secs = secs
+            else:
+                self.service_secs += SERVICE_EWMA_ALPHA * (secs - self.service_secs)
+
+    def _done(self, fut: asyncio.Future):
+        self.in_flight -= 1
+        self.abandoned.discard(fut)
+        if not fut.cancelled() and isinstance(fut.exception(), DeadlineExceeded):
+            self.stats["expired"] += 1
+
+    def snapshot_stats(self) -> dict:
+        return dict(self.stats, in_flight=self.in_flight, live=self.live, queued=self.queued(),
+                    abandoned_now=len(self.abandoned), max_queue=self.max_queue,
+                    threads=self.workers + self.abandon_headroom,
+                    service_ms=round(self.service_secs * 1000, 1), expected_wait_ms=round(self.expected_wait() * 1000, 1))
@@ -0,0 +1,122 @@
+# answer_cache.py
+"""
+Two-tier cache for AI answers, shared across restarts and uvicorn workers.
+
+- In-memory LRU tier (per process) in front of an optional persistent store
+- MongoAnswerStore keeps answers in a collection with a TTL index on expires_at
+- Keys are normalized questions, so trivially different phrasings share an entry
+- Negative results (errors, fallbacks) are kept only for a short TTL
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+DEFAULT_TTL_SECS = 24 * 3600
+NEGATIVE_TTL_SECS = 60
+
+
+class MongoAnswerStore:
+    """Persistent tier: {_id: key, answer, negative, expires_at} documents."""
+
+    def __init__(self, coll):
+        self.coll = coll
+        try:
+            # Mongo's TTL monitor deletes expired docs (roughly once a minute); reads also check expires_at
+            coll.create_index("expires_at", expireAfterSeconds=0)
+        except Exception as e:
+            logging.warning("Could not ensure TTL index on AI cache: %s", e)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        doc = self.coll.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                                 {"answer": 1, "expires_at": 1})
+        if not doc:
+            return None
+        ttl_left = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        return doc.get("answer", ""), ttl_left
+
+    def put(self, key: str, answer: str, ttl: float, negative: bool):
+        now = datetime.utcnow()
+        self.coll.update_one(
+            {"_id": key},
+            {"$set": {"answer": answer, "negative": negative, "updated_at": now,
+                      "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True,
+        )
+
+
+class AnswerCache:
+    def __init__(self, normalize: Callable[[str], str], maxsize: int = 512, store=None,
+                 ttl: float = DEFAULT_TTL_SECS, negative_ttl: float = NEGATIVE_TTL_SECS):
+        self.normalize = normalize
+        self.maxsize = maxsize
+        self.store = store
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (answer, expires monotonic)
+        self._lock = threading.Lock()  # used from the event loop and executor threads
+        self.stats = {"memory_hits": 0, "store_hits": 0, "misses": 0, "writes": 0, "negative_writes": 0, "store_errors": 0}
+
+    def key(self, message: str) -> str:
+        return self.normalize(message)
+
+    def get_local(self, key: str) -> Optional[str]:
+        """Memory tier only; cheap enough to call on the event loop."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            answer, expires = entry
+            if expires <= time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return answer
+
+    def get(self, key: str) -> Optional[str]:
+        """Blocking: memory tier, then the persistent store. Run in the executor."""
+        answer = self.get_local(key)
+        if answer is not None:
+            return answer
+        if self.store is not None:
+            try:
+                hit = self.store.get(key)
+            except Exception as e:
+                self.stats["store_errors"] += 1
+                logging.warning("AI cache store read failed: %s", e)
+                hit = None
+            if hit is not None:
+                answer, ttl_left = hit
+                self.stats["store_hits"] += 1
+                self._remember(key, answer, ttl_left)
+                return answer
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, answer: str, negative: bool = False):
+        """Blocking: write through both tiers. Negative answers get the short TTL."""
+        ttl = self.negative_ttl if negative else self.ttl
+        self.stats["negative_writes" if negative else "writes"] += 1
+        self._remember(key, answer, ttl)
+        if self.store is not None:
+            try:
+                self.store.put(key, answer, ttl, negative)
+            except Exception as e:
+                self.stats["store_errors"] += 1
+                logging.warning("AI cache store write failed: %s", e)
+
+    def _remember(self, key: str, answer: str, ttl: float):
+        with self._lock:
+            self._memory[key] = (answer, time.monotonic() + ttl)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def snapshot_stats(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["store_hits"]
+        lookups = hits + self.stats["misses"]
+        return dict(self.stats, size=len(self._memory), hit_ratio=round(hits / lookups, 4) if lookups else 0.0)
@@ -0,0 +1,114 @@
+# bench_ai_batch.py
+"""
+Throughput/latency of AI-bound /chat traffic with and without micro-batching (ai_batcher.py).
+
+- Same in-process setup as bench_load.py: in-memory collections, synthetic FAQ corpus,
+  fake_gemini.FakeGemini behind main.gemini
+- Every question is novel and college-related, so each one needs Gemini: this isolates
+  the AI tier (cache, coalescing and FAQ hits would hide the difference)
+- Runs once unbatched, then once per --windows value with batching on; the breaker,
+  latency tracker and AI cache are reset between runs
+- The fake charges --ai-item-secs per extra question in a batch (longer output), and
+  garbles the numbering of --ai-garble-rate of batch replies to exercise the fallback
+- Each --concurrency level is run in every mode: one below the AI pool's admission limit
+  (latency) and one above it (unbatched, most callers get the "busy" fallback)
+- Reports req/s and p50/p95/p99 per outcome (bench_load.report; busy/timeout/error are
+  the canned AI messages), AI answers per second, upstream calls, average batch size and
+  how many answers fell back to individual calls
+Needs the dev requirements (httpx): pip install -r requirements-dev.txt
+Run: python bench_ai_batch.py [--requests 400] [--concurrency 12,48] [--windows 0.02,0.05] [--max-items 8]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+
+import bench_load  # sets up the environment before importing main
+import main
+from ai_batcher import MicroBatcher
+from bench_faq_match import make_corpus
+from circuit_breaker import CircuitBreaker, LatencyTracker
+from fake_gemini import FakeGemini
+
+
+def reset_ai_tier(window_secs, max_items):
+    main.answer_cache._memory.clear()
+    main.ai_breaker = CircuitBreaker(main.AI_BREAKER_FAILURES, main.AI_BREAKER_RESET_SECS)
+    main.ai_latency = LatencyTracker()
+    main.AI_BATCH = window_secs is not None
+    main.ai_batcher = MicroBatcher(main.ai_dispatcher, main.batched_ai_response, main.cached_ai_response,
+                                   window_secs=window_secs or 0.0, max_items=max_items)
+
+
+async def bench(args):
+    logging.getLogger().setLevel(args.log_level)
+    rng = random.Random(args.seed)
+    main.faqs_coll.insert_many(make_corpus(args.faqs, rng))
+    main.load_faqs_into_cache()
+    fake = FakeGemini(args.ai_median, args.ai_sigma, args.ai_error_rate, seed=args.seed,
+                      batch_item_secs=args.ai_item_secs, batch_format_error_rate=args.ai_garble_rate)
+    main.gemini.use_backend(fake.model_class())
+    await main.start_background_tasks()
+
+    modes = [None] + [float(w) for w in args.windows.split(",") if w]
+    print(f"requests={args.requests} AI pool: {main.AI_POOL_WORKERS} workers, deadline admission (at most {main.AI_QUEUE_SIZE} queued); "
+          f"fake gemini: median={args.ai_median}s sigma={args.ai_sigma} +{args.ai_item_secs}s/extra question error_rate={args.ai_error_rate} "
+          f"garble_rate={args.ai_garble_rate} max_items={args.max_items}")
+    transport = bench_load.httpx.ASGITransport(app=main.app)
+    async with bench_load.httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        runs = [(int(c), w) for c in args.concurrency.split(",") if c for w in modes]
+        for run, (concurrency, window) in enumerate(runs):
+            reset_ai_tier(window, args.max_items)
+            calls_before = fake.calls
+            # no department names: those would be answered by the HOD rule instead
+            questions = [f"tell me about the {rng.choice(bench_load.AI_TOPICS)} at our college, case {run}-{i}"
+                         for i in range(args.requests)]
+
+            def chat(q):
+                async def job():
+                    r = await client.post("/chat", json={"user_message": q})
+                    body = r.json()
+                    if body["response"] == main.AI_BUSY_MSG:
+                        return "busy"
+                    if body["response"] == main.AI_TIMEOUT_MSG:
+                        return "timeout"
+                    if body["response"] == main.AI_ERROR_MSG:
+                        return "error"
+                    return body["source"]
+                return job
+
+            mode = "unbatched" if window is None else f"batched window={window * 1000:.0f}ms"
+            name, wall, results = await bench_load.run_scenario(
+                client, f"concurrency={concurrency} {mode}", [chat(q) for q in questions], concurrency)
+            bench_load.report(name, wall, results)
+            answered = sum(1 for source, _ in results if source == "ai")
+            line = f"  AI answers/s: {answered / wall:.1f}, upstream calls: {fake.calls - calls_before}"
+            if window is not None:
+                s = main.ai_batcher.snapshot_stats()
+                line += (f", batches: {s['batches']} (avg {s['avg_batch_size']} questions), singles: {s['singles']}, "
+                         f"parse fallbacks: {s['parse_fallbacks']}, rejected: {s['rejected']}")
+            print(line)
+    await main.stop_background_tasks()
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("--requests", type=int, default=400, help="/chat requests per run")
+    p.add_argument("--concurrency", default="12,48", help="comma-separated client concurrency levels")
+    p.add_argument("--faqs", type=int, default=1000)
+    p.add_argument("--windows", default="0.02,0.05", help="batch windows (s) to compare against unbatched")
+    p.add_argument("--max-items", type=int, default=main.AI_BATCH_MAX_ITEMS)
+    p.add_argument("--ai-median", type=float, default=0.8, help="fake Gemini median latency (s)")
+    p.add_argument("--ai-sigma", type=float, default=0.3, help="log-normal sigma of the latency")
+    p.add_argument("--ai-item-secs", type=float, default=0.1, help="extra latency per additional batched question")
+    p.add_argument("--ai-error-rate", type=float, default=0.0)
+    p.add_argument("--ai-garble-rate", type=float, default=0.05, help="share of batch replies without numbering")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--log-level", default="CRITICAL")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(parse_args(sys.argv[1:])))
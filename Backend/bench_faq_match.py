@@ -0,0 +1,152 @@
+# bench_faq_match.py
+"""
+Benchmark FAQ matching latency: inverted-index candidates vs. the old linear scan.
+
+- Generates a synthetic FAQ corpus at several sizes (default 100, 10k, 100k)
+- Runs a fixed mix of queries (near-duplicates, typos, off-topic chatter)
+- Prints p50 / p99 latency per corpus size for each strategy
+  ("batch" is the per-query cost of best_matches over the whole mix, as /chat/batch runs it)
+- Candidate pruning makes the index approximate: "agree" is the share of queries where
+  it returns the same result as the linear scan (same FAQ, or an equally scored one;
+  both below the threshold counts as agreeing), "worse" the ones where it settles for
+  a lower-scoring FAQ and "missed" the ones it leaves unanswered although the scan
+  finds a match
+Run: python bench_faq_match.py [sizes...]
+"""
+
+import random
+import sys
+import time
+
+from rapidfuzz import fuzz
+
+from faq_index import FaqIndex, PREFIX_BOOST
+from faq_store import FaqStore
+from normalize import normalize_text
+
+SIZES = [100, 10_000, 100_000]
+QUERIES_PER_SIZE = 200
+SEED = 42
+THRESHOLD = 70  # main.FAQ_MATCH_THRESHOLD
+
+SUBJECTS = [
+    "admission", "fee", "hostel", "library", "placement", "scholarship", "exam", "canteen",
+    "transport", "bus", "cse", "ece", "ise", "mba", "mechanical", "civil", "aeronautical",
+    "physics", "chemistry", "mathematics", "lab", "sports", "nss", "ncc", "internship",
+    "timetable", "attendance", "result", "revaluation", "convocation", "alumni", "wifi",
+]
+TEMPLATES = [
+    "what is the {a} process for {b} {n}",
+    "how do i apply for {a} in {b} {n}",
+    "where is the {a} office for {b} {n}",
+    "when does {a} start for {b} students {n}",
+    "who handles {a} queries for {b} {n}",
+    "is there any {a} facility for {b} {n}",
+]
+OFF_TOPIC = ["what is the weather today", "tell me a joke", "who won the match yesterday", "hello there"]
+
+
+def make_corpus(n, rng):
+    docs = []
+    for i in range(n):
+        a, b = rng.sample(SUBJECTS, 2)
+        q = rng.choice(TEMPLATES).format(a=a, b=b, n=f"batch {i}")
+        docs.append({"question": q, "answer": f"Answer #{i}"})
+    return docs
+
+
+def make_queries(docs, rng):
+    queries = []
+    for _ in range(QUERIES_PER_SIZE):
+        r = rng.random()
+        if r < 0.6:
+            queries.append(rng.choice(docs)["question"])
+        elif r < 0.85:
+            q = rng.choice(docs)["question"]
+            queries.append(q.replace(rng.choice("ae"), "", 1))  # light typo
+        else:
+            queries.append(rng.choice(OFF_TOPIC))
+    return queries
+
+
+def linear_best_match(q_norms, user_q):
+    # the pre-index algorithm from main.get_best_faq_match
+    best_pos, best_score = None, -1
+    for pos, q_text in enumerate(q_norms):
+        if abs(len(q_text) - len(user_q)) > 100:
+            continue
+        score = fuzz.token_sort_ratio(user_q, q_text)
+        if q_text.startswith(user_q):
+            score += PREFIX_BOOST
+        if score > best_score:
+            best_score, best_pos = score, pos
+    return best_pos, best_score
+
+
+def agreement(index, queries):
+    """(agree, worse, missed, largest score loss) of index.best_match against the linear scan."""
+    agree = worse = missed = 0
+    loss = 0.0
+    for q in queries:
+        user_q = normalize_text(q)
+        pos, score = index.best_match(user_q, score_cutoff=THRESHOLD)
+        lin_pos, lin_score = linear_best_match(index.q_norms, user_q)
+        if lin_score < THRESHOLD:
+            lin_pos = None
+        if pos == lin_pos or (pos is not None and lin_pos is not None and score >= lin_score):
+            agree += 1
+        elif pos is None:
+            missed += 1
+            loss = max(loss, lin_score)
+        else:
+            worse += 1
+            loss = max(loss, lin_score - score)
+    return agree, worse, missed, loss
+
+
+def percentile(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+def time_queries(fn, queries):
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(normalize_text(q))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main(sizes):
+    rng = random.Random(SEED)
+    print(f"{'faqs':>8} {'strategy':>8} {'p50 ms':>9} {'p99 ms':>9} {'build s':>8} {'agree':>7} {'worse':>6} "
+          f"{'missed':>6} {'max loss':>8}")
+    for n in sizes:
+        docs = make_corpus(n, rng)
+        queries = make_queries(docs, rng)
+        t0 = time.perf_counter()
+        index = FaqIndex(FaqStore.from_docs(docs, normalize_text))
+        build = time.perf_counter() - t0
+        # linear scan is slow at 100k; sample fewer queries there
+        lin_queries = queries if n <= 10_000 else queries[:20]
+        for name, fn, qs in (
+            ("index", lambda q: index.best_match(q, score_cutoff=THRESHOLD), queries),
+            ("linear", lambda q: linear_best_match(index.q_norms, q), lin_queries),
+        ):
+            samples = time_queries(fn, qs)
+            line = (f"{n:>8} {name:>8} {percentile(samples, 50):>9.3f} {percentile(samples, 99):>9.3f} "
+                    f"{build if name == 'index' else 0:>8.2f}")
+            if name == "index":
+                agree, worse, missed, loss = agreement(index, lin_queries)
+                line += f" {100 * agree / len(lin_queries):>6.1f}% {worse:>6} {missed:>6} {loss:>8.2f}"
+            print(line)
+        normalized = [normalize_text(q) for q in queries]
+        t0 = time.perf_counter()
+        index.best_matches(normalized, score_cutoff=THRESHOLD)
+        per_query = (time.perf_counter() - t0) * 1000 / len(normalized)
+        print(f"{n:>8} {'batch':>8} {per_query:>9.3f} {per_query:>9.3f} {0:>8.2f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or SIZES)
@@ -0,0 +1,92 @@
+# bench_faq_memory.py
+"""
+Benchmark memory held by the FAQ cache: the old dict layout vs. the columnar FaqStore.
+
+- Old layout: the raw Mongo docs as the baseline fetched them (projection
+  {"question": 1, "answer": 1}, so _id, question, answer) kept in faqs_cache, plus one
+  {"orig", "q_norm", "answer"} dict per FAQ in faqs_cache_normalized
+- New layout: FaqStore columns only (the raw docs, fetched with the current FAQ_FIELDS
+  projection, are dropped after the build)
+- Answers repeat across FAQs like real data does; every doc gets its own string
+  objects, as pymongo decoding would produce
+- The token index (postings) is the same for both layouts and isn't counted
+Run: python bench_faq_memory.py [count]
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from bench_faq_match import SEED, make_corpus
+from faq_store import FaqStore
+from normalize import normalize_text
+
+COUNT = 100_000
+DISTINCT_ANSWERS = 2_000
+
+
+def _fresh(s: str) -> str:
+    return (s + " ")[:-1]  # equal value, new object
+
+
+def make_docs(n, rng, fields):
+    answers = [f"Please contact the office in block {i % 40}, or see the college website for details ({i})."
+               for i in range(DISTINCT_ANSWERS)]
+    now = datetime(2026, 1, 1)
+    docs = []
+    for i, d in enumerate(make_corpus(n, rng)):
+        doc = {
+            "_id": ObjectId(),
+            "question": _fresh(d["question"]),
+            "answer": _fresh(rng.choice(answers)),
+            "updated_at": now + timedelta(seconds=i),
+        }
+        docs.append({k: v for k, v in doc.items() if k in fields})
+    return docs
+
+
+OLD_FIELDS = ("_id", "question", "answer")                  # the baseline's projection
+NEW_FIELDS = ("_id", "question", "answer", "updated_at")    # what FaqStore.from_docs reads here
+
+
+def old_layout(docs):
+    normalized = [{"orig": d, "q_norm": normalize_text(d.get("question", "")), "answer": d.get("answer", "")}
+                  for d in docs]
+    return docs, normalized
+
+
+def new_layout(docs):
+    return FaqStore.from_docs(docs, normalize_text)
+
+
+def measure(build, n, fields):
+    """Bytes still allocated (docs included) once build() returns and its input is dropped."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    docs = make_docs(n, random.Random(SEED), fields)
+    kept = build(docs)
+    del docs
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main(n):
+    old = measure(old_layout, n, OLD_FIELDS)
+    new = measure(new_layout, n, NEW_FIELDS)
+    print(f"faqs: {n}  distinct answers: {DISTINCT_ANSWERS}")
+    print(f"{'layout':>10} {'MiB':>8} {'bytes/faq':>10}")
+    for name, used in (("dicts", old), ("FaqStore", new)):
+        print(f"{name:>10} {used / 2**20:>8.1f} {used / n:>10.0f}")
+    print(f"saved: {100 * (1 - new / old):.0f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else COUNT)
@@ -0,0 +1,198 @@
+# bench_load.py
+"""
+Reproducible load test of the FastAPI app, in-process, with no Mongo or Gemini needed.
+
+- Boots main.app on the in-memory collections (MONGO_URL is blanked) with a synthetic
+  FAQ corpus, and swaps main.gemini's backend for fake_gemini.FakeGemini (latency/error
+  distributions, plus a one-off connection setup cost that the startup warm-up absorbs)
+- Drives /chat, /chat/batch, /chat/stream and /faqs (half of the /faqs polls revalidate
+  with If-None-Match) at a fixed concurrency through httpx's ASGI transport
+- The question mix covers every pipeline exit: FAQ hits and typos, HOD rules, repeated
+  and novel college questions (AI path) and off-topic chatter (fallback)
+- Reports throughput and p50/p95/p99 latency per endpoint and response `source`
+Needs the dev requirements (httpx): pip install -r requirements-dev.txt
+Run: python bench_load.py [--requests 2000] [--concurrency 32] [--ai-median 0.8] ...
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+# must happen before main is imported: in-memory collections, no snapshot, and a dummy key
+os.environ["MONGO_URL"] = ""
+os.environ["FAQ_SNAPSHOT_PATH"] = ""
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+try:
+    import httpx  # noqa: E402
+except ImportError:
+    sys.exit("bench_load.py needs httpx: pip install -r requirements-dev.txt")
+
+import main  # noqa: E402
+from bench_faq_match import OFF_TOPIC, SUBJECTS, make_corpus  # noqa: E402
+from fake_gemini import FakeGemini  # noqa: E402
+
+RULE_QUESTIONS = ["who is the hod of cse", "hod of mechanical engineering", "email of the ece department",
+                  "who heads information science", "mba hod name"]
+AI_TOPICS = ["scholarship deadlines", "hostel curfew rules", "library late fees", "placement training schedule",
+             "canteen menu prices", "exam revaluation steps", "transport route changes"]
+
+
+def make_questions(n, docs, rng, ai_repeat_ratio):
+    """Weighted mix: 50% FAQ (some with typos), 10% rule, 25% AI-bound, 15% off-topic."""
+    out, seen_ai = [], []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.5:
+            q = rng.choice(docs)["question"]
+            out.append(q.replace("e", "", 1) if rng.random() < 0.3 else q)
+        elif r < 0.6:
+            out.append(rng.choice(RULE_QUESTIONS))
+        elif r < 0.85:
+            if seen_ai and rng.random() < ai_repeat_ratio:
+                out.append(rng.choice(seen_ai))
+            else:
+                q = f"tell me about {rng.choice(AI_TOPICS)} for {rng.choice(SUBJECTS)} college students {i}"
+                seen_ai.append(q)
+                out.append(q)
+        else:
+            out.append(rng.choice(OFF_TOPIC))
+    return out
+
+
+def percentile(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+async def run_scenario(client, name, jobs, concurrency):
+    """jobs: list of zero-arg coroutine factories returning the response source."""
+    results = []  # (source, latency secs)
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker():
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                source = await job()
+            except Exception as e:
+                source = f"client_error:{type(e).__name__}"
+            results.append((source, time.perf_counter() - t0))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return name, time.perf_counter() - started, results
+
+
+def report(name, wall, results):
+    by_source = defaultdict(list)
+    for source, secs in results:
+        by_source[source].append(secs * 1000)
+    print(f"\n{name}: {len(results)} requests in {wall:.2f}s ({len(results) / wall:.1f} req/s)")
+    print(f"  {'source':>14} {'n':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for source in sorted(by_source):
+        ms = by_source[source]
+        print(f"  {source:>14} {len(ms):>6} {len(ms) / wall:>8.1f} {percentile(ms, 50):>9.2f} "
+              f"{percentile(ms, 95):>9.2f} {percentile(ms, 99):>9.2f}")
+
+
+async def bench(args):
+    # per-request INFO lines (and tracebacks of simulated Gemini errors) would dominate the timings
+    logging.getLogger().setLevel(args.log_level)
+    rng = random.Random(args.seed)
+    docs = make_corpus(args.faqs, rng)
+    main.faqs_coll.insert_many(docs)
+    main.load_faqs_into_cache()
+    fake = FakeGemini(args.ai_median, args.ai_sigma, args.ai_error_rate, seed=args.seed, connect_secs=args.ai_connect)
+    main.gemini.use_backend(fake.model_class())
+    await main.start_background_tasks()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        questions = make_questions(args.requests, docs, rng, args.ai_repeat_ratio)
+
+        def chat(q):
+            async def job():
+                r = await client.post("/chat", json={"user_message": q})
+                return r.json()["source"]
+            return job
+
+        def stream(q):
+            async def job():
+                source = "no_done_event"
+                async with client.stream("POST", "/chat/stream", json={"user_message": q}) as r:
+                    event = None
+                    async for line in r.aiter_lines():
+                        if line.startswith("event: "):
+                            event = line[7:]
+                        elif line.startswith("data: ") and event == "done":
+                            source = json.loads(line[6:])["source"]
+                return source
+            return job
+
+        def batch(qs):
+            async def job():
+                r = await client.post("/chat/batch", json={"messages": qs})
+                r.raise_for_status()
+                return f"batch{len(qs)}"
+            return job
+
+        etag = {}
+
+        def faqs(i):
+            async def job():
+                headers = {"Accept-Encoding": "gzip"}
+                if i % 2 and etag.get("v"):
+                    headers["If-None-Match"] = etag["v"]
+                r = await client.get("/faqs", headers=headers)
+                etag["v"] = r.headers.get("etag")
+                return "faqs_304" if r.status_code == 304 else "faqs_200"
+            return job
+
+        scenarios = {
+            "chat": lambda: [chat(q) for q in questions],
+            "stream": lambda: [stream(q) for q in questions[:max(1, args.requests // 4)]],
+            "batch": lambda: [batch(questions[i:i + args.batch_size])
+                              for i in range(0, len(questions), args.batch_size)],
+            "faqs": lambda: [faqs(i) for i in range(max(1, args.requests // 4))],
+        }
+        print(f"faqs={args.faqs} concurrency={args.concurrency} fake gemini: median={args.ai_median}s "
+              f"sigma={args.ai_sigma} error_rate={args.ai_error_rate} seed={args.seed}")
+        for name in args.scenarios.split(","):
+            main.answer_cache._memory.clear()  # every scenario starts with a cold AI cache
+            report(*await run_scenario(client, name, scenarios[name](), args.concurrency))
+    print(f"\nfake Gemini calls: {fake.calls}")
+    await main.stop_background_tasks()
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("--requests", type=int, default=2000, help="/chat requests (other scenarios scale from it)")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--faqs", type=int, default=5000)
+    p.add_argument("--scenarios", default="chat,stream,batch,faqs")
+    p.add_argument("--batch-size", type=int, default=50)
+    p.add_argument("--ai-median", type=float, default=0.8, help="fake Gemini median latency (s)")
+    p.add_argument("--ai-sigma", type=float, default=0.5, help="log-normal sigma of the latency")
+    p.add_argument("--ai-error-rate", type=float, default=0.02)
+    p.add_argument("--ai-connect", type=float, default=0.3, help="fake Gemini connection setup (s), paid once")
+    p.add_argument("--ai-repeat-ratio", type=float, default=0.5, help="share of AI questions asked before")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--log-level", default="CRITICAL")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(parse_args(sys.argv[1:])))
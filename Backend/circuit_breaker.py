@@ -0,0 +1,126 @@
+# circuit_breaker.py
+"""
+Circuit breaker and latency tracking for the Gemini path.
+
+- CircuitBreaker opens after N consecutive upstream failures/timeouts, rejects
+  calls while open, then lets a single probe through (half-open) after a cool-down;
+  an admitted call that never reaches the upstream must release() its probe
+- LatencyTracker keeps a rolling window of upstream latencies (for p95-based
+  adaptive timeouts) plus cumulative histogram buckets for the stats endpoint
+Both are updated from worker threads, so they guard their state with a lock.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+LATENCY_BUCKETS = [0.25, 0.5, 1.0, 2.0, 4.0, 8.0]  # seconds; a final +Inf bucket is implicit
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.stats = {"successes": 0, "failures": 0, "short_circuited": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a new upstream call be made right now?"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_after:
+                self.state = HALF_OPEN
+                self.probe_started = None
+            if self.state == HALF_OPEN:
+                # one probe at a time; a probe that never reported back is considered lost after reset_after
+                if self.probe_started is None or now - self.probe_started >= self.reset_after:
+                    self.probe_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self.stats["short_circuited"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self.probe_started = None
+
+    def release(self):
+        """An admitted call ended without an upstream round trip (cache hit, rejected, expired in queue)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_started = None  # the next caller probes instead
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats["opened"] += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probe_started = None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats, state=self.state, consecutive_failures=self.consecutive_failures)
+            if self.state == OPEN:
+                out["retry_in_secs"] = round(max(0.0, self.reset_after - (time.monotonic() - self.opened_at)), 2)
+            return out
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, buckets: List[float] = LATENCY_BUCKETS):
+        self.samples = deque(maxlen=window)
+        self.buckets = list(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, secs: float):
+        with self._lock:
+            self.samples.append(secs)
+            self.bucket_counts[bisect.bisect_left(self.buckets, secs)] += 1
+            self.count += 1
+            self.total += secs
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            s = sorted(self.samples)
+        return s[min(len(s) - 1, int(p / 100 * len(s)))]
+
+    def adaptive_timeout(self, default: float, floor: float, factor: float, min_samples: int) -> float:
+        """factor * rolling p95, clamped to [floor, default]; default until enough samples exist."""
+        if len(self.samples) < min_samples:
+            return default
+        return min(default, max(floor, self.percentile(95) * factor))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + ["+Inf"], self.bucket_counts):
+                running += n
+                cumulative[str(bound)] = running
+            count, total = self.count, self.total
+        return {
+            "count": count,
+            "sum_secs": round(total, 4),
+            "buckets": cumulative,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
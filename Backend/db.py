@@ -0,0 +1,295 @@
+# db.py
+"""
+Shared MongoDB access for the API and the maintenance scripts.
+
+- connect_mongo(): pooled synchronous client (scripts, import-time bootstrap, worker threads)
+- connect_mongo_async(): pymongo's AsyncMongoClient for code running on the event loop
+- Pool sizes and timeouts are explicit (env-tunable) instead of driver defaults, and a
+  checkout that waits too long for a pooled connection fails fast
+- Database hands out both views of the same collections; without MONGO_URL (or when
+  Mongo is unreachable) they are backed by InMemoryCollection instead
+- InMemoryCollection understands the queries the app and scripts issue: equality,
+  $gt/$gte/$lt/$lte/$ne/$in/$nin/$exists, $and/$or, projections, $set/$setOnInsert/$unset
+  updates and upserts, so it doubles as a local stand-in for tests and benchmarks
+"""
+
+import asyncio
+import copy
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import certifi
+from pymongo import MongoClient
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pymongo < 4.10: async views run the sync driver in threads
+    AsyncMongoClient = None
+
+DB_NAME = os.getenv("MONGO_DB", "chatbot_db")
+MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", "20"))      # per client
+MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", "0"))
+MONGO_SERVER_SELECTION_MS = 5000
+MONGO_CONNECT_TIMEOUT_MS = 5000
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "15000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000   # max wait for a free pooled connection
+MONGO_MAX_IDLE_MS = 60000
+
+
+def client_options(uri: str, **overrides) -> Dict[str, Any]:
+    opts = {
+        "maxPoolSize": MONGO_MAX_POOL,
+        "minPoolSize": MONGO_MIN_POOL,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_MS,
+    }
+    if "mongodb+srv" in uri:
+        opts["tlsCAFile"] = certifi.where()
+    opts.update(overrides)
+    return opts
+
+
+def connect_mongo(uri: str, **overrides) -> MongoClient:
+    """Synchronous client, pinged so a bad URL fails here rather than on first use."""
+    client = MongoClient(uri, **client_options(uri, **overrides))
+    client.admin.command("ping")
+    return client
+
+
+async def connect_mongo_async(uri: str, **overrides):
+    """AsyncMongoClient bound to the running loop, pinged."""
+    if AsyncMongoClient is None:
+        raise RuntimeError("pymongo >= 4.10 is required for AsyncMongoClient")
+    client = AsyncMongoClient(uri, **client_options(uri, **overrides))
+    await client.admin.command("ping")
+    return client
+
+
+# -----------------------------
+# In-memory stand-in
+# -----------------------------
+_MISSING = object()
+
+
+def _get(doc: Dict[str, Any], path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _cmp(value, op: str, arg) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$in":
+        return (None if value is _MISSING else value) in arg
+    if op == "$nin":
+        return (None if value is _MISSING else value) not in arg
+    if op == "$ne":
+        return (None if value is _MISSING else value) != arg
+    if op == "$eq":
+        return (None if value is _MISSING else value) == arg
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:  # Mongo never matches across types
+        return False
+    raise ValueError(f"unsupported query operator {op}")
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            value = _get(doc, key)
+            if not all(_cmp(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif (None if _get(doc, key) is _MISSING else _get(doc, key)) != cond:
+            return False
+    return True
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return dict(doc)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):  # inclusion
+        out = {k: doc[k] for k in fields if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}  # exclusion
+
+
+class InMemoryCollection:
+    def __init__(self, docs=None):
+        self.docs: List[Dict[str, Any]] = docs or []
+
+    def find(self, query=None, projection=None, *args, **kwargs) -> List[Dict[str, Any]]:
+        return [project(d, projection) for d in self.docs if matches(d, query)]
+
+    def find_one(self, query=None, projection=None, *args, **kwargs):
+        d = next((d for d in self.docs if matches(d, query)), None)
+        return None if d is None else project(d, projection)
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+    def insert_many(self, docs, *args, **kwargs):
+        self.docs.extend(docs)
+
+    def _update(self, query, update, upsert: bool, many: bool) -> int:
+        hits = [d for d in self.docs if matches(d, query)]
+        if not many:
+            hits = hits[:1]
+        if not hits and upsert:
+            doc = {k: v for k, v in (query or {}).items() if not k.startswith("$") and not isinstance(v, dict)}
+            doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+            self.docs.append(doc)
+            hits = [doc]
+        for d in hits:
+            d.update(update.get("$set", {}))
+            for k in update.get("$unset", {}):
+                d.pop(k, None)
+        return len(hits)
+
+    def update_one(self, query, update, upsert=False, *args, **kwargs):
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query, update, upsert=False, *args, **kwargs):
+        return self._update(query, update, upsert, many=True)
+
+    def delete_one(self, query):
+        for i, d in enumerate(self.docs):
+            if matches(d, query):
+                del self.docs[i]
+                return 1
+        return 0
+
+    def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        return before - len(self.docs)
+
+    def count_documents(self, query=None, *args, **kwargs) -> int:
+        return sum(1 for d in self.docs if matches(d, query))
+
+    def create_index(self, keys, *args, **kwargs):
+        return keys if isinstance(keys, str) else "_".join(f"{k}_{v}" for k, v in keys)
+
+
+class _ListCursor:
+    """Enough of AsyncCursor for `await find(...).to_list()` and `async for`."""
+
+    def __init__(self, docs_future):
+        self._docs_future = docs_future
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = await self._docs_future
+        return docs if length is None else docs[:length]
+
+    async def __aiter__(self):
+        for doc in await self._docs_future:
+            yield doc
+
+
+class AsyncCollectionAdapter:
+    """
+    Async view over a synchronous collection, with the AsyncCollection call shapes.
+    In-memory collections are called inline; a real sync collection (old pymongo
+    without AsyncMongoClient) runs in a thread so it never blocks the loop.
+    """
+
+    def __init__(self, coll, offload: bool):
+        self.coll = coll
+        self.offload = offload
+
+    async def _call(self, fn, *args, **kwargs):
+        if self.offload:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def find(self, *args, **kwargs) -> _ListCursor:
+        return _ListCursor(self._call(lambda: list(self.coll.find(*args, **kwargs))))
+
+    def __getattr__(self, name):
+        fn = getattr(self.coll, name)
+
+        async def call(*args, **kwargs):
+            return await self._call(fn, *args, **kwargs)
+        return call
+
+
+class Database:
+    """
+    The app's collections by name: sync handles (`db["faqs"]`) for the bootstrap and
+    worker threads, async handles (`db.aio("faqs")`) for the event loop.
+    """
+
+    def __init__(self, uri: Optional[str], sync_pool_size: Optional[int] = None):
+        self.uri = uri
+        self.sync_pool_size = sync_pool_size
+        self.client: Optional[MongoClient] = None
+        self.aclient = None
+        self._memory: Dict[str, InMemoryCollection] = {}
+
+    @property
+    def in_memory(self) -> bool:
+        return self.client is None
+
+    def connect(self) -> bool:
+        """Connect the sync client; stays in memory (and returns False) on failure."""
+        if not self.uri:
+            return False
+        try:
+            overrides = {"maxPoolSize": self.sync_pool_size} if self.sync_pool_size else {}
+            self.client = connect_mongo(self.uri, **overrides)
+            return True
+        except Exception:
+            logging.exception("MongoDB connection failed. Using fallback.")
+            return False
+
+    async def connect_async(self):
+        """Attach the async client on the running loop (threaded sync fallback if unavailable)."""
+        if self.in_memory or self.aclient is not None:
+            return
+        try:
+            self.aclient = await connect_mongo_async(self.uri)
+        except Exception as e:
+            logging.warning("Async MongoDB client unavailable (%s); using the sync driver in threads.", e)
+
+    def __getitem__(self, name: str):
+        if self.client is not None:
+            return self.client[DB_NAME][name]
+        return self._memory.setdefault(name, InMemoryCollection())
+
+    def aio(self, name: str):
+        if self.aclient is not None:
+            return self.aclient[DB_NAME][name]
+        return AsyncCollectionAdapter(self[name], offload=not self.in_memory)
+
+    async def close(self):
+        if self.aclient is not None:
+            await self.aclient.close()
+            self.aclient = None
+        if self.client is not None:
+            self.client.close()
+
@@ -0,0 +1,183 @@
+# dept_matcher.py
+"""
+Department / HOD rule matcher compiled from the `departments` collection.
+
+- Every department name and alias is compiled into one token-level Aho-Corasick
+  automaton, so a lookup is a single pass over the query's tokens however many
+  aliases exist
+- The longest alias wins ("cse ai ml" beats "cse"); equal aliases keep the
+  first department registering them (departments are compiled in dept_id order)
+- Besides the HOD, the same index answers email / phone / address questions
+DEFAULT_DEPARTMENTS is used when the collection is empty (e.g. in-memory mode).
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SPLIT = re.compile(r"[^a-z0-9&]+")
+
+# question words that ask for a specific department fact instead of the HOD
+FACT_KEYWORDS = {
+    "email": {"email", "mail", "emails"},
+    "phone": {"phone", "mobile", "number", "call", "telephone"},
+    "address": {"address", "location", "located", "where", "map", "directions"},
+}
+
+DEFAULT_DEPARTMENTS = [
+    {"dept_id": "aero", "name": "Aeronautical Engineering",
+     "aliases": ["aeronautical", "aeronautical engineering"],
+     "hod": {"name": "Dr. Bino Prince Raja D."}},
+    {"dept_id": "chem", "name": "Chemistry",
+     "aliases": ["chemistry"],
+     "hod": {"name": "Dr. Remya P. Narayanan"}},
+    {"dept_id": "civil", "name": "Civil Engineering",
+     "aliases": ["civil", "civil engineering"],
+     "hod": {"name": "Dr. Allamaprabhu Kamatagi"}},
+    {"dept_id": "cse", "name": "Computer Science & Engineering",
+     "aliases": ["cse", "computer science", "computer science & engineering"],
+     "hod": {"name": "Dr. Kumaraswamy S."}},
+    {"dept_id": "cse_aids", "name": "Computer Science & Engineering (AI & DS)",
+     "aliases": ["cse ai ds", "cse (ai & ds)", "ai ds", "ai & ds",
+                 "artificial intelligence & data science"],
+     "hod": {"name": "Dr. Girish Rao Salanke N S"}},
+    {"dept_id": "cse_aiml", "name": "Computer Science & Engineering (AI & ML)",
+     "aliases": ["cse ai ml", "cse (ai & ml)", "cse ai", "aiml", "ai ml", "ai & ml",
+                 "artificial intelligence & machine learning", "artificial intelligence machine learning"],
+     "hod": {"name": "Dr. Chandramma R."}},
+    {"dept_id": "ece", "name": "Electronics & Communication Engineering",
+     "aliases": ["ece", "electronics", "electronics & communication", "electronics & communication engineering"],
+     "hod": {"name": "Dr. Madhavi Mallam"}},
+    {"dept_id": "eee", "name": "Electrical & Electronics Engineering",
+     "aliases": ["eee", "electrical", "electrical & electronics", "electrical & electronics engineering"],
+     "hod": {"name": "Dr. Deepika Masand"}},
+    {"dept_id": "ise", "name": "Information Science & Engineering",
+     "aliases": ["ise", "information science", "information science & engineering"],
+     "hod": {"name": "Dr. Kiran Y. C."}},
+    {"dept_id": "math", "name": "Mathematics",
+     "aliases": ["math", "maths", "mathematics"],
+     "hod": {"name": "Dr. Rupa K."}},
+    {"dept_id": "mba", "name": "Management Studies (MBA)",
+     "aliases": ["mba", "management", "management studies"],
+     "hod": {"name": "Dr. Sanjeev Kumar Thalari"}},
+    {"dept_id": "mech", "name": "Mechanical Engineering",
+     "aliases": ["mechanical", "mechanical engineering"],
+     "hod": {"name": "Dr. Bharat Vinjamuri"}},
+    {"dept_id": "phy", "name": "Physics",
+     "aliases": ["physics"],
+     "hod": {"name": "Dr. N. V. Raju"}},
+]
+
+
+def dept_tokens(s: str) -> List[str]:
+    """Lowercase tokens with '&' as its own token and 'and' folded into it."""
+    s = (s or "").lower().replace("&", " & ")
+    return ["&" if tok == "and" else tok for tok in _SPLIT.split(s) if tok]
+
+
+class TokenAutomaton:
+    """Aho-Corasick over token sequences; search() returns the longest pattern found."""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Optional[Tuple[int, Any]]] = [None]  # (pattern length, value) ending at node
+
+    def add(self, tokens: List[str], value: Any) -> bool:
+        """Register a pattern; returns False if it was already registered (first value is kept)."""
+        if not tokens:
+            return False
+        node = 0
+        for tok in tokens:
+            nxt = self.goto[node].get(tok)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][tok] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(None)
+            node = nxt
+        if self.out[node] is not None:
+            return False
+        self.out[node] = (len(tokens), value)
+        return True
+
+    def build(self):
+        # BFS: fail links, and each node inherits the longest output along its fail chain
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for tok, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(tok, 0)
+                if self.out[child] is None:
+                    self.out[child] = self.out[self.fail[child]]
+                queue.append(child)
+
+    def search(self, tokens: Iterable[str]) -> Optional[Any]:
+        state, best = 0, None
+        for tok in tokens:
+            while state and tok not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(tok, 0)
+            hit = self.out[state]
+            if hit is not None and (best is None or hit[0] > best[0]):
+                best = hit
+        return best[1] if best else None
+
+
+class DepartmentMatcher:
+    def __init__(self, departments: List[Dict[str, Any]]):
+        self.departments = sorted(departments, key=lambda d: str(d.get("dept_id", "")))
+        self.automaton = TokenAutomaton()
+        for dept in self.departments:
+            for alias in [dept.get("name", "")] + list(dept.get("aliases") or []):
+                self.automaton.add(dept_tokens(alias), dept)
+        self.automaton.build()
+
+    def __len__(self):
+        return len(self.departments)
+
+    def match(self, question: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        tokens = dept_tokens(question)
+        return self.automaton.search(tokens), tokens
+
+    def answer(self, question: str) -> Optional[str]:
+        """Answer a department question: a requested fact we have on record, else the HOD."""
+        dept, tokens = self.match(question)
+        if dept is None:
+            return None
+        asked = set(tokens)
+        for fact, words in FACT_KEYWORDS.items():
+            if asked & words:
+                # fact words are generic ("where", "call"): without the fact on record, keep the HOD answer
+                answer = self.fact_answer(dept, fact)
+                if answer:
+                    return answer
+        return self.hod_answer(dept)
+
+    @staticmethod
+    def hod_answer(dept: Dict[str, Any]) -> Optional[str]:
+        hod = (dept.get("hod") or {}).get("name")
+        if not hod:
+            return None
+        return f"{hod} is the HOD of the {dept.get('name')} department. (GAT)"
+
+    @staticmethod
+    def fact_answer(dept: Dict[str, Any], fact: str) -> Optional[str]:
+        hod = dept.get("hod") or {}
+        name = dept.get("name")
+        if fact == "email":
+            email = dept.get("email") or hod.get("email")
+            return f"The {name} department can be reached at {email}. (GAT)" if email else None
+        if fact == "phone":
+            phone = dept.get("phone") or hod.get("phone")
+            return f"The {name} department's phone number is {phone}. (GAT)" if phone else None
+        if fact == "address":
+            address, maps_url = dept.get("address"), dept.get("maps_url")
+            if not address:
+                return None
+            return f"The {name} department is at {address}." + (f" Map: {maps_url}" if maps_url else "") + " (GAT)"
+        return None
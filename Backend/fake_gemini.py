@@ -0,0 +1,137 @@
+# fake_gemini.py
+"""
+Local stand-in for google.generativeai's GenerativeModel, for benchmarks and load tests.
+
+- Latency is log-normal around a configurable median (sigma controls the tail)
+- A configurable share of calls fails with an exception, like upstream 5xx/quota errors
+- request_options={"timeout": ...} is honored: a call slower than its timeout sleeps for
+  the timeout and then raises, like the real client's deadline
+- stream=True yields the answer in chunks, the first one after the sampled latency
+- Runs in the caller's thread (time.sleep), so it occupies AI pool threads like real calls
+- The first round trip (any call, including count_tokens) also pays connect_secs, like
+  opening the real client's channel; GeminiClient.warm_up() takes that hit at startup
+- Numbered multi-question prompts (ai_batcher.build_batch_prompt) get numbered answers;
+  each question after the first adds batch_item_secs (longer output), and a
+  batch_format_error_rate share of replies drops the numbering to exercise the fallback
+Plug in with gemini_client.GeminiClient.use_backend(FakeGemini(...).model_class()), or
+install(genai_module, FakeGemini(...)) for code that calls genai.GenerativeModel directly.
+"""
+
+import math
+import random
+import re
+import threading
+import time
+from typing import Iterator, List, Optional
+
+
+_NUMBERED_QUESTION = re.compile(r"^\[(\d+)\] (.*)$", re.MULTILINE)
+
+
+class FakeUpstreamError(RuntimeError):
+    pass
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _TokenCount:
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+
+class FakeGemini:
+    def __init__(self, median_secs: float = 0.8, sigma: float = 0.5, error_rate: float = 0.0,
+                 chunks: int = 4, chunk_gap_secs: float = 0.05, seed: Optional[int] = None,
+                 connect_secs: float = 0.0, batch_item_secs: float = 0.1, batch_format_error_rate: float = 0.0):
+        self.median_secs = median_secs
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.chunks = chunks
+        self.chunk_gap_secs = chunk_gap_secs
+        self.connect_secs = connect_secs
+        self.batch_item_secs = batch_item_secs
+        self.batch_format_error_rate = batch_format_error_rate
+        self.connected = False
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()  # Random isn't safe to share across threads
+        self.calls = 0
+
+    def _connect_delay(self) -> float:
+        # caller holds self._lock
+        if self.connected:
+            return 0.0
+        self.connected = True
+        return self.connect_secs
+
+    def _sample(self, questions: int = 1):
+        with self._lock:
+            self.calls += 1
+            latency = self._rng.lognormvariate(math.log(self.median_secs), self.sigma) if self.median_secs > 0 else 0.0
+            latency += self.batch_item_secs * (questions - 1)
+            fail = self._rng.random() < self.error_rate
+            garbled = questions > 1 and self._rng.random() < self.batch_format_error_rate
+            latency += self._connect_delay()
+        return latency, fail, garbled
+
+    def count_tokens(self, contents) -> "_TokenCount":
+        with self._lock:
+            delay = self._connect_delay()
+        time.sleep(delay)
+        return _TokenCount(len(str(contents).split()))
+
+    def answer_for(self, prompt: str) -> str:
+        question = prompt.rsplit("\n", 1)[-1]
+        return f"**Answer:** Global Academy of Technology information about \"{question}\" (simulated)."
+
+    def batch_answer_for(self, questions: List[str], garbled: bool = False) -> str:
+        answers = [self.answer_for(q) for q in questions]
+        if garbled:
+            return "\n\n".join(answers)
+        return "\n".join(f"[{i}] {a}" for i, a in enumerate(answers, 1))
+
+    def generate(self, prompt: str, stream: bool = False, timeout: Optional[float] = None):
+        questions = [m.group(2) for m in _NUMBERED_QUESTION.finditer(prompt)]
+        latency, fail, garbled = self._sample(max(1, len(questions)))
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake Gemini deadline of {timeout:.2f}s exceeded")
+        time.sleep(latency)
+        if fail:
+            raise FakeUpstreamError("simulated upstream failure")
+        text = self.batch_answer_for(questions, garbled) if len(questions) > 1 else self.answer_for(prompt)
+        if not stream:
+            return _Response(text)
+        return self._stream(text)
+
+    def _stream(self, text: str) -> Iterator[_Response]:
+        size = max(1, math.ceil(len(text) / self.chunks))
+        pieces: List[str] = [text[i:i + size] for i in range(0, len(text), size)]
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.chunk_gap_secs)
+            yield _Response(piece)
+
+    def model_class(self):
+        fake = self
+
+        class FakeGenerativeModel:
+            def __init__(self, model_name: str = "", **kwargs):
+                self.model_name = model_name
+
+            def generate_content(self, contents, stream: bool = False, request_options=None, **kwargs):
+                timeout = (request_options or {}).get("timeout")
+                return fake.generate(str(contents), stream=stream, timeout=timeout)
+
+            def count_tokens(self, contents, request_options=None, **kwargs):
+                return fake.count_tokens(contents)
+
+        return FakeGenerativeModel
+
+
+def install(genai_module, fake: FakeGemini) -> FakeGemini:
+    """Point genai_module.GenerativeModel at the fake (process-wide)."""
+    genai_module.GenerativeModel = fake.model_class()
+    return fake
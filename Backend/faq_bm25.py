@@ -0,0 +1,136 @@
+# faq_bm25.py
+"""
+BM25 retrieval over the FAQ corpus: the tier between fuzzy question matching and Gemini.
+
+- Each FAQ is indexed on its normalized question (counted QUESTION_WEIGHT times) plus
+  its normalized answer, so paraphrases that share words with the answer still match
+- Postings are faq_columns.Postings (CSR arrays) holding the precomputed BM25 weight per
+  (term, FAQ); a query is a handful of vectorized adds into one score array plus an
+  argpartition. The build is a few NumPy passes over the whole corpus (term_counts) and
+  reads the store's normalized answers (FaqStore.a_norms) instead of normalizing them
+- The arrays are stored in the FAQ snapshot as they are (PARAMS guards against stale
+  weights), so attaching to a snapshot builds nothing and copies nothing
+- Stop words (STOP_WORDS: "what", "is", "there", ...) and terms found in most FAQs are
+  skipped at query time: they barely move the ranking but would touch every document,
+  and on their own they "match" whichever FAQ happens to use them most
+- confidence() scales a score to [0, 1] against the best score the query could reach;
+  query words the corpus has never seen count against it, so "fee for courses in
+  canada" doesn't look like a confident "fee for courses" hit
+- A one-word query always reaches its own best score, so confidence alone can't tell
+  a real hit: matched_terms() counts the query's informative terms an FAQ contains,
+  and callers also require an absolute score (see main.get_lexical_faq_match)
+Built from a FaqStore together with the FaqIndex (or loaded with it), immutable afterwards.
+"""
+
+import math
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from faq_columns import Postings, term_counts, term_offsets
+from faq_store import FaqStore
+
+K1 = 1.2
+B = 0.75
+QUESTION_WEIGHT = 2          # question terms count twice as much as answer terms
+COMMON_TERM_RATIO = 0.5      # terms in more than this share of FAQs are skipped at query time
+PARAMS = (K1, B, QUESTION_WEIGHT)  # what the stored weights depend on (besides the normalizer)
+# question/function words that carry no topic; skipped at query time whatever their frequency
+STOP_WORDS = frozenset("""
+a an the is are am was were be been being do does did have has had can could will would shall should
+may might must i me my we us our you your he him his she her it its they them their this that these
+those there here what which who whom whose when where why how of in on at to for from by with about
+as into onto over under and or but not no yes if then than so too very just also any some all
+please tell know want like get got ok okay hi hello thanks thank
+""".split())
+
+
+class Bm25Index:
+    def __init__(self, store: FaqStore, normalize: Callable[[str], str], postings: Optional[Postings] = None):
+        """postings may be passed precomputed (e.g. from a snapshot) to skip the build."""
+        n = len(store)
+        self.n = n
+        self.postings = postings if postings is not None else self._build(store, normalize)
+        self.max_idf = math.log(1 + (n + 0.5) / 0.5) if n else 0.0  # idf of a term no FAQ contains
+        self.common_df = n * COMMON_TERM_RATIO if n >= 20 else n + 1
+
+    @staticmethod
+    def _build(store: FaqStore, normalize: Callable[[str], str]) -> Postings:
+        n = len(store)
+        a_norms = store.a_norms if store.a_norms is not None else [normalize(a) for a in store.answers]
+        split = {}  # answers repeated across FAQs are tokenized once
+        a_tokens = [split[a] if a in split else split.setdefault(a, a.split()) for a in a_norms]
+        q_tokens = [q_norm.split() for q_norm in store.q_norms]
+        terms, term_of, doc_of, tf = term_counts(n, [(q_tokens, QUESTION_WEIGHT), (a_tokens, 1.0)])
+        lengths = np.bincount(doc_of, weights=tf, minlength=n)
+        avgdl = float(lengths.mean()) if n else 1.0
+        norm = K1 * (1 - B + B * lengths / max(avgdl, 1e-9))  # per-document length normalization
+        offsets = term_offsets(term_of, len(terms))
+        df = np.diff(offsets)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        weights = (idf[term_of] * tf * (K1 + 1) / (tf + norm[doc_of])).astype(np.float32)
+        return Postings(terms, offsets, doc_of.astype(np.int32), weights)
+
+    def __len__(self):
+        return self.n
+
+    def idf(self, tid: int) -> float:
+        df = self.postings.df(tid)
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def _term_ids(self, tokens: Sequence[str]) -> List[Tuple[str, int]]:
+        out = []
+        for tok in dict.fromkeys(tokens):
+            if tok in STOP_WORDS:
+                continue
+            tid = self.postings.find(tok)
+            if tid >= 0 and self.postings.df(tid) <= self.common_df:
+                out.append((tok, tid))
+        return out
+
+    def terms(self, tokens: Sequence[str]) -> List[str]:
+        """The query's informative terms: indexed, not a stop word, not in most FAQs."""
+        return [tok for tok, _ in self._term_ids(tokens)]
+
+    def matched_terms(self, tokens: Sequence[str], pos: int) -> int:
+        """How many of the query's informative terms the FAQ at pos contains."""
+        n = 0
+        for _, tid in self._term_ids(tokens):
+            ids, _ = self.postings.entry(tid)
+            i = int(np.searchsorted(ids, pos))  # posting ids are ascending
+            n += i < len(ids) and ids[i] == pos
+        return n
+
+    def search(self, tokens: Sequence[str], k: int = 3) -> List[Tuple[int, float]]:
+        """Top-k (FAQ position, BM25 score) for the query tokens, best first."""
+        if not self.n:
+            return []
+        scores = None
+        for _, tid in self._term_ids(tokens):
+            if scores is None:
+                scores = np.zeros(self.n, dtype=np.float32)
+            ids, weights = self.postings.entry(tid)
+            scores[ids] += weights  # ids are unique within a posting list
+        if scores is None:
+            return []
+        k = min(k, self.n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(pos), float(scores[pos])) for pos in top if scores[pos] > 0]
+
+    def confidence(self, tokens: Sequence[str], score: float) -> float:
+        """
+        score / the score of an average-length FAQ whose question holds every query word
+        once (unknown words count at max idf); 1.0 and above is a full match.
+        """
+        best = 0.0
+        for tok in set(tokens):
+            if tok in STOP_WORDS:
+                continue
+            tid = self.postings.find(tok)
+            if tid < 0:
+                best += self.max_idf
+            elif self.postings.df(tid) <= self.common_df:
+                best += self.idf(tid)
+        full_tf = QUESTION_WEIGHT * (K1 + 1) / (QUESTION_WEIGHT + K1)
+        return min(1.0, score / (best * full_tf)) if best else 0.0
@@ -0,0 +1,160 @@
+# faq_columns.py
+"""
+Packed, read-only columns for the FAQ index, usable in memory or straight from a snapshot mmap.
+
+- StrColumn: N strings as one UTF-8 blob plus an int64 offsets array (N + 1 entries);
+  item i is decoded on access, so a mapped column costs a worker no objects at all
+- IdColumn: Mongo ObjectIds as fixed 12-byte records, decoded on access
+- Postings: CSR posting lists (term -> FAQ positions): a sorted term sequence, int64
+  offsets into one int32 array of positions (ascending within a term) and optionally
+  one float32 weight per entry; a term is found by bisect and its postings are array
+  views, never copies
+- term_counts() builds the (term, FAQ, count) triples for a whole corpus in a few
+  NumPy passes instead of per-token Python dict updates
+faq_snapshot.py writes these arrays as they are and maps them back with np.frombuffer.
+"""
+
+import bisect
+from collections.abc import Sequence
+from itertools import chain
+from typing import Iterable, List, Optional, Sequence as Seq, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+OID_BYTES = 12
+
+
+class StrColumn(Sequence):
+    __slots__ = ("offsets", "blob")
+
+    def __init__(self, offsets: np.ndarray, blob):
+        """offsets: int64 array of len(self) + 1 byte offsets into blob (any bytes-like object)."""
+        self.offsets = offsets
+        self.blob = memoryview(blob)
+
+    @classmethod
+    def pack(cls, strings: Iterable[str]) -> "StrColumn":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return cls(offsets, b"".join(encoded))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self.offsets) - 1
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("StrColumn index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        blob, offsets = self.blob, self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield str(blob[start:end], "utf-8")
+
+
+class IdColumn(Sequence):
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        """raw: len(self) * 12 bytes of ObjectId binaries."""
+        self.raw = memoryview(raw)
+
+    @classmethod
+    def pack(cls, ids: Iterable[ObjectId]) -> "IdColumn":
+        return cls(b"".join(_id.binary for _id in ids))
+
+    def __len__(self):
+        return len(self.raw) // OID_BYTES
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("IdColumn index out of range")
+        return ObjectId(bytes(self.raw[i * OID_BYTES:(i + 1) * OID_BYTES]))
+
+    def __iter__(self):
+        raw = bytes(self.raw)
+        for start in range(0, len(raw), OID_BYTES):
+            yield ObjectId(raw[start:start + OID_BYTES])
+
+
+class Postings:
+    __slots__ = ("terms", "offsets", "ids", "weights")
+
+    def __init__(self, terms: Seq[str], offsets: np.ndarray, ids: np.ndarray, weights: Optional[np.ndarray] = None):
+        self.terms = terms          # sorted
+        self.offsets = offsets      # int64, len(terms) + 1
+        self.ids = ids              # int32 FAQ positions, ascending within each term
+        self.weights = weights      # float32 per entry, or None
+
+    @classmethod
+    def build(cls, token_lists: Seq[List[str]]) -> "Postings":
+        """Positions of the FAQs containing each token (token_lists[pos] = that FAQ's tokens)."""
+        terms, term_of, doc_of, _ = term_counts(len(token_lists), [(token_lists, 1.0)])
+        return cls(terms, term_offsets(term_of, len(terms)), doc_of.astype(np.int32))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def find(self, term: str) -> int:
+        """Term id, or -1."""
+        i = bisect.bisect_left(self.terms, term)
+        return i if i < len(self.terms) and self.terms[i] == term else -1
+
+    def df(self, tid: int) -> int:
+        return int(self.offsets[tid + 1] - self.offsets[tid])
+
+    def get(self, term: str) -> Optional[np.ndarray]:
+        """FAQ positions containing term (a view), or None."""
+        tid = self.find(term)
+        if tid < 0:
+            return None
+        return self.ids[self.offsets[tid]:self.offsets[tid + 1]]
+
+    def entry(self, tid: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        start, end = self.offsets[tid], self.offsets[tid + 1]
+        return self.ids[start:end], None if self.weights is None else self.weights[start:end]
+
+
+def term_counts(n: int, parts: Seq[Tuple[Seq[List[str]], float]]
+                ) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    parts: (token lists, one per FAQ position; weight per occurrence). Returns the sorted
+    vocabulary and, sorted by term then position, the term ids, positions and summed weights.
+    """
+    flats, docs, weights = [], [], []
+    for token_lists, weight in parts:
+        lens = np.fromiter(map(len, token_lists), dtype=np.int64, count=n)
+        flat = list(chain.from_iterable(token_lists))
+        flats.append(flat)
+        docs.append(np.repeat(np.arange(n, dtype=np.int64), lens))
+        weights.append(np.full(len(flat), weight, dtype=np.float64))
+    terms = sorted(set(chain.from_iterable(flats)))
+    if not terms:
+        empty = np.zeros(0, dtype=np.int64)
+        return terms, empty, empty, np.zeros(0, dtype=np.float64)
+    tid = dict(zip(terms, range(len(terms))))
+    term = np.concatenate([np.fromiter(map(tid.__getitem__, flat), dtype=np.int64, count=len(flat))
+                           for flat in flats])
+    key = term * n + np.concatenate(docs)
+    uniq, inverse = np.unique(key, return_inverse=True)
+    counts = np.bincount(inverse.ravel(), weights=np.concatenate(weights), minlength=len(uniq))
+    return terms, uniq // n, uniq % n, counts
+
+
+def term_offsets(term_of: np.ndarray, n_terms: int) -> np.ndarray:
+    """CSR offsets for entries sorted by term id."""
+    offsets = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_of, minlength=n_terms), out=offsets[1:])
+    return offsets
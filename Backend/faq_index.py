@@ -0,0 +1,140 @@
+# faq_index.py
+"""
+In-memory FAQ index used by main.py for fuzzy FAQ matching.
+
+- Reads FAQs from a FaqStore (normalized questions are precomputed there) and
+  identifies them by integer position
+- Builds an inverted token index (token -> FAQ positions) as faq_columns.Postings: flat
+  arrays that a snapshot stores as they are, so workers map them instead of copying
+- Scores only the FAQs sharing a token with the query, falling back
+  to a full scan when the query shares no indexed token at all
+- Matching is approximate once the corpus is large enough to prune (MIN_DOCS_FOR_PRUNING):
+  tokens in more than COMMON_TOKEN_RATIO of the FAQs are ignored and only the
+  MAX_CANDIDATES FAQs with the highest shared-token idf are scored, so a query whose
+  distinguishing word is misspelled can settle for a slightly lower-scoring FAQ than a
+  full scan would find (bench_faq_match.py reports how often results differ)
+- Scoring runs through rapidfuzz's C-level bulk APIs (extractOne over the
+  candidates), with the prefix boost applied on top; prefix hits are a bisect
+  range of the sorted questions, scored in one cdist call
+- Instances are never mutated after construction: refreshes build a new
+  store + index (reusing the previous one's normalized questions) and swap it in
+- An optional `lexical` factory builds a second index over the same store (main.py
+  uses faq_bm25.Bm25Index), so both are always built, and swapped, together
+"""
+
+import bisect
+import math
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from faq_columns import Postings
+from faq_store import FaqStore
+
+MAX_CANDIDATES = 200        # upper bound on FAQs scored per query
+COMMON_TOKEN_RATIO = 0.10   # tokens found in more FAQs than this share don't narrow the search
+MIN_DOCS_FOR_PRUNING = 50   # below this size every token is used for candidate lookup
+PREFIX_BOOST = 5            # small boost when the FAQ question starts with the query
+CDIST_WORKERS = -1          # cdist threads (-1 = all cores; scoring releases the GIL)
+_MAX_CHAR = chr(0x10FFFF)   # user_q + _MAX_CHAR sorts after every string starting with user_q
+
+
+class FaqIndex:
+    def __init__(self, store: FaqStore, postings: Optional[Postings] = None,
+                 sorted_positions: Optional[np.ndarray] = None,
+                 lexical: Optional[Callable[[FaqStore], Any]] = None):
+        """
+        Build the index over a store. postings / sorted_positions may be passed precomputed
+        (e.g. from a snapshot) to skip tokenization and sorting. store.q_norms must be a
+        list: rapidfuzz scores it directly.
+        """
+        self.store = store
+        q_norms = self.q_norms = store.q_norms
+        if postings is None:
+            postings = Postings.build([q_norm.split() for q_norm in q_norms])
+        self.postings = postings
+        # sorted (q_norm, position) pairs: prefix lookups become a bisect
+        if sorted_positions is None:
+            sorted_positions = np.array(sorted(range(len(q_norms)), key=q_norms.__getitem__), dtype=np.int32)
+        self.sorted_positions = sorted_positions
+        self.sorted_q: List[str] = [q_norms[pos] for pos in sorted_positions.tolist()]
+        n = len(store)
+        self.common_df = n * COMMON_TOKEN_RATIO if n >= MIN_DOCS_FOR_PRUNING else n + 1
+        self.lexical = lexical(store) if lexical is not None else None
+
+    def __len__(self):
+        return len(self.store)
+
+    def candidates(self, user_q: str, tokens: Optional[List[str]] = None) -> List[int]:
+        """Positions of FAQs sharing at least one (not too common) token with the query."""
+        hits, idfs = [], []
+        for tok in set(user_q.split() if tokens is None else tokens):
+            ids = self.postings.get(tok)
+            if ids is None or len(ids) > self.common_df:
+                continue
+            hits.append(ids)
+            idfs.append(math.log(1 + len(self.store) / len(ids)))  # rare shared tokens count more
+        if not hits:
+            return []
+        positions, inverse = np.unique(np.concatenate(hits), return_inverse=True)
+        if len(positions) > MAX_CANDIDATES:
+            weights = np.bincount(inverse.ravel(), weights=np.repeat(idfs, [len(ids) for ids in hits]))
+            # highest weight first; ties go to the earlier FAQ (positions is ascending, the sort stable)
+            positions = np.sort(positions[np.argsort(-weights, kind="stable")[:MAX_CANDIDATES]])
+        # keep corpus order so ties resolve like a full scan would
+        return positions.tolist()
+
+    def _prefix_range(self, user_q: str) -> Tuple[int, int]:
+        """[lo, hi) slice of sorted_q / sorted_positions whose questions start with the query."""
+        if not user_q:
+            return 0, 0
+        lo = bisect.bisect_left(self.sorted_q, user_q)
+        return lo, bisect.bisect_left(self.sorted_q, user_q + _MAX_CHAR, lo)
+
+    def prefix_matches(self, user_q: str) -> List[int]:
+        """Positions of FAQs whose normalized question starts with the query."""
+        lo, hi = self._prefix_range(user_q)
+        return self.sorted_positions[lo:hi].tolist()
+
+    def best_match(self, user_q: str, score_cutoff: float = 0,
+                   tokens: Optional[List[str]] = None) -> Tuple[Optional[int], float]:
+        """Return (FAQ position, score) for an already-normalized query, or (None, -1) below score_cutoff."""
+        positions = self.candidates(user_q, tokens)
+        if positions:
+            choices = [self.q_norms[pos] for pos in positions]
+        else:
+            positions, choices = None, self.q_norms  # full scan fallback
+
+        best_pos, best_score = -1, -1
+        hit = process.extractOne(user_q, choices, scorer=fuzz.token_sort_ratio, score_cutoff=score_cutoff)
+        if hit:
+            best_pos = positions[hit[2]] if positions else hit[2]
+            best_score = hit[1]
+        # prefix hits may only reach the cutoff thanks to the boost: score them all in one call
+        # (a short query like "w" can prefix most of the corpus)
+        lo, hi = self._prefix_range(user_q)
+        if lo < hi:
+            floor = max(score_cutoff, best_score) - PREFIX_BOOST
+            scores = process.cdist([user_q], self.sorted_q[lo:hi], scorer=fuzz.token_sort_ratio,
+                                   dtype=np.float64, score_cutoff=max(0, floor), workers=CDIST_WORKERS)[0]
+            top = float(scores.max())
+            if top >= floor:
+                pos = int(self.sorted_positions[lo:hi][scores == top].min())  # ties: corpus order
+                score = top + PREFIX_BOOST
+                if score > best_score or (score == best_score and pos < best_pos):
+                    best_pos, best_score = pos, score
+
+        if best_pos < 0 or best_score < score_cutoff:
+            return None, -1
+        return best_pos, best_score
+
+    def best_matches(self, user_qs: Sequence[str], score_cutoff: float = 0,
+                     tokens: Optional[Sequence[Optional[List[str]]]] = None) -> List[Tuple[Optional[int], float]]:
+        """
+        best_match for each normalized query, with the same candidate pruning, so /chat/batch
+        picks the same FAQ as /chat (a full cdist matrix would not be pruned, and costs as much).
+        """
+        tokens = tokens or [None] * len(user_qs)
+        return [self.best_match(user_q, score_cutoff, toks) if user_q else (None, -1)
+                for user_q, toks in zip(user_qs, tokens)]
@@ -0,0 +1,167 @@
+# faq_payload.py
+"""
+Pre-serialized /faqs responses.
+
+- Pages are rendered once per FaqStore (i.e. per cache generation) and kept as
+  ready-to-send bytes: JSON body, its gzip encoding and an ETag over the body
+- The ETag is a content hash, so every worker serving the same FAQs hands out the
+  same tag and a polling client gets 304s whichever worker it hits
+- Pagination uses an opaque cursor naming the last FAQ sent (its `_id`), resolved
+  against the current store, so paging across a refresh neither skips nor repeats
+  FAQs; a cursor whose FAQ was deleted raises CursorError. Rows without an `_id`
+  get a position cursor tied to a fingerprint of the store, stale after any change
+- Optional category filter (FAQ docs' `category` field, compared case-insensitively)
+- orjson (in requirements.txt) when installed, else the stdlib encoder with compact separators
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from faq_store import FaqStore
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+GZIP_MIN_BYTES = 1024   # smaller bodies aren't worth compressing
+GZIP_LEVEL = 6
+MAX_PAGES = 64          # rendered pages kept per generation
+
+
+class CursorError(ValueError):
+    """Malformed cursor, or one whose FAQ is no longer in the store."""
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class Payload(NamedTuple):
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+
+
+class FaqPayloadCache:
+    def __init__(self, maxsize: int = MAX_PAGES):
+        self.maxsize = maxsize
+        self._store: Optional[FaqStore] = None
+        self._by_category: Dict[str, List[int]] = {}
+        self._id_positions: Optional[Dict[str, int]] = None
+        self._fingerprint: Optional[str] = None
+        self._pages: "OrderedDict[Tuple, Payload]" = OrderedDict()
+        self._lock = threading.Lock()  # renders run in executor threads
+        self.stats = {"hits": 0, "renders": 0}
+
+    def _positions(self, store: FaqStore, category: Optional[str]) -> Sequence[int]:
+        if not category:
+            return range(len(store))
+        if not self._by_category:
+            for pos, cat in enumerate(store.categories):
+                self._by_category.setdefault(cat.lower(), []).append(pos)
+        return self._by_category.get(category.lower(), [])
+
+    def _store_fingerprint(self, store: FaqStore) -> str:
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=8)
+            for q in store.q_norms:
+                h.update(q.encode("utf-8") + b"\0")
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def _cursor(self, store: FaqStore, pos: int) -> str:
+        _id = store.ids[pos]
+        if _id is not None:
+            return f"id:{_id}"
+        return f"pos:{pos}:{self._store_fingerprint(store)}"
+
+    def _resume_after(self, store: FaqStore, cursor: Optional[str]) -> int:
+        """Store position the cursor's FAQ now has (-1 = from the start)."""
+        if not cursor:
+            return -1
+        kind, _, value = cursor.partition(":")
+        if kind == "id":
+            if self._id_positions is None:
+                self._id_positions = {str(_id): pos for _id, pos in store.by_id.items()}
+            pos = self._id_positions.get(value)
+        elif kind == "pos":
+            raw, _, fingerprint = value.partition(":")
+            if not raw.isdigit():
+                raise CursorError("Invalid cursor.")
+            pos = int(raw) if fingerprint == self._store_fingerprint(store) else None
+        else:
+            raise CursorError("Invalid cursor.")
+        if pos is None:
+            raise CursorError("Cursor is no longer valid; the FAQs changed. Restart from the first page.")
+        return pos
+
+    def lookup(self, store: FaqStore, category: Optional[str], cursor: Optional[str],
+               limit: Optional[int]) -> Optional[Payload]:
+        """Cheap, non-blocking: an already rendered page for this store, or None."""
+        key = _key(category, cursor, limit)
+        with self._lock:
+            if self._store is not store:
+                return None
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.stats["hits"] += 1
+            return page
+
+    def render(self, store: FaqStore, category: Optional[str], cursor: Optional[str],
+               limit: Optional[int]) -> Payload:
+        """Blocking: build (or reuse) the page after the cursor's FAQ (None = from the start).
+        Raises CursorError for malformed or stale cursors."""
+        key = _key(category, cursor, limit)
+        with self._lock:
+            if self._store is not store:
+                # new generation: everything rendered for the previous store is stale
+                self._store, self._by_category = store, {}
+                self._id_positions = self._fingerprint = None
+                self._pages.clear()
+            page = self._pages.get(key)
+            if page is not None:
+                self.stats["hits"] += 1
+                return page
+            positions = self._positions(store, category)
+            after = self._resume_after(store, cursor)
+
+        start = bisect.bisect_right(positions, after)
+        end = len(positions) if limit is None else min(len(positions), start + limit)
+        faqs = [{"question": store.questions[pos], "answer": store.answers[pos],
+                 "category": store.categories[pos]} for pos in positions[start:end]]
+        next_cursor = None
+        if start < end < len(positions):
+            with self._lock:
+                next_cursor = self._cursor(store, positions[end - 1])
+        body = dumps({"count": len(faqs), "total": len(positions), "faqs": faqs, "next_cursor": next_cursor})
+        gzipped = gzip.compress(body, GZIP_LEVEL) if len(body) >= GZIP_MIN_BYTES else None
+        page = Payload(body, gzipped, 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest())
+
+        with self._lock:
+            self.stats["renders"] += 1
+            if self._store is store:
+                self._pages[key] = page
+                while len(self._pages) > self.maxsize:
+                    self._pages.popitem(last=False)
+        return page
+
+
+def _key(category: Optional[str], cursor: Optional[str], limit: Optional[int]) -> Tuple:
+    return (category or "").lower(), cursor or "", limit
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    weak = etag[2:] if etag.startswith("W/") else etag
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == weak for t in tags)
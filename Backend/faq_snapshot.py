@@ -0,0 +1,310 @@
+# faq_snapshot.py
+"""
+On-disk snapshot of the built FAQ index, so workers can serve right after boot.
+
+File layout: MAGIC, a JSON header line (padded so the payload starts 8-byte aligned),
+then the payload: flat binary sections, each 8-byte aligned
+  header   = {"version", "python", "source", "generation", "count", "last_sync_ms",
+              "sha256", "ids", "bm25", "sections": {name: [offset, length, dtype]}}
+  sections = ids, the store's string columns as faq_columns.StrColumn offsets + UTF-8 blob,
+             the token postings as faq_columns.Postings arrays, sorted_positions and,
+             when the index has one, the BM25 postings and weights
+- ids are 12-byte ObjectIds ("ids": "oid"), or a marshal-encoded list for other _id types
+- Loading maps the file and wraps each section with np.frombuffer: nothing is unmarshalled
+  or copied, so every worker attached to the same snapshot shares one copy of it in the
+  page cache. Only what rapidfuzz needs as Python strings (the normalized questions, and
+  their sorted order) is decoded per worker; questions, answers and categories are decoded
+  row by row when read
+- The BM25 index is attached the same way, so loading builds nothing; it is only rebuilt
+  (from the stored normalized answers) when the snapshot has none or its faq_bm25.PARAMS
+  differ from the running code's
+- On Windows the file is read instead of mapped, since a mapped file can't be replaced
+- A snapshot is ignored (and rebuilt from Mongo) when the format version, the Python
+  minor version, the source tag (database + normalization algorithm) or the payload
+  checksum doesn't match
+- Writes go to a temp file that is renamed over the old snapshot, so readers never
+  see a half-written file; workers still mapping the old file keep it until they reload
+- Shared mode: one process per host holds LeaderLock and refreshes from Mongo,
+  bumping `generation` on every write; the others poll read_header() and attach to
+  the new file only when the generation changes. The leader also writes the HOD /
+  keyword rule documents to a small JSON file beside the snapshot (save_rules), so
+  followers don't query `departments` / `settings` either
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import marshal
+import mmap
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from faq_bm25 import PARAMS as BM25_PARAMS, Bm25Index
+from faq_columns import IdColumn, Postings, StrColumn
+from faq_index import FaqIndex
+from faq_store import FaqStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, shared mode is unavailable
+    fcntl = None
+
+SNAPSHOT_VERSION = 3
+MAGIC = b"GATFAQ-SNAPSHOT\n"
+_EPOCH = datetime(1970, 1, 1)
+_ALIGN = 8
+_STR_COLUMNS = ("questions", "q_norms", "answers", "a_norms", "categories")
+
+
+def _encode_id(_id: Any):
+    if isinstance(_id, ObjectId):
+        return _id.binary          # 12 raw bytes
+    if _id is None or isinstance(_id, (str, int)):
+        return _id
+    return None                    # exotic _id types can't be diffed after a reload anyway
+
+
+def _decode_id(raw):
+    return ObjectId(raw) if isinstance(raw, bytes) else raw
+
+
+def _encode_ts(ts: Optional[datetime]) -> Optional[int]:
+    # naive UTC datetimes as returned by pymongo; Mongo keeps millisecond precision
+    if not isinstance(ts, datetime):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.replace(tzinfo=None) - ts.utcoffset()
+    return (ts - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _decode_ts(ms: Optional[int]) -> Optional[datetime]:
+    return None if ms is None else _EPOCH + timedelta(milliseconds=ms)
+
+
+def _str_sections(name: str, column) -> List[Tuple[str, Any]]:
+    col = column if isinstance(column, StrColumn) else StrColumn.pack(column)
+    return [(name + ".offsets", col.offsets), (name + ".blob", col.blob)]
+
+
+def _postings_sections(name: str, postings: Postings) -> List[Tuple[str, Any]]:
+    out = _str_sections(name + ".terms", postings.terms)
+    out += [(name + ".offsets", postings.offsets), (name + ".ids", postings.ids)]
+    if postings.weights is not None:
+        out.append((name + ".weights", postings.weights))
+    return out
+
+
+def _id_section(ids) -> Tuple[str, Any]:
+    if isinstance(ids, IdColumn):
+        return "oid", ids.raw
+    if all(isinstance(_id, ObjectId) for _id in ids):
+        return "oid", IdColumn.pack(ids).raw
+    return "marshal", marshal.dumps([_encode_id(_id) for _id in ids])
+
+
+def save_snapshot(path: str, index: FaqIndex, source: str, last_sync: Optional[datetime], generation: int = 0):
+    """Blocking: write index (and the sync point it reflects) to path atomically."""
+    store = index.store
+    id_kind, id_data = _id_section(store.ids)
+    sections = [("ids", id_data)]
+    for name in _STR_COLUMNS:
+        if getattr(store, name) is not None:
+            sections += _str_sections(name, getattr(store, name))
+    sections += _postings_sections("postings", index.postings)
+    sections.append(("sorted_positions", index.sorted_positions))
+    bm25 = isinstance(index.lexical, Bm25Index)
+    if bm25:
+        sections += _postings_sections("bm25", index.lexical.postings)
+
+    digest, table, chunks, offset = hashlib.sha256(), {}, [], 0
+    for name, data in sections:
+        view = memoryview(data).cast("B")
+        pad = b"\0" * (-len(view) % _ALIGN)
+        dtype = data.dtype.str if isinstance(data, np.ndarray) else "|u1"
+        table[name] = [offset, len(view), dtype]
+        for chunk in (view, pad):
+            digest.update(chunk)
+            chunks.append(chunk)
+        offset += len(view) + len(pad)
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "python": list(sys.version_info[:2]),
+        "source": source,
+        "generation": generation,
+        "count": len(store),
+        "last_sync_ms": _encode_ts(last_sync),
+        "sha256": digest.hexdigest(),
+        "ids": id_kind,
+        "bm25": list(BM25_PARAMS) if bm25 else None,
+        "sections": table,
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + len(header) + 1) % _ALIGN) + b"\n"
+    _write_atomic(path, [MAGIC, header] + chunks)
+
+
+def _write_atomic(path: str, chunks: List[bytes]):
+    """Write to a temp file in the same directory, then rename it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".faq-snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def save_rules(path: str, rules: Dict[str, Any]):
+    """Blocking: write rule documents (departments, keyword settings) atomically as JSON."""
+    _write_atomic(path, [json.dumps(rules, default=str, sort_keys=True).encode("utf-8")])
+
+
+def load_rules(path: str) -> Optional[Dict[str, Any]]:
+    """The rule documents written by save_rules, or None if missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def read_header(path: str) -> Optional[dict]:
+    """Just the JSON header (cheap enough to poll); None if missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def _map(f):
+    if os.name == "nt":
+        return f.read()  # Windows can't replace a file while it is mapped
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _Sections:
+    """Typed, zero-copy views of the payload sections."""
+
+    def __init__(self, payload: memoryview, table: Dict[str, List]):
+        self.payload = payload
+        self.table = table
+
+    def raw(self, name: str) -> memoryview:
+        offset, length, _ = self.table[name]
+        if offset + length > len(self.payload):
+            raise ValueError(f"section {name} is truncated")
+        return self.payload[offset:offset + length]
+
+    def array(self, name: str) -> np.ndarray:
+        return np.frombuffer(self.raw(name), dtype=np.dtype(self.table[name][2]))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.table
+
+    def strings(self, name: str, count: int) -> StrColumn:
+        offsets = self.array(name + ".offsets")
+        blob = self.raw(name + ".blob")
+        if len(offsets) != count + 1 or (count and offsets[-1] > len(blob)):
+            raise ValueError(f"column {name} doesn't match the header")
+        return StrColumn(offsets, blob)
+
+    def postings(self, name: str) -> Postings:
+        offsets = self.array(name + ".offsets")
+        ids = self.array(name + ".ids")
+        weights = self.array(name + ".weights") if name + ".weights" in self else None
+        if offsets[-1] != len(ids) or (weights is not None and len(weights) != len(ids)):
+            raise ValueError(f"postings {name} don't match their offsets")
+        return Postings(self.strings(name + ".terms", len(offsets) - 1), offsets, ids, weights)
+
+
+def load_snapshot(path: str, source: str, lexical=None) -> Optional[Tuple[FaqIndex, Optional[datetime], int]]:
+    """
+    Return (index, last_sync, generation) stored at path, or None if it is missing, stale or corrupt.
+    `lexical` is passed on to FaqIndex, with the stored BM25 postings when they are current.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        with f:
+            data = _map(f)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("bad magic")
+        nl = data.find(b"\n", len(MAGIC))
+        header = json.loads(data[len(MAGIC):nl])
+        if header.get("version") != SNAPSHOT_VERSION or header.get("python") != list(sys.version_info[:2]):
+            logging.info("Ignoring FAQ snapshot from another format/Python version.")
+            return None
+        if header.get("source") != source:
+            logging.info("Ignoring FAQ snapshot built for another database or normalizer.")
+            return None
+        # hash and view straight from the mapping: the views keep it open, nothing is copied
+        payload = memoryview(data)[nl + 1:]
+        if hashlib.sha256(payload).hexdigest() != header.get("sha256"):
+            raise ValueError("checksum mismatch")
+        count = header["count"]
+        sections = _Sections(payload, header["sections"])
+        if header["ids"] == "oid":
+            ids = IdColumn(sections.raw("ids"))
+        else:
+            ids = [_decode_id(raw_id) for raw_id in marshal.loads(sections.raw("ids"))]
+        columns = {name: sections.strings(name, count) for name in _STR_COLUMNS
+                   if name != "a_norms" or "a_norms.offsets" in sections}
+        postings = sections.postings("postings")
+        if lexical is not None and header.get("bm25") == list(BM25_PARAMS):
+            lexical = functools.partial(lexical, postings=sections.postings("bm25"))
+        sorted_positions = sections.array("sorted_positions")
+        if len(ids) != count or len(sorted_positions) != count:
+            raise ValueError("ids / sorted positions don't match the header")
+    except Exception as e:
+        logging.warning("Ignoring unreadable FAQ snapshot %s: %s", path, e)
+        return None
+
+    last_sync = _decode_ts(header.get("last_sync_ms"))
+    # rapidfuzz scores the normalized questions as Python strings: decode just that column
+    store = FaqStore(ids, columns["questions"], list(columns["q_norms"]), columns["answers"],
+                     columns["categories"], last_sync, columns.get("a_norms"))
+    index = FaqIndex(store, postings=postings, sorted_positions=sorted_positions, lexical=lexical)
+    return index, last_sync, header.get("generation", 0)
+
+
+class LeaderLock:
+    """Non-blocking exclusive flock, held for the life of the process once acquired."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd: Optional[int] = None
+
+    @staticmethod
+    def supported() -> bool:
+        return fcntl is not None
+
+    def try_acquire(self) -> bool:
+        if self.fd is not None:
+            return True
+        if fcntl is None:
+            return False
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
@@ -0,0 +1,135 @@
+# faq_store.py
+"""
+Compact, column-oriented FAQ storage shared by the matcher, the refresher and /faqs.
+
+- One sequence per field (ids, questions, normalized questions, answers, normalized answers,
+  categories), addressed
+  by integer position, instead of one dict per FAQ plus a second dict per FAQ for the
+  normalized copy; built stores hold lists, stores loaded from a snapshot hold packed
+  columns mapped from the file (faq_columns.py) and decode a row only when it is read
+- by_id (_id -> position) is built on first use: followers that never diff against
+  Mongo never pay for it
+- Equal strings are stored once: each build shares a string pool, so answers repeated
+  across FAQs (and questions that are already normalized) cost a single object
+- Stores are immutable; a refresh builds a new store that reuses the previous one's
+  strings for every unchanged FAQ (pooled again, so rows decoded from a packed column
+  still share one object per distinct string)
+- last_sync is the newest updated_at among the docs the store was built from
+- Answers are normalized once per distinct answer and carried over from the previous store
+  (a_norms, read by faq_bm25), so a refresh only normalizes the answers that changed
+- A doc's stored q_norm is used as is when its q_norm_v matches the current normalizer
+  (see normalize.stored_q_norm); only other docs are normalized here
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+from normalize import stored_q_norm
+
+
+class _Pool(dict):
+    """Per-build string pool (sys.intern-like, but freed together with the store)."""
+
+    def __missing__(self, s):
+        self[s] = s
+        return s
+
+
+class FaqStore:
+    __slots__ = ("ids", "questions", "q_norms", "answers", "categories", "last_sync", "a_norms", "_by_id")
+
+    def __init__(self, ids: Sequence[Any], questions: Sequence[str], q_norms: Sequence[str], answers: Sequence[str],
+                 categories: Optional[Sequence[str]] = None, last_sync=None, a_norms: Optional[Sequence[str]] = None):
+        self.ids = ids
+        self.questions = questions
+        self.q_norms = q_norms
+        self.answers = answers
+        self.categories = categories if categories is not None else [""] * len(ids)
+        self.last_sync = last_sync
+        self.a_norms = a_norms  # None: answers not normalized (only for hand-built stores)
+        self._by_id: Optional[Dict[Any, int]] = None
+
+    @property
+    def by_id(self) -> Dict[Any, int]:
+        if self._by_id is None:
+            self._by_id = {_id: pos for pos, _id in enumerate(self.ids) if _id is not None}
+        return self._by_id
+
+    @classmethod
+    def from_docs(cls, docs: Iterable[Dict[str, Any]], normalize: Callable[[str], str],
+                  prev: Optional["FaqStore"] = None, last_sync=None) -> "FaqStore":
+        """
+        Build from Mongo-style docs; questions with a current stored q_norm, or already
+        normalized by prev, are not normalized again, and neither are answers prev normalized.
+        """
+        known = dict(zip(prev.questions, prev.q_norms)) if prev else {}
+        known_a = dict(zip(prev.answers, prev.a_norms)) if prev and prev.a_norms is not None else {}
+        pool = _Pool()
+        ids, questions, q_norms, answers, a_norms, categories = [], [], [], [], [], []
+        for doc in docs:
+            q = pool[doc.get("question", "")]
+            q_norm = stored_q_norm(doc)
+            if q_norm is None:
+                q_norm = known.get(q)
+                if q_norm is None:
+                    q_norm = normalize(q)
+            ids.append(doc.get("_id"))
+            questions.append(q)
+            q_norms.append(pool[q_norm])
+            a = pool[doc.get("answer", "")]
+            a_norm = known_a.get(a)
+            if a_norm is None:
+                a_norm = known_a[a] = pool[normalize(a)]
+            answers.append(a)
+            a_norms.append(a_norm)
+            categories.append(pool[doc.get("category") or ""])
+            ts = doc.get("updated_at")
+            if ts and (last_sync is None or ts > last_sync):
+                last_sync = ts
+        return cls(ids, questions, q_norms, answers, categories, last_sync, a_norms)
+
+    def with_changes(self, modified: Dict[Any, Dict[str, Any]], removed: Set[Any],
+                     normalize: Callable[[str], str]) -> "FaqStore":
+        """New store with `removed` ids dropped, `modified` docs replacing their old rows and new ones appended."""
+        fresh = FaqStore.from_docs(modified.values(), normalize, prev=self, last_sync=self.last_sync)
+        pool = _Pool()
+        ids, questions, q_norms, answers, a_norms, categories = [], [], [], [], [], []
+        for pos, _id in enumerate(self.ids):
+            if _id in removed:
+                continue
+            src, j = (fresh, fresh.by_id[_id]) if _id in fresh.by_id else (self, pos)
+            ids.append(_id)
+            questions.append(pool[src.questions[j]])
+            q_norms.append(pool[src.q_norms[j]])
+            answers.append(pool[src.answers[j]])
+            a_norms.append(pool[src.a_norms[j] if src.a_norms is not None else normalize(src.answers[j])])
+            categories.append(pool[src.categories[j]])
+        for j, _id in enumerate(fresh.ids):
+            if _id not in self.by_id:  # new FAQ
+                ids.append(_id)
+                questions.append(pool[fresh.questions[j]])
+                q_norms.append(pool[fresh.q_norms[j]])
+                answers.append(pool[fresh.answers[j]])
+                a_norms.append(pool[fresh.a_norms[j]])
+                categories.append(pool[fresh.categories[j]])
+        return FaqStore(ids, questions, q_norms, answers, categories, fresh.last_sync, a_norms)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def record(self, pos: int) -> Dict[str, Any]:
+        """A Mongo-shaped dict for one FAQ (built on demand, not stored)."""
+        out = {"question": self.questions[pos], "answer": self.answers[pos]}
+        if self.ids[pos] is not None:
+            out["_id"] = self.ids[pos]
+        return out
+
+    def same(self, doc: Dict[str, Any]) -> bool:
+        """Does doc match the stored FAQ with the same _id?"""
+        pos = self.by_id.get(doc.get("_id"))
+        if pos is None:
+            return False
+        return (self.questions[pos] == doc.get("question") and self.answers[pos] == doc.get("answer")
+                and self.categories[pos] == (doc.get("category") or ""))
+
+    def pairs(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.questions, self.answers)
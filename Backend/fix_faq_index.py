@@ -2,18 +2,27 @@
 """
 Fix faq q_norm duplicates and create a unique index safely.
 
-- Fills q_norm where missing using normalize_question(question)
-- Finds duplicate q_norm values and prints them
-- Backs up duplicate docs to `faqs_duplicates_backup`
-- Optionally deduplicates by keeping oldest (created_at) or lowest _id
+- Fills q_norm where missing or written by an older normalizer (q_norm_v, see normalize.py),
+  in bulk_write batches
+- Finds duplicate q_norm values, and the doc to keep in each group (oldest created_at,
+  then lowest _id), with a single aggregation
+- Backs up duplicate docs to `faqs_duplicates_backup` server-side ($merge), then deletes
+  the extra docs with batched delete_many
 - Creates unique index on q_norm
+- Round trips grow with the number of documents / BATCH_SIZE, not with the number of groups
+Run: python fix_faq_index.py [--dry-run]   (dry run: report only, nothing is written)
 """
 
-import os, re, sys, pprint
-from datetime import datetime
+import os, sys, time
 from dotenv import load_dotenv
-from pymongo import MongoClient, errors
-import certifi
+from pymongo import errors, UpdateOne
+from db import DB_NAME, connect_mongo
+from normalize import NORMALIZER_VERSION, normalize_text
+
+BATCH_SIZE = 1000   # docs per bulk_write / $in list
+SAMPLE_GROUPS = 20  # duplicate groups printed
+
+DRY_RUN = "--dry-run" in sys.argv[1:]
 
 load_dotenv()
 MONGO_URL = os.getenv("MONGO_URL")
@@ -21,121 +30,110 @@ if not MONGO_URL:
     print("MONGO_URL missing in .env")
     sys.exit(1)
 
-def normalize_question(q: str) -> str:
-    if not q:
-        return ""
-    s = q.lower().strip()
-    s = re.sub(r"\([^)]*\)", "", s)
-    s = re.sub(r"[^a-z0-9&\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-def connect(uri):
-    kwargs = {"serverSelectionTimeoutMS": 5000}
-    if "mongodb+srv" in uri:
-        kwargs["tlsCAFile"] = certifi.where()
-    client = MongoClient(uri, **kwargs)
-    client.admin.command("ping")
-    return client
+def chunks(items, size=BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 try:
-    client = connect(MONGO_URL)
+    client = connect_mongo(MONGO_URL)
 except Exception as e:
     print("Could not connect to MongoDB:", e)
     sys.exit(1)
 
-db = client["chatbot_db"]
+db = client[DB_NAME]
 faqs = db["faqs"]
 backup = db["faqs_duplicates_backup"]
+started = time.monotonic()
+if DRY_RUN:
+    print("DRY RUN: nothing will be written.\n")
 
-# === 1) Fill missing q_norm ===
-print("1) Normalizing missing q_norm fields...")
-res = faqs.update_many(
-    {"$or": [{"q_norm": {"$exists": False}}, {"q_norm": None}, {"q_norm": ""}]},
-    [
-        {"$set": {"q_norm": {"$trim": {"input": {"$toLower": {"$cond": [{"$ifNull": ["$question", False]}, "$question", ""]}}}}}}
-    ]
-)
-# The above uses aggregation-style update to set a trimmed lowercase question.
-# But some MongoDB servers may not support $toLower/$trim in update; use Python fallback if needed.
-print("  update_many reported matched:", res.matched_count, "modified:", res.modified_count)
-
-# If server doesn't support aggregation update pipeline for text normalization,
-# fallback to processing in Python:
-needs_fix = faqs.count_documents({"$or": [{"q_norm": {"$exists": False}}, {"q_norm": None}, {"q_norm": ""}]})
-if needs_fix > 0:
-    print(f"  {needs_fix} docs still need q_norm. Falling back to Python normalization.")
-    cursor = faqs.find({"$or": [{"q_norm": {"$exists": False}}, {"q_norm": None}, {"q_norm": ""}]})
-    bulk = []
-    for doc in cursor:
-        q = doc.get("question", "")
-        q_norm = normalize_question(q)
-        bulk.append({"_id": doc["_id"], "q_norm": q_norm})
-    for item in bulk:
-        faqs.update_one({"_id": item["_id"]}, {"$set": {"q_norm": item["q_norm"]}})
-    print("  Python fallback: normalized", len(bulk), "documents.")
+# === 1) Fill missing or outdated q_norm ===
+MISSING_Q_NORM = {"$or": [{"q_norm": {"$exists": False}}, {"q_norm": None}, {"q_norm": ""},
+                          {"q_norm_v": {"$ne": NORMALIZER_VERSION}}]}
+print(f"1) Normalizing missing or outdated q_norm fields (normalizer v{NORMALIZER_VERSION})...")
+needs_fix = faqs.count_documents(MISSING_Q_NORM)
+if DRY_RUN:
+    print(f"  {needs_fix} docs need q_norm (not included in the duplicate report below).")
+elif needs_fix:
+    # re-normalized values may collide until step 4 removes the duplicates; step 5 recreates the index
+    if "q_norm_1" in faqs.index_information():
+        faqs.drop_index("q_norm_1")
+        print("  Dropped the unique q_norm index (recreated in step 5).")
+    # stream the docs and write normalized values back in unordered bulk batches
+    done = 0
+    ops = []
+    for doc in faqs.find(MISSING_Q_NORM, {"question": 1}, batch_size=BATCH_SIZE):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"q_norm": normalize_text(doc.get("question", "")),
+                                                          "q_norm_v": NORMALIZER_VERSION}}))
+        if len(ops) >= BATCH_SIZE:
+            done += faqs.bulk_write(ops, ordered=False).modified_count
+            ops = []
+            print(f"  normalized {done}/{needs_fix}")
+    if ops:
+        done += faqs.bulk_write(ops, ordered=False).modified_count
+    print(f"  Normalized {done} documents.")
+else:
+    print("  Nothing to normalize.")
 
-# === 2) Find duplicates by q_norm ===
+# === 2) Find duplicates by q_norm (one aggregation: groups, keeper and ids to delete) ===
 print("\n2) Looking for duplicate q_norm values...")
 pipeline = [
-    {"$match": {"q_norm": {"$exists": True, "$ne": None, "$ne": ""}}},
-    {"$group": {"_id": "$q_norm", "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+    {"$match": {"q_norm": {"$nin": [None, ""]}}},
+    # keep oldest created_at (missing sorts first, as before), then lowest _id
+    {"$sort": {"created_at": 1, "_id": 1}},
+    {"$group": {"_id": "$q_norm", "count": {"$sum": 1}, "ids": {"$push": "$_id"},
+                "sample": {"$push": {"question": "$question", "created_at": "$created_at"}}}},
     {"$match": {"count": {"$gt": 1}}},
-    {"$sort": {"count": -1}}
+    {"$project": {"count": 1, "keep": {"$arrayElemAt": ["$ids", 0]},
+                  "delete": {"$slice": ["$ids", 1, {"$subtract": ["$count", 1]}]},
+                  "sample": {"$slice": ["$sample", 10]}}},
+    {"$sort": {"count": -1}},
 ]
-dups = list(faqs.aggregate(pipeline))
-if not dups:
+dup_norms, to_delete = [], []
+for i, d in enumerate(faqs.aggregate(pipeline, allowDiskUse=True)):
+    dup_norms.append(d["_id"])
+    to_delete.extend(d["delete"])
+    if i < SAMPLE_GROUPS:
+        print("  q_norm:", d["_id"], "count:", d["count"], "keep:", d["keep"])
+        for doc in d["sample"]:
+            print("    -", doc.get("question"), "| created_at:", doc.get("created_at"))
+if not dup_norms:
     print("  No duplicate q_norm values found.")
 else:
-    print(f"  Found {len(dups)} duplicate q_norm groups. Sample:")
-    for d in dups[:20]:
-        print("  q_norm:", d["_id"], "count:", d["count"])
-        # show sample docs for this group
-        docs = list(faqs.find({"q_norm": d["_id"]}, {"question":1, "answer":1, "created_at":1}).sort([("created_at",1)]).limit(10))
-        for doc in docs:
-            print("    -", doc.get("question"), "| created_at:", doc.get("created_at"))
+    print(f"  Found {len(dup_norms)} duplicate q_norm groups, {len(to_delete)} documents to delete.")
 
-# === 3) Backup duplicates ===
-if dups:
+if dup_norms and not DRY_RUN:
+    # === 3) Backup duplicates (server-side copy, existing backups are kept) ===
     print("\n3) Backing up duplicate documents to 'faqs_duplicates_backup' ...")
-    total_backup = 0
-    for d in dups:
-        docs = list(faqs.find({"q_norm": d["_id"]}))
-        if docs:
-            # insert docs into backup collection (preserve original _id)
-            try:
-                backup.insert_many(docs, ordered=False)
-                total_backup += len(docs)
-            except Exception as e:
-                # ignore duplicate key errors in backup
-                print("    Warning while backing up group", d["_id"], ":", e)
-    print(f"  Backed up approx {total_backup} documents.")
+    for n, group in enumerate(chunks(dup_norms), 1):
+        faqs.aggregate([
+            {"$match": {"q_norm": {"$in": group}}},
+            {"$merge": {"into": backup.name, "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+        ])
+        print(f"  backed up groups {min(n * BATCH_SIZE, len(dup_norms))}/{len(dup_norms)}")
+    print(f"  Backup collection now holds {backup.estimated_document_count()} documents.")
 
     # === 4) Deduplicate: keep one per q_norm (oldest created_at or lowest _id) ===
-    AUTO_COMMIT = True   # set False to only preview deletions (safe mode)
     print("\n4) Deduplicating - keeping one document per q_norm (oldest created_at or lowest _id).")
     deletions = 0
-    for d in dups:
-        docs = list(faqs.find({"q_norm": d["_id"]}).sort([("created_at", 1), ("_id", 1)]))
-        # keep the first, delete others
-        keep = docs[0]["_id"]
-        to_delete = [doc["_id"] for doc in docs[1:]]
-        if to_delete:
-            print(f"  q_norm={d['_id']} keep={keep} delete_count={len(to_delete)}")
-            if AUTO_COMMIT:
-                res = faqs.delete_many({"_id": {"$in": to_delete}})
-                deletions += res.deleted_count
+    for ids in chunks(to_delete):
+        deletions += faqs.delete_many({"_id": {"$in": ids}}).deleted_count
+        print(f"  deleted {deletions}/{len(to_delete)}")
     print(f"  Deleted {deletions} duplicate documents.")
 
 # === 5) Create unique index on q_norm ===
-print("\n5) Creating unique index on q_norm ...")
-try:
-    faqs.create_index([("q_norm", 1)], unique=True)
-    print("  Unique index on q_norm created successfully.")
-except errors.DuplicateKeyError as e:
-    print("  Failed to create unique index: duplicate keys remain. Inspect duplicates above.")
-    print(e)
-except Exception as e:
-    print("  Index creation failed:", e)
+if DRY_RUN:
+    print("\n5) Skipping unique index creation (dry run).")
+else:
+    print("\n5) Creating unique index on q_norm ...")
+    try:
+        faqs.create_index([("q_norm", 1)], unique=True)
+        print("  Unique index on q_norm created successfully.")
+    except errors.DuplicateKeyError as e:
+        print("  Failed to create unique index: duplicate keys remain. Inspect duplicates above.")
+        print(e)
+    except Exception as e:
+        print("  Index creation failed:", e)
 
-print("\n✅ Done. If anything unexpected happened, you can inspect 'faqs_duplicates_backup' for backed-up docs.")
+print(f"\n✅ Done in {time.monotonic() - started:.1f}s. If anything unexpected happened, "
+      "you can inspect 'faqs_duplicates_backup' for backed-up docs.")
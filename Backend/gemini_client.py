@@ -0,0 +1,113 @@
+# gemini_client.py
+"""
+Long-lived Gemini client for the AI tier.
+
+- One GenerativeModel per process, built once with the model name, generation config
+  (e.g. max_output_tokens, which bounds answer length and tail latency) and the
+  assistant persona as system instruction, instead of a new model per call
+- warm_up() makes a count_tokens round trip at startup: it costs no generation, but
+  opens and authenticates the gRPC channel every later call reuses, so the first user
+  after a deploy doesn't pay connection setup
+- ping() repeats that round trip; main.py calls it when the channel has been idle long
+  enough that the connection would otherwise go cold
+- The backend is just a model factory: genai.GenerativeModel in production, or e.g.
+  fake_gemini.FakeGemini(...).model_class() in tests and benchmarks (use_backend)
+All calls are blocking; main.py runs them in the AI pool / executor.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class GeminiClient:
+    def __init__(self, model_name: str, generation_config: Optional[Dict[str, Any]] = None,
+                 system_instruction: Optional[str] = None, backend: Optional[Callable[..., Any]] = None):
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or {})
+        self.system_instruction = system_instruction
+        self._backend = backend
+        self._model = None
+        self._lock = threading.Lock()
+        self.last_used = 0.0  # monotonic time of the last upstream round trip
+        self.stats = {"calls": 0, "streams": 0, "pings": 0, "warmed_up": False, "warmup_ms": None}
+
+    def use_backend(self, backend: Callable[..., Any]):
+        """Swap the model factory (e.g. for a fake); the model is rebuilt on next use."""
+        with self._lock:
+            self._backend, self._model = backend, None
+
+    @property
+    def model(self):
+        model = self._model
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    backend = self._backend
+                    if backend is None:
+                        import google.generativeai as genai  # resolved late so tests can patch it
+                        backend = genai.GenerativeModel
+                    kwargs = {}
+                    if self.generation_config:
+                        kwargs["generation_config"] = self.generation_config
+                    if self.system_instruction:
+                        kwargs["system_instruction"] = self.system_instruction
+                    self._model = backend(self.model_name, **kwargs)
+                model = self._model
+        return model
+
+    @staticmethod
+    def _options(timeout: Optional[float]):
+        return {"timeout": timeout} if timeout else None
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, max_output_tokens: Optional[int] = None) -> str:
+        """Whole answer text (raises on upstream errors). max_output_tokens overrides the default per call."""
+        self.stats["calls"] += 1
+        kwargs = {}
+        if max_output_tokens:
+            kwargs["generation_config"] = dict(self.generation_config, max_output_tokens=max_output_tokens)
+        try:
+            response = self.model.generate_content(prompt, request_options=self._options(timeout), **kwargs)
+        finally:
+            self.last_used = time.monotonic()
+        return response.text.strip() if hasattr(response, "text") else str(response)
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Answer text piece by piece; chunks without text parts (e.g. safety metadata) are skipped."""
+        self.stats["streams"] += 1
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True, request_options=self._options(timeout)):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                yield text
+        finally:
+            self.last_used = time.monotonic()
+
+    def ping(self, timeout: Optional[float] = None) -> float:
+        """One cheap round trip over the shared channel; returns its latency in seconds."""
+        started = time.monotonic()
+        try:
+            self.model.count_tokens("ping", request_options=self._options(timeout))
+        finally:
+            self.last_used = time.monotonic()
+        self.stats["pings"] += 1
+        return self.last_used - started
+
+    def warm_up(self, timeout: Optional[float] = None) -> bool:
+        """Build the model and open the connection; failures are logged, not raised."""
+        try:
+            secs = self.ping(timeout)
+        except Exception as e:
+            logging.warning("Gemini warm-up failed (%s); the first AI request will connect instead.", e)
+            return False
+        self.stats["warmed_up"] = True
+        self.stats["warmup_ms"] = round(secs * 1000, 1)
+        logging.info("Gemini client warmed up in %.0f ms (model %s).", secs * 1000, self.model_name)
+        return True
+
+    @property
+    def idle_secs(self) -> float:
+        return time.monotonic() - self.last_used if self.last_used else float("inf")
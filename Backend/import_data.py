@@ -0,0 +1,251 @@
+# import_data.py
+"""
+Streaming importer for FAQ and department data (JSONL or CSV files).
+
+- Reads records one at a time and upserts them in fixed-size chunks, so memory stays
+  bounded by --chunk-size whatever the file size
+- Each document stores a content hash; a chunk first fetches the stored hashes of its
+  keys (one round trip) and skips records whose content hasn't changed, so `updated_at`
+  only moves on real edits and incremental FAQ cache refreshes stay small
+- Chunks are written with unordered bulk_write. When some writes fail, the error's
+  details count the successful ones and only the failed ops are retried (once); a
+  chunk failing as a whole (no per-op result) is split in half and retried recursively
+- Formats by extension: .jsonl/.ndjson (one object per line), .csv (header row; list
+  columns such as tags/aliases are ';'-separated), .json (one array, loaded whole; e.g.
+  the output of mine_faq_candidates.py)
+Run: python import_data.py faqs data/faqs.jsonl [more files...] [--chunk-size 500] [--dry-run]
+     python import_data.py departments data/departments.jsonl
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne, errors
+
+from db import DB_NAME, connect_mongo
+from normalize import NORMALIZER_VERSION, normalize_text
+
+CHUNK_SIZE = 500
+CSV_LIST_SEP = ";"
+
+
+def content_hash(fields: Dict[str, Any]) -> str:
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _list(value) -> List[str]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(CSV_LIST_SEP) if v.strip()]
+    return list(value)
+
+
+# -----------------------------
+# Record -> (key, stored fields) per collection
+# -----------------------------
+def faq_fields(rec: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    q = (rec.get("question") or "").strip()
+    a = (rec.get("answer") or "").strip()
+    if not q or not a:
+        return None
+    return normalize_text(q), {
+        "question": q,
+        "answer": a,
+        "category": (rec.get("category") or "general").strip(),
+        "tags": _list(rec.get("tags")),
+    }
+
+
+def department_fields(rec: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    dept_id = (rec.get("dept_id") or "").strip()
+    if not dept_id:
+        return None
+    hod = rec.get("hod")
+    if hod is None:  # CSV: flat hod_* columns
+        hod = {k: rec.get(f"hod_{k}") or None for k in ("name", "email", "phone", "profile_url")}
+    fields = {
+        "name": rec.get("name"),
+        "aliases": _list(rec.get("aliases")),  # DepartmentMatcher tokenizes these itself ("&" == "and")
+        "hod": hod,
+        "address": rec.get("address") or None,
+        "maps_url": rec.get("maps_url") or None,
+        "notes": rec.get("notes") or "",
+    }
+    for extra in ("email", "phone"):
+        if rec.get(extra):
+            fields[extra] = rec[extra]
+    return dept_id, fields
+
+
+KINDS = {
+    # kind: (collection, key field, record builder, fields stored with every write)
+    "faqs": ("faqs", "q_norm", faq_fields, {"q_norm_v": NORMALIZER_VERSION}),  # see normalize.stored_q_norm
+    "departments": ("departments", "dept_id", department_fields, {}),
+}
+
+
+# -----------------------------
+# Readers
+# -----------------------------
+def read_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(line/record number, record) from a .jsonl/.ndjson, .csv or .json file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="" if ext == ".csv" else None) as f:
+        if ext == ".csv":
+            for n, row in enumerate(csv.DictReader(f), 2):
+                yield n, row
+        elif ext == ".json":
+            for n, rec in enumerate(json.load(f), 1):
+                yield n, rec
+        else:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if line:
+                    yield n, json.loads(line)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+def write_bisect(coll, ops: List[UpdateOne], keys: List[str], stats: Dict[str, int], retry: bool = True):
+    """
+    bulk_write the ops (unordered). A BulkWriteError says which ops failed: the rest are
+    counted from its details and only the failed ones are retried, once. Other failures
+    (e.g. a dropped connection) give no per-op result: retry each half, down to single ops
+    (upserts are idempotent).
+    """
+    try:
+        res = coll.bulk_write(ops, ordered=False)
+        stats["upserted"] += res.upserted_count
+        stats["modified"] += res.modified_count
+        stats["round_trips"] += 1
+    except errors.BulkWriteError as e:
+        stats["round_trips"] += 1
+        details = e.details or {}
+        stats["upserted"] += details.get("nUpserted", 0)
+        stats["modified"] += details.get("nModified", 0)
+        failed = {err["index"]: err for err in details.get("writeErrors", [])}
+        if retry and failed:
+            idx = sorted(failed)
+            write_bisect(coll, [ops[i] for i in idx], [keys[i] for i in idx], stats, retry=False)
+            return
+        for i, err in sorted(failed.items()):
+            stats["failed"] += 1
+            print(f"  failed: {keys[i]!r}: {err.get('errmsg', err)}")
+    except errors.PyMongoError as e:
+        stats["round_trips"] += 1
+        if len(ops) == 1:
+            stats["failed"] += 1
+            print(f"  failed: {keys[0]!r}: {e}")
+            return
+        mid = len(ops) // 2
+        write_bisect(coll, ops[:mid], keys[:mid], stats, retry)
+        write_bisect(coll, ops[mid:], keys[mid:], stats, retry)
+
+
+def import_chunk(coll, key_field: str, stamp: Dict[str, Any], chunk: List[Tuple[str, Dict[str, Any]]],
+                 source: str, stats: Dict[str, int], dry_run: bool):
+    latest = dict(chunk)  # a key repeated within the chunk: the last record wins
+    hash_fields = {key_field: 1, "content_hash": 1, **{f: 1 for f in next(iter(latest.values()))},
+                   **{f: 1 for f in stamp}}
+    stored = {d[key_field]: d for d in coll.find({key_field: {"$in": list(latest)}}, hash_fields)}
+    stats["round_trips"] += 1
+
+    now = datetime.utcnow()
+    ops, keys = [], []
+    for key, fields in latest.items():
+        h = content_hash(fields)
+        doc = stored.get(key)
+        if doc is not None:
+            old = doc.get("content_hash") or content_hash({f: doc.get(f) for f in fields})
+            if old == h:
+                stats["unchanged"] += 1
+                if not doc.get("content_hash") or any(doc.get(f) != v for f, v in stamp.items()):
+                    # documents written before hashing (or before q_norm_v): record the hash and the
+                    # stamp without touching updated_at, so readers stop treating them as stale
+                    ops.append(UpdateOne({key_field: key}, {"$set": dict(stamp, content_hash=h)}))
+                    keys.append(key)
+                continue
+        stats["changed"] += 1
+        ops.append(UpdateOne(
+            {key_field: key},
+            {"$set": dict(fields, **stamp, **{key_field: key, "content_hash": h, "source": source, "updated_at": now}),
+             "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        ))
+        keys.append(key)
+    if ops and not dry_run:
+        write_bisect(coll, ops, keys, stats)
+
+
+def import_files(db, kind: str, paths: List[str], chunk_size: int = CHUNK_SIZE, source: str = "import",
+                 dry_run: bool = False) -> Dict[str, int]:
+    coll_name, key_field, build, stamp = KINDS[kind]
+    coll = db[coll_name]
+    if not dry_run:
+        coll.create_index([(key_field, 1)], unique=True)
+    stats = {"read": 0, "invalid": 0, "changed": 0, "unchanged": 0, "upserted": 0, "modified": 0,
+             "failed": 0, "round_trips": 0}
+
+    def records():
+        for path in paths:
+            for n, rec in read_records(path):
+                stats["read"] += 1
+                built = build(rec)
+                if built is None:
+                    stats["invalid"] += 1
+                    print(f"  skipped {path}:{n}: missing required fields")
+                    continue
+                yield built
+
+    for i, chunk in enumerate(chunked(records(), chunk_size), 1):
+        import_chunk(coll, key_field, stamp, chunk, source, stats, dry_run)
+        print(f"  chunk {i}: read {stats['read']}, changed {stats['changed']}, unchanged {stats['unchanged']}")
+    return stats
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("kind", choices=sorted(KINDS))
+    p.add_argument("files", nargs="+", help=".jsonl/.ndjson, .csv or .json files")
+    p.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    p.add_argument("--source", default="import", help="value stored in each changed document's `source`")
+    p.add_argument("--dry-run", action="store_true", help="compare against the database without writing")
+    return p.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    load_dotenv()
+    mongo_url = os.getenv("MONGO_URL")
+    if not mongo_url:
+        raise ValueError("MONGO_URL not found in .env. Please add it to your .env file.")
+    db = connect_mongo(mongo_url)[DB_NAME]
+    print(f"Importing {args.kind} from {', '.join(args.files)}{' (dry run)' if args.dry_run else ''}...")
+    stats = import_files(db, args.kind, args.files, args.chunk_size, args.source, args.dry_run)
+    print("Done:", ", ".join(f"{k}={v}" for k, v in stats.items()))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,8 +1,9 @@
 # insert_contact.py
-from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
 
+from db import DB_NAME, connect_mongo
+
 # -----------------------------
 # Load environment variables
 # -----------------------------
@@ -17,16 +18,21 @@ admin_contact = {
     "email": "rajesh.kumar@gat.ac.in"
 }
 
+_client = None  # one pooled client per process, created on first use
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = connect_mongo(MONGO_URL, maxPoolSize=2)
+    return _client
+
 def insert_admin_contact():
     """
-    Safely connect to local MongoDB and insert admin contact.
+    Safely connect to MongoDB and insert admin contact.
     This function is called manually from main.py after MongoDB is connected.
     """
     try:
-        # Local MongoDB → no TLS/SSL
-        client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
-        db = client["chatbot_db"]
-        contacts = db["contacts"]
+        contacts = get_client()[DB_NAME]["contacts"]
 
         contacts.delete_many({})  # clear old entries
         contacts.insert_one(admin_contact)
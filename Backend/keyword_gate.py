@@ -0,0 +1,52 @@
+# keyword_gate.py
+"""
+Token-aware "is this about the college?" gate in front of the Gemini path.
+
+- Keywords are compiled once (and again on refresh) from the settings collection,
+  falling back to DEFAULT_COLLEGE_KEYWORDS
+- Matching works on the query's normalized tokens (the same tokens the FAQ
+  matcher uses), so "ai" no longer fires inside "said" nor "ml" inside "html"
+- A trailing plural "s" is folded ("fees" -> "fee"); multi-word keywords go
+  through the same token automaton as the department matcher
+"""
+
+from typing import Callable, Iterable, List, Optional
+
+from dept_matcher import TokenAutomaton
+
+DEFAULT_COLLEGE_KEYWORDS = [
+    "college", "admission", "fee", "course", "department", "faculty",
+    "placement", "exam", "hod", "cse", "ece", "ise", "ai", "ml", "mba",
+    "hostel", "transport", "canteen", "library", "scholarship",
+]
+
+KEYWORDS_SETTING_ID = "college_keywords"  # settings doc: {"_id": ..., "keywords": [...]}
+
+
+class KeywordGate:
+    def __init__(self, keywords: Iterable[str], normalize: Callable[[str], str]):
+        self.keywords = list(keywords)
+        self.words = set()
+        self.phrases = TokenAutomaton()
+        self.has_phrases = False
+        for kw in self.keywords:
+            toks = normalize(kw).split()
+            if len(toks) == 1:
+                self.words.add(toks[0])
+            elif toks:
+                self.has_phrases |= self.phrases.add(toks, kw)
+        self.phrases.build()
+
+    def matched_keyword(self, tokens: List[str]) -> Optional[str]:
+        """The first keyword found in the (normalized) tokens, or None."""
+        for tok in tokens:
+            if tok in self.words:
+                return tok
+            if len(tok) > 3 and tok.endswith("s") and tok[:-1] in self.words:
+                return tok[:-1]
+        if self.has_phrases:
+            return self.phrases.search(tokens)
+        return None
+
+    def matches(self, tokens: List[str]) -> bool:
+        return self.matched_keyword(tokens) is not None
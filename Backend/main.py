@@ -1,20 +1,38 @@
 # main.py (optimized for lower latency)
 import os
 import re
+import functools
 import logging
 import asyncio
+import hashlib
+import json
+import time
+from contextlib import aclosing
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from pymongo import MongoClient
-import certifi
 import google.generativeai as genai
-from rapidfuzz import fuzz
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
 from insert_contact import admin_contact
-from typing import List, Dict, Any
+from db import DB_NAME, Database
+from faq_bm25 import Bm25Index
+from faq_index import FaqIndex
+from faq_store import FaqStore
+from faq_payload import CursorError, FaqPayloadCache, etag_matches
+from faq_snapshot import LeaderLock, load_rules, load_snapshot, read_header, save_rules, save_snapshot
+from dept_matcher import DepartmentMatcher, DEFAULT_DEPARTMENTS
+from keyword_gate import KeywordGate, DEFAULT_COLLEGE_KEYWORDS, KEYWORDS_SETTING_ID
+from answer_cache import AnswerCache, MongoAnswerStore
+from ai_batcher import MicroBatcher, build_batch_prompt, parse_numbered_answers
+from ai_dispatch import AIDispatcher, DeadlineExceeded
+from gemini_client import GeminiClient
+from circuit_breaker import CircuitBreaker, LatencyTracker
+from normalize import NORMALIZER_VERSION, normalize_query, normalize_text
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from query_log import QueryLog, ensure_indexes as ensure_query_log_indexes
+from typing import List, Dict, Any, Optional, Tuple
 
 # -----------------------------
 # Logging setup
@@ -33,9 +51,50 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # -----------------------------
 FAQ_REFRESH_INTERVAL = 60  # seconds: refresh in-memory FAQ cache from DB occasionally
 FAQ_MATCH_THRESHOLD = 70
-AI_CACHE_SIZE = 512
-AI_TIMEOUT_SECS = 4.0     # bound external AI latency (adjust to trade-off completeness vs speed)
-THREAD_POOL_WORKERS = 6   # threadpool for blocking operations (Gemini, DB fallback)
+FAQ_SCORE_FLOOR = 50  # best FAQ scores below this aren't told apart (metrics only; keeps matching cheap)
+# BM25 tier for college-related questions the fuzzy FAQ match missed, before Gemini (confidence is 0..1, see faq_bm25.Bm25Index.confidence)
+FAQ_BM25 = os.getenv("FAQ_BM25", "1") == "1"
+BM25_ANSWER_CONFIDENCE = 0.85  # answer straight from the top FAQ at or above this...
+BM25_ANSWER_MIN_TERMS = 2      # ...when it shares at least this many informative (non-stop-word) query terms...
+BM25_ANSWER_MIN_SCORE = 6.0    # ...and its raw BM25 score reaches this
+BM25_CONTEXT_MIN = 0.3         # FAQs at or above this go to Gemini as grounding context
+BM25_CONTEXT_TOP_K = 3
+BM25_CONTEXT_CHARS = 300       # per-FAQ answer excerpt in the prompt
+# on-disk copy of the built FAQ index: workers serve from it at boot and reconcile with Mongo after
+# shared mode: one worker per host refreshes from Mongo and rewrites the snapshot; the others follow it
+FAQ_SHARED_INDEX = os.getenv("FAQ_SHARED_INDEX", "0") == "1"
+FAQ_SHARED_POLL_SECS = 2.0  # how often follower workers check the snapshot generation
+FAQ_SNAPSHOT_PATH = os.getenv("FAQ_SNAPSHOT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_index.snapshot"))
+AI_CACHE_SIZE = 512       # in-memory tier of the AI answer cache
+AI_CACHE_TTL_SECS = 24 * 3600   # answers persist in Mongo (shared by all workers) this long
+AI_NEGATIVE_TTL_SECS = 60       # errors/empty answers are only cached briefly
+AI_TIMEOUT_SECS = 4.0     # upper bound on an AI answer, queueing included (adjust to trade-off completeness vs speed)
+AI_TIMEOUT_MIN_SECS = 1.0       # adaptive timeout never goes below this
+AI_TIMEOUT_P95_FACTOR = 1.5     # adaptive timeout of one Gemini call = factor * rolling p95 of Gemini latency
+AI_TIMEOUT_MIN_SAMPLES = 20     # use the fixed AI_TIMEOUT_SECS until this many latencies are observed
+AI_BREAKER_FAILURES = 5         # consecutive failures/timeouts that open the circuit
+AI_BREAKER_RESET_SECS = 30.0    # how long the circuit stays open before a probe call
+FAQS_PAGE_MAX = 500             # largest /faqs page (omit `limit` for the whole corpus)
+BATCH_MAX_MESSAGES = 5000      # /chat/batch request size limit
+BATCH_AI_CONCURRENCY = 4        # AI-bound questions of one batch in flight at once (leaves room for /chat)
+AI_STREAM_TIMEOUT_SECS = 30.0   # whole-answer bound for /chat/stream (first chunk still due within the AI timeout)
+THREAD_POOL_WORKERS = 6   # threadpool for blocking operations (DB refresh, fallbacks)
+AI_POOL_WORKERS = 6       # threads serving live Gemini calls
+AI_QUEUE_SIZE = 64        # hard ceiling on Gemini calls waiting for a thread (admission is by deadline, see ai_dispatch)
+AI_ABANDON_HEADROOM = 4   # extra threads absorbing calls whose callers already timed out
+# micro-batching: AI-bound questions arriving together share one numbered multi-question Gemini call
+AI_BATCH = os.getenv("AI_BATCH", "0") == "1"
+AI_BATCH_WINDOW_SECS = float(os.getenv("AI_BATCH_WINDOW_SECS", "0.05"))  # longest a question waits for company
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "8"))           # flush as soon as this many are waiting
+# Gemini client: one model per process, warmed up at startup
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "512"))  # bounds answer length + tail latency
+GEMINI_TEMPERATURE = os.getenv("GEMINI_TEMPERATURE")  # unset = model default
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "genai")  # "fake": local fake_gemini backend (tests, no API key)
+GEMINI_WARMUP_TIMEOUT_SECS = 5.0
+GEMINI_KEEPALIVE_SECS = 240.0   # ping the channel after this long without Gemini traffic
+QUERY_LOG_FLUSH_SECS = 2.0      # background bulk-insert interval of the query log
+QUERY_LOG_TTL_DAYS = int(os.getenv("QUERY_LOG_TTL_DAYS", "30"))
 
 # -----------------------------
 # Thread pool for blocking tasks
@@ -43,39 +102,39 @@ THREAD_POOL_WORKERS = 6   # threadpool for blocking operations (Gemini, DB fallb
 executor = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS)
 
 # -----------------------------
-# MongoDB setup (synchronous)
+# Metrics (served on /metrics in Prometheus text format)
 # -----------------------------
-class InMemoryCollection:
-    def __init__(self, docs=None):
-        self.docs = docs or []
-    def find(self, *args, **kwargs): return list(self.docs)
-    def insert_many(self, docs): self.docs.extend(docs)
-    def delete_many(self, _): self.docs = []
-    def count_documents(self, query): return len(self.docs)
+metrics = Registry()
+stage_seconds = metrics.histogram("chatbot_stage_seconds", "Time spent in each pipeline stage.", label="stage")
+responses_by_source = metrics.counter("chatbot_responses_total", "Answers sent, by source.", label="source")
+faq_best_score = metrics.histogram(
+    "chatbot_faq_best_score", f"Best FAQ match score per query (0 = below {FAQ_SCORE_FLOOR}).",
+    buckets=[FAQ_SCORE_FLOOR - 1, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100, 105])
 
-client = db = faqs_coll = contacts = None
-faqs_cache: List[Dict[str, Any]] = []  # in-memory cached FAQ documents (list of dicts)
-faqs_cache_normalized: List[Dict[str, Any]] = []  # with normalized question precomputed
+# -----------------------------
+# MongoDB setup (sync client for startup + worker threads, async client for the event loop)
+# -----------------------------
+# the sync pool serves the executor and the Gemini threads (AI answer cache reads/writes)
+mongo = Database(MONGO_URL, sync_pool_size=THREAD_POOL_WORKERS + AI_POOL_WORKERS + AI_ABANDON_HEADROOM)
 
 if not MONGO_URL:
     logging.warning("MONGO_URL not set. Using in-memory fallback.")
-    faqs_coll = InMemoryCollection([])
-    contacts = InMemoryCollection([])
-else:
-    try:
-        kwargs = {"serverSelectionTimeoutMS": 5000}
-        if "mongodb+srv" in MONGO_URL:
-            kwargs["tlsCAFile"] = certifi.where()
-        client = MongoClient(MONGO_URL, **kwargs)
-        client.admin.command("ping")
-        db = client["chatbot_db"]
-        faqs_coll = db["faqs"]
-        contacts = db["contacts"]
-        logging.info("Connected to MongoDB.")
-    except Exception as e:
-        logging.exception("MongoDB connection failed. Using fallback.")
-        faqs_coll = InMemoryCollection([])
-        contacts = InMemoryCollection([])
+elif mongo.connect():
+    logging.info("Connected to MongoDB.")
+
+faqs_coll = mongo["faqs"]
+contacts = mongo["contacts"]
+departments_coll = mongo["departments"]
+settings_coll = mongo["settings"]
+ai_cache_coll = None if mongo.in_memory else mongo["ai_cache"]
+
+# answered questions, buffered in memory and bulk-inserted by a background task (never on the request path)
+query_log = QueryLog()
+if not mongo.in_memory:
+    ensure_query_log_indexes(mongo["query_log"], QUERY_LOG_TTL_DAYS * 24 * 3600)
+
+faqs_cache: FaqStore = FaqStore([], [], [], [])  # in-memory cached FAQs (columnar, by position)
+faq_index: FaqIndex = None  # inverted token index over faqs_cache
 
 # -----------------------------
 # Admin info
@@ -92,237 +151,895 @@ if GEMINI_API_KEY:
         logging.info("Configured Gemini client.")
     except Exception as e:
         logging.warning("Gemini setup failed: %s", e)
-else:
+elif GEMINI_BACKEND != "fake":
     logging.warning("GEMINI_API_KEY not set. AI responses will not work.")
 
+GEMINI_SYSTEM_PROMPT = (
+    "You are the college assistant of Global Academy of Technology (GAT), Bengaluru. "
+    "Answer questions about the college briefly and in plain text."
+)
+generation_config = {"max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS}
+if GEMINI_TEMPERATURE:
+    generation_config["temperature"] = float(GEMINI_TEMPERATURE)
+gemini = GeminiClient(GEMINI_MODEL, generation_config, GEMINI_SYSTEM_PROMPT)
+if GEMINI_BACKEND == "fake":
+    from fake_gemini import FakeGemini
+    gemini.use_backend(FakeGemini().model_class())
+    logging.info("Using the local fake Gemini backend.")
+
 # -----------------------------
 # Utilities
 # -----------------------------
-def _normalize_text(s: str) -> str:
-    s = (s or "").lower().strip()
-    s = re.sub(r"\([^)]*\)", "", s)
-    s = re.sub(r"[^a-z0-9\s]", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
+class Query:
+    """A user question normalized and tokenized once, shared by every pipeline stage."""
+    __slots__ = ("text", "norm", "tokens", "grounding")
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.norm = normalize_query(self.text)  # memoized: popular questions repeat
+        self.tokens = self.norm.split()
+        self.grounding = ""  # FAQ excerpts for the Gemini prompt (set by the BM25 tier)
+
+_MARKDOWN_CHARS = re.compile(r"[*_#`>~]")
+_WHITESPACE = re.compile(r"\s+")
 
 def clean_ai_text(text: str) -> str:
     """Remove common markdown and weird characters from AI output."""
-    text = re.sub(r"[*_#`>~]", "", text or "")
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _MARKDOWN_CHARS.sub("", text or "")
+    text = _WHITESPACE.sub(" ", text).strip()
     return text
+
+class StreamingTextCleaner:
+    """Incremental clean_ai_text: joining the fed pieces gives clean_ai_text(full text)."""
+    def __init__(self):
+        self.started = False
+        self.pending_space = False  # whitespace seen after the last emitted text
+
+    def feed(self, chunk: str) -> str:
+        text = _MARKDOWN_CHARS.sub("", chunk or "")
+        if not text:
+            return ""
+        core = _WHITESPACE.sub(" ", text).strip()
+        if not core:
+            self.pending_space = self.started
+            return ""
+        sep = " " if self.started and (self.pending_space or text[0].isspace()) else ""
+        self.started = True
+        self.pending_space = text[-1].isspace()
+        return sep + core
+
+
+# -----------------------------
+# Department / HOD rules (compiled from the departments collection)
+# -----------------------------
+DEPT_FIELDS = {"dept_id": 1, "name": 1, "aliases": 1, "hod": 1, "email": 1, "phone": 1, "address": 1, "maps_url": 1}
+
+def build_dept_matcher(docs: List[Dict[str, Any]]) -> DepartmentMatcher:
+    """Compile the matcher from department docs, or from DEFAULT_DEPARTMENTS when there are none."""
+    return DepartmentMatcher(docs or DEFAULT_DEPARTMENTS)
+
+def load_departments():
+    global dept_matcher
+    try:
+        dept_matcher = build_dept_matcher(list(departments_coll.find({}, DEPT_FIELDS)))
+        logging.info("Compiled %d departments into the HOD matcher.", len(dept_matcher))
+    except Exception as e:
+        logging.exception("Failed to load departments: %s", e)
+        dept_matcher = DepartmentMatcher(DEFAULT_DEPARTMENTS)
+
+dept_matcher: DepartmentMatcher = None
+load_departments()
+
 def handle_hod_query(question: str):
     """
-    Return HOD information for department-related queries.
-    Uses an ordered list of (keywords, answer) entries; the first matching
-    entry is returned. Matching is case-insensitive substring search.
+    Return HOD information (or another department fact: email, phone, address)
+    for department-related queries. One automaton pass over the query's tokens;
+    the longest matching department alias wins.
     """
     if not question:
         return None
-
-    q = question.lower()
-
-    # quick bail: if the user didn't ask about HOD at all, still allow match
-    # (sometimes users ask 'who is cse ai ml head' without the word 'hod')
-    # If you want to require the word 'hod' or 'head', uncomment the next lines:
-    # if not any(w in q for w in ("hod", "head", "who is", "who's", "leader")):
-    #     return None
-
-    # Ordered: most specific to generic. Each entry is ( [keywords], "Answer string" )
-    hod_entries = [
-        (["cse (ai & ml)", "cse (ai & ml)", "cse ai ml", "cse ai&ml", "cse ai", "ai & ml", "ai ml", "aiml", "ai&ml", "ai and ml", "artificial intelligence and machine learning", "artificial intelligence machine learning"],
-         "Dr. Chandramma R. is the HOD of the Computer Science & Engineering (AI & ML) Department. (GAT)"),
-        (["cse (ai & ds)", "cse ai ds", "ai & ds", "ai ds", "artificial intelligence & data science", "artificial intelligence and data science", "ai and ds"],
-         "Dr. Girish Rao Salanke N S is Professor & Acting Head of AI & DS (CSE). (GAT)"),
-        (["cse", "computer science", "computer science & engineering"],
-         "Dr. Kumaraswamy S. is the HOD of the Computer Science & Engineering Department. (GAT)"),
-        (["ise", "information science", "information science & engineering"],
-         "Dr. Kiran Y. C. is the HOD of the Information Science & Engineering Department. (GAT)"),
-        (["ece", "electronics", "electronics & communication", "electronics & communication engineering"],
-         "Dr. Madhavi Mallam is the HOD of the Electronics & Communication Engineering Department. (GAT)"),
-        (["eee", "electrical", "electrical & electronics", "electrical & electronics engineering"],
-         "Dr. Deepika Masand is the HOD of the Electrical & Electronics Engineering Department. (GAT)"),
-        (["mechanical", "mechanical engineering"],
-         "Dr. Bharat Vinjamuri is the HOD of the Mechanical Engineering Department. (GAT)"),
-        (["civil", "civil engineering"],
-         "Dr. Allamaprabhu Kamatagi is the HOD of the Civil Engineering Department. (GAT)"),
-        (["aeronautical", "aeronautical engineering"],
-         "Dr. Bino Prince Raja D. is listed as HOD for Aeronautical Engineering in GAT faculty/NIRF data. (GAT)"),
-        (["ai & ds", "ai ds", "artificial intelligence & data science", "ai and ds"],
-         "Dr. Girish Rao Salanke N S is the HOD of the Artificial Intelligence & Data Science (AI & DS) UG program. (GAT)"),
-        (["aiml", "ai ml", "ai & ml", "artificial intelligence & machine learning"],
-         "Dr. Chandramma R. is the HOD of the Artificial Intelligence & Machine Learning (AIML) UG program / CSE AI & ML. (GAT)"),
-        (["math", "mathematics"],
-         "Dr. Rupa K. is the HOD of the Department of Mathematics. (GAT)"),
-        (["chemistry"],
-         "Dr. Remya P. Narayanan is the HOD of the Department of Chemistry. (GAT)"),
-        (["physics"],
-         "Dr. N. V. Raju is the HOD of the Department of Physics. (GAT)"),
-        (["mba", "management", "management studies"],
-         "Dr. Sanjeev Kumar Thalari is the HOD of Management Studies (MBA). (GAT)"),
-    ]
-
-    # Normalize spaces and punctuation for the query to improve matching
-    q_norm = re.sub(r"[^\w\s&]", " ", q)  # keep '&' and alphanumerics, replace other punctuation
-    q_norm = re.sub(r"\s+", " ", q_norm).strip()
-
-    # Check entries in order and return the first matching answer
-    for keys, answer in hod_entries:
-        for key in keys:
-            key_norm = key.lower().strip()
-            if key_norm and key_norm in q_norm:
-                return answer
-
-    return None
+    return dept_matcher.answer(question)
 
 # -----------------------------
 # FAQ cache + refresh
 # -----------------------------
+FAQ_FIELDS = {"question": 1, "answer": 1, "category": 1, "updated_at": 1, "q_norm": 1, "q_norm_v": 1}
+faqs_last_sync = None  # newest updated_at seen; refreshes only fetch docs changed since then
+FAQ_LEXICAL = functools.partial(Bm25Index, normalize=normalize_text) if FAQ_BM25 else None
+
+def build_faq_index(store: FaqStore) -> FaqIndex:
+    """Blocking: fuzzy index plus the BM25 index over the same store."""
+    return FaqIndex(store, lexical=FAQ_LEXICAL)
+
+def _install_faq_index(index: FaqIndex, last_sync=None):
+    """Swap in a freshly built index. Only called on the event loop thread, so readers never see a mix."""
+    global faqs_cache, faq_index, faqs_last_sync
+    faqs_cache, faq_index = index.store, index
+    faqs_last_sync = index.store.last_sync if last_sync is None else last_sync
+
 def load_faqs_into_cache():
-    global faqs_cache, faqs_cache_normalized
     try:
         logging.debug("Loading FAQs into memory...")
         # fetch minimal fields
-        raw = list(faqs_coll.find({}, {"question": 1, "answer": 1})) if hasattr(faqs_coll, "find") else list(faqs_coll)
-        faqs_cache = raw or []
-        # precompute normalized question and small structures for faster scoring
-        faqs_cache_normalized = []
-        for doc in faqs_cache:
-            q = doc.get("question", "")
-            faqs_cache_normalized.append({
-                "orig": doc,
-                "q_norm": _normalize_text(q),
-                "answer": doc.get("answer", "")
-            })
-        logging.info("Loaded %d FAQs into memory.", len(faqs_cache_normalized))
+        raw = list(faqs_coll.find({}, FAQ_FIELDS)) if hasattr(faqs_coll, "find") else list(faqs_coll)
+        # precompute normalized questions + token index for faster scoring
+        _install_faq_index(build_faq_index(FaqStore.from_docs(raw or [], normalize_text)))
+        logging.info("Loaded %d FAQs into memory (%d index tokens).", len(faq_index), len(faq_index.postings))
     except Exception as e:
         logging.exception("Failed to load FAQs into cache: %s", e)
-        faqs_cache = []
-        faqs_cache_normalized = []
+        _install_faq_index(build_faq_index(FaqStore([], [], [], [])))
+
+def _snapshot_enabled() -> bool:
+    # in-memory fallback data isn't worth snapshotting, and can't be reconciled against
+    return bool(FAQ_SNAPSHOT_PATH) and not mongo.in_memory
+
+def _snapshot_source() -> str:
+    # snapshots are only valid for the same database and normalization algorithm
+    tag = f"{MONGO_URL}|{DB_NAME}.faqs|norm{NORMALIZER_VERSION}"
+    return hashlib.sha256(tag.encode("utf-8")).hexdigest()[:16]
+
+faq_generation = 0  # generation of the snapshot this process last wrote or loaded
+faq_role = "standalone"  # shared mode: "leader" (refreshes from Mongo) or "follower" (reloads snapshots)
+faq_leader_lock = LeaderLock(FAQ_SNAPSHOT_PATH + ".lock") if FAQ_SNAPSHOT_PATH else None
+
+def save_faq_snapshot(index: FaqIndex, last_sync):
+    """Blocking: persist the index for the next boot (and for followers); failures only cost startup time."""
+    global faq_generation
+    try:
+        prev = read_header(FAQ_SNAPSHOT_PATH) or {}
+        generation = max(prev.get("generation", 0), faq_generation) + 1
+        save_snapshot(FAQ_SNAPSHOT_PATH, index, _snapshot_source(), last_sync, generation)
+        faq_generation = generation
+        logging.info("Wrote FAQ snapshot generation %d (%d FAQs) to %s.", generation, len(index), FAQ_SNAPSHOT_PATH)
+    except Exception as e:
+        logging.warning("Could not write FAQ snapshot: %s", e)
+
+def load_faq_snapshot() -> bool:
+    """Blocking: install the on-disk snapshot if it is valid."""
+    global faq_generation
+    loaded = load_snapshot(FAQ_SNAPSHOT_PATH, _snapshot_source(), FAQ_LEXICAL)
+    if loaded is None:
+        return False
+    index, last_sync, faq_generation = loaded
+    _install_faq_index(index, last_sync)
+    return True
+
+faqs_need_reconcile = False  # True when serving from a snapshot that Mongo hasn't confirmed yet
+
+def load_faqs_on_startup():
+    """Serve from a valid snapshot right away (reconciled in the background), else load from Mongo."""
+    global faqs_need_reconcile, faq_role
+    if FAQ_SHARED_INDEX and _snapshot_enabled():
+        if not LeaderLock.supported():
+            logging.warning("FAQ_SHARED_INDEX needs flock (POSIX); every worker will refresh on its own.")
+        else:
+            faq_role = "leader" if faq_leader_lock.try_acquire() else "follower"
+            logging.info("Shared FAQ index mode: this worker is the %s.", faq_role)
+    if _snapshot_enabled() and load_faq_snapshot():
+        # followers trust the leader's snapshot; everyone else catches up with Mongo in the background
+        faqs_need_reconcile = faq_role != "follower"
+        logging.info("Loaded %d FAQs from snapshot generation %d.", len(faq_index), faq_generation)
+        return
+    # no usable snapshot yet (first boot): a one-off full load, even for followers
+    load_faqs_into_cache()
+    if _snapshot_enabled() and faq_role != "follower" and len(faq_index):
+        save_faq_snapshot(faq_index, faqs_last_sync)
+
+async def build_refreshed_faq_index(current: FaqIndex, since) -> Optional[FaqIndex]:
+    """
+    Fetch only FAQs changed since `since` (async driver, never blocks the loop) and build
+    a new index in the executor. Returns None when nothing changed.
+    """
+    coll = mongo.aio("faqs")
+    loop = asyncio.get_running_loop()
+    store = current.store
+    live_ids = {d.get("_id") for d in await coll.find({}, {"_id": 1}).to_list(None)}
+    if None in live_ids:
+        # docs without _id can't be diffed; rebuild, reusing normalized questions
+        docs = await coll.find({}, FAQ_FIELDS).to_list(None)
+        if len(docs) == len(store) and all(
+                d.get("question") == q and d.get("answer") == a for d, (q, a) in zip(docs, store.pairs())):
+            return None
+        new_store = await loop.run_in_executor(executor, FaqStore.from_docs, docs, normalize_text, store)
+        return await loop.run_in_executor(executor, build_faq_index, new_store)
+
+    # $gte: docs written in the same instant as the last sync are re-checked (and skipped if unchanged)
+    query = {"updated_at": {"$gte": since}} if since else {}
+    changed = {d["_id"]: d for d in await coll.find(query, FAQ_FIELDS).to_list(None)}
+    unseen = live_ids - store.by_id.keys() - changed.keys()
+    if unseen:  # inserted without updated_at
+        more = await coll.find({"_id": {"$in": list(unseen)}}, FAQ_FIELDS).to_list(None)
+        changed.update({d["_id"]: d for d in more})
+    removed = store.by_id.keys() - live_ids
+    modified = {_id: d for _id, d in changed.items() if not store.same(d)}
+    if not modified and not removed:
+        return None
+
+    logging.info("FAQ refresh: %d changed, %d removed.", len(modified), len(removed))
+    new_store = await loop.run_in_executor(executor, store.with_changes, modified, removed, normalize_text)
+    return await loop.run_in_executor(executor, build_faq_index, new_store)
+
+async def refresh_faqs_async():
+    loop = asyncio.get_running_loop()
+    new_index = await build_refreshed_faq_index(faq_index, faqs_last_sync)
+    if new_index is not None:
+        # a full rebuild (no _ids) may see no updated_at at all: never move the sync point back
+        stamps = [ts for ts in (new_index.store.last_sync, faqs_last_sync) if ts]
+        _install_faq_index(new_index, max(stamps) if stamps else None)
+        logging.info("Swapped in refreshed FAQ index (%d FAQs).", len(new_index))
+        await warm_faq_payload()
+        if _snapshot_enabled():
+            await loop.run_in_executor(executor, save_faq_snapshot, new_index, faqs_last_sync)
+
+async def follow_shared_snapshot_async():
+    """Follower: reload the leader's snapshot when its generation moves; take over if the leader is gone."""
+    global faq_role, faq_generation
+    if faq_leader_lock.try_acquire():
+        faq_role = "leader"
+        logging.info("Took over as the shared FAQ index leader.")
+        await refresh_faqs_async()
+        return
+    header = read_header(FAQ_SNAPSHOT_PATH)
+    if header and header.get("generation") != faq_generation:
+        loop = asyncio.get_running_loop()
+        loaded = await loop.run_in_executor(executor, load_snapshot, FAQ_SNAPSHOT_PATH, _snapshot_source(),
+                                            FAQ_LEXICAL)
+        if loaded is not None:
+            index, last_sync, faq_generation = loaded
+            _install_faq_index(index, last_sync)
+            logging.info("Attached to FAQ snapshot generation %d (%d FAQs).", faq_generation, len(index))
+            await warm_faq_payload()
 
 # Load on startup
-load_faqs_into_cache()
+load_faqs_on_startup()
+
+# also refresh periodically in background (started from the app startup hook)
+FAQ_RULES_PATH = FAQ_SNAPSHOT_PATH + ".rules" if FAQ_SNAPSHOT_PATH else ""
+rules_written: Optional[Dict[str, Any]] = None  # leader: rule docs last written to FAQ_RULES_PATH
+rules_mtime: Optional[int] = None  # follower: mtime of the rules file last installed
+
+def _install_rules(dept_docs: List[Dict[str, Any]], keywords_doc: Optional[Dict[str, Any]]):
+    global dept_matcher, keyword_gate
+    dept_matcher = build_dept_matcher(dept_docs)
+    keyword_gate = build_keyword_gate(keywords_doc)
+
+async def refresh_rules_async():
+    global rules_written
+    docs = await mongo.aio("departments").find({}, {**DEPT_FIELDS, "_id": 0}).to_list(None)
+    keywords_doc = await mongo.aio("settings").find_one({"_id": KEYWORDS_SETTING_ID})
+    _install_rules(docs, keywords_doc)
+    rules = {"departments": docs, "keywords": keywords_doc}
+    if faq_role == "leader" and rules != rules_written:
+        await asyncio.get_running_loop().run_in_executor(executor, save_rules, FAQ_RULES_PATH, rules)
+        rules_written = rules
+
+async def follow_shared_rules_async():
+    """Follower: install the leader's rule documents when the rules file changes (a stat per poll)."""
+    global rules_mtime
+    try:
+        mtime = os.stat(FAQ_RULES_PATH).st_mtime_ns
+    except OSError:
+        return  # not written yet: keep the rules loaded at boot
+    if mtime == rules_mtime:
+        return
+    rules = await asyncio.get_running_loop().run_in_executor(executor, load_rules, FAQ_RULES_PATH)
+    if rules is not None:
+        rules_mtime = mtime
+        _install_rules(rules.get("departments") or [], rules.get("keywords"))
+        logging.info("Installed department/keyword rules from the shared FAQ leader.")
 
-# also refresh periodically in background
 async def periodic_faq_refresh():
+    global faqs_need_reconcile
+    if faqs_need_reconcile:
+        # booted from a snapshot: catch up with Mongo now rather than after the first interval
+        try:
+            await refresh_faqs_async()
+            faqs_need_reconcile = False
+        except Exception:
+            logging.exception("FAQ snapshot reconcile failed.")
     while True:
+        if faq_role == "follower":
+            # followers never query Mongo for FAQs: Mongo load stays constant as workers scale
+            await asyncio.sleep(FAQ_SHARED_POLL_SECS)
+            try:
+                await follow_shared_snapshot_async()
+            except Exception:
+                logging.exception("Following the shared FAQ snapshot failed.")
+            continue
         await asyncio.sleep(FAQ_REFRESH_INTERVAL)
         try:
-            load_faqs_into_cache()
+            await refresh_faqs_async()
         except Exception:
             logging.exception("Periodic FAQ refresh failed.")
 
-# start periodic refresh in background (fire-and-forget)
-asyncio.get_event_loop().create_task(periodic_faq_refresh())
+async def periodic_query_log_flush():
+    coll = mongo.aio("query_log")
+    while True:
+        await asyncio.sleep(QUERY_LOG_FLUSH_SECS)
+        try:
+            await query_log.flush(coll)
+        except Exception:
+            logging.exception("Query log flush failed.")
+
+def gemini_enabled() -> bool:
+    return bool(GEMINI_API_KEY) or GEMINI_BACKEND == "fake"
+
+async def periodic_gemini_keepalive():
+    # quiet periods would otherwise leave the next user a cold connection
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(GEMINI_KEEPALIVE_SECS / 4)
+        if gemini.idle_secs < GEMINI_KEEPALIVE_SECS:
+            continue
+        try:
+            await loop.run_in_executor(executor, gemini.ping, GEMINI_WARMUP_TIMEOUT_SECS)
+        except Exception as e:
+            logging.debug("Gemini keep-alive ping failed: %s", e)
+
+async def periodic_rules_refresh():
+    if faq_role == "leader":
+        # publish the rules for followers now rather than after the first interval
+        try:
+            await refresh_rules_async()
+        except Exception:
+            logging.exception("Department/keyword refresh failed.")
+    while True:
+        if faq_role == "follower":
+            # like the FAQs: only the leader queries departments/settings, followers take its copy
+            await asyncio.sleep(FAQ_SHARED_POLL_SECS)
+            try:
+                await follow_shared_rules_async()
+            except Exception:
+                logging.exception("Following the shared department/keyword rules failed.")
+            continue
+        await asyncio.sleep(FAQ_REFRESH_INTERVAL)
+        try:
+            await refresh_rules_async()
+        except Exception:
+            logging.exception("Periodic department/keyword refresh failed.")
 
 # -----------------------------
 # FAQ matching (in-memory, fast)
 # -----------------------------
-def get_best_faq_match(user_question: str):
+def get_best_faq_match(user_question: str, query: Optional[Query] = None):
     if not user_question:
         return None
 
-    user_q = _normalize_text(user_question)
-    if not user_q:
+    query = query or Query(user_question)
+    if not query.norm:
         return None
 
-    best_match = None
-    best_score = -1
+    # score only the FAQs sharing tokens with the query (full scan if none do)
+    index = faq_index
+    pos, best_score = index.best_match(query.norm, score_cutoff=FAQ_SCORE_FLOOR, tokens=query.tokens)
+    faq_best_score.observe(max(best_score, 0))
+    if pos is not None and best_score >= FAQ_MATCH_THRESHOLD:
+        faq = index.store.record(pos)
+        logging.info("Matched FAQ (score=%d): %s", best_score, faq["question"])
+        return faq
+    return None
 
-    # iterate cached normalized faq entries
-    for item in faqs_cache_normalized:
-        q_text = item["q_norm"]
-        # cheap filtering: skip if first char differs and lengths wildly differ
-        if abs(len(q_text) - len(user_q)) > 100:
-            continue
-        score = fuzz.token_sort_ratio(user_q, q_text)
-        # small boost for prefix matches
-        if q_text.startswith(user_q):
-            score += 5
-        if score > best_score:
-            best_score = score
-            best_match = item["orig"]
-
-    if best_score >= FAQ_MATCH_THRESHOLD:
-        logging.info("Matched FAQ (score=%d): %s", best_score, best_match.get("question"))
-        return best_match
+def get_best_faq_matches(queries: List[Query]) -> List[Optional[Dict[str, Any]]]:
+    """Batch variant of get_best_faq_match (blocking): same candidates, so the same FAQ as /chat."""
+    user_qs = [q.norm for q in queries]
+    index = faq_index
+    results = index.best_matches(user_qs, score_cutoff=FAQ_SCORE_FLOOR, tokens=[q.tokens for q in queries])
+    out = []
+    for q, (pos, score) in zip(user_qs, results):
+        faq_best_score.observe(max(score, 0))
+        out.append(index.store.record(pos) if pos is not None and q and score >= FAQ_MATCH_THRESHOLD else None)
+    return out
+
+def get_lexical_faq_match(query: Query) -> Optional[Dict[str, Any]]:
+    """
+    BM25 tier for college-related questions the fuzzy matcher missed: the top FAQ when it
+    is a confident hit, else None, with the plausible FAQs left in query.grounding for
+    the Gemini prompt. A confident hit needs the relative confidence, several shared
+    informative terms and an absolute score: a one-word query is always "fully" matched.
+    """
+    index = faq_index
+    lexical = index.lexical
+    if lexical is None or not query.tokens:
+        return None
+    hits = lexical.search(query.tokens, BM25_CONTEXT_TOP_K)
+    if not hits:
+        return None
+    top_pos, top_score = hits[0]
+    confidence = lexical.confidence(query.tokens, top_score)
+    if (confidence >= BM25_ANSWER_CONFIDENCE and top_score >= BM25_ANSWER_MIN_SCORE
+            and lexical.matched_terms(query.tokens, top_pos) >= BM25_ANSWER_MIN_TERMS):
+        faq = index.store.record(top_pos)
+        logging.info("Matched FAQ via BM25 (confidence=%.2f, score=%.1f): %s", confidence, top_score, faq["question"])
+        return faq
+    store = index.store
+    query.grounding = "\n".join(
+        f"Q: {store.questions[pos]}\nA: {store.answers[pos][:BM25_CONTEXT_CHARS]}"
+        for pos, score in hits if lexical.confidence(query.tokens, score) >= BM25_CONTEXT_MIN)
     return None
 
 # -----------------------------
-# AI LRU cache (answers for repeated queries)
+# AI answer cache (memory LRU + shared Mongo TTL collection)
 # -----------------------------
-@lru_cache(maxsize=AI_CACHE_SIZE)
-def cached_ai_response(key: str) -> str:
-    # wrapper around blocking Gemini call - this function will run in executor
-    # NOTE: we keep it small; callers should call via executor to avoid blocking event loop
+AI_ERROR_MSG = "Sorry, I couldn't generate an answer right now."
+AI_TIMEOUT_MSG = "Sorry, the AI is taking too long right now."
+AI_BUSY_MSG = (
+    f"Sorry, the assistant is busy right now. Please try again shortly "
+    f"or contact {admin_name} at {admin_email}."
+)
+
+# deadline-based admission in front of a dedicated Gemini thread pool; each call is capped by the adaptive timeout
+ai_dispatcher = AIDispatcher(AI_POOL_WORKERS, AI_QUEUE_SIZE, abandon_headroom=AI_ABANDON_HEADROOM,
+                             call_timeout=lambda: current_ai_timeout())
+# fail fast during Gemini brownouts; timeout follows observed upstream latency
+ai_breaker = CircuitBreaker(AI_BREAKER_FAILURES, AI_BREAKER_RESET_SECS)
+ai_latency = LatencyTracker()
+
+def current_ai_timeout() -> float:
+    return ai_latency.adaptive_timeout(AI_TIMEOUT_SECS, AI_TIMEOUT_MIN_SECS,
+                                       AI_TIMEOUT_P95_FACTOR, AI_TIMEOUT_MIN_SAMPLES)
+
+answer_cache = AnswerCache(
+    normalize_query,
+    maxsize=AI_CACHE_SIZE,
+    store=MongoAnswerStore(ai_cache_coll) if ai_cache_coll is not None else None,
+    ttl=AI_CACHE_TTL_SECS,
+    negative_ttl=AI_NEGATIVE_TTL_SECS,
+)
+
+def build_prompt(message: str, grounding: str = "") -> str:
+    # the persona is the client's system instruction; the prompt carries only the question (+ FAQ context)
+    if not grounding:
+        return message
+    return f"These FAQ entries may help; ignore them if they don't apply:\n{grounding}\nQuestion:\n{message}"
+
+def generate_ai_answer(message: str, grounding: str = "", timeout: Optional[float] = None) -> Tuple[str, bool]:
+    """Blocking Gemini call. Returns (answer, ok); ok=False answers are only negatively cached."""
     try:
-        model = genai.GenerativeModel("models/gemini-2.0-flash")
-        response = model.generate_content(f"Answer this as GAT college assistant:\n{key}")
-        raw = response.text.strip() if hasattr(response, "text") else str(response)
-        return clean_ai_text(raw)
+        text = clean_ai_text(gemini.generate(build_prompt(message, grounding), timeout=timeout))
+        return (text, True) if text else (AI_ERROR_MSG, False)
     except Exception as e:
-        logging.exception("Gemini (cached) error: %s", e)
-        return "Sorry, I couldn't generate an answer right now."
-
-async def ask_gemini_async(message: str) -> str:
-    """Run the cached_ai_response in a thread and enforce a timeout."""
-    # Use the raw message as cache key (you may add normalization)
-    key = message.strip()
-    loop = asyncio.get_event_loop()
+        logging.exception("Gemini error: %s", e)
+        return AI_ERROR_MSG, False
+
+def cached_ai_response(key: str, message: str, grounding: str = "", timeout: Optional[float] = None) -> str:
+    # wrapper around blocking cache lookups + Gemini call - this function will run in the AI pool
+    # NOTE: callers should go through ai_dispatcher to avoid blocking event loop
+    answer = answer_cache.get(key)
+    if answer is not None:
+        ai_breaker.release()  # found in the shared store: no Gemini call to report
+        return answer
+    ai_stats["upstream_calls"] += 1
+    started = time.monotonic()
+    answer, ok = generate_ai_answer(message, grounding, timeout=timeout)
+    elapsed = time.monotonic() - started
+    ai_latency.observe(elapsed)
+    # an answer arriving after the caller's deadline counts as a timeout for the breaker
+    if ok and (timeout is None or elapsed <= timeout):
+        ai_breaker.record_success()
+    else:
+        ai_breaker.record_failure()
+    answer_cache.put(key, answer, negative=not ok)
+    return answer
+
+def batched_ai_response(items: List[Tuple[str, str, str]], timeout: Optional[float] = None) -> List[Optional[str]]:
+    """
+    One Gemini call for several (key, message, grounding) items - runs in the AI pool via ai_batcher.
+    Returns one answer per item; None where the reply couldn't be matched to the question
+    (the batcher then asks that one individually).
+    """
+    answers: List[Optional[str]] = [answer_cache.get(key) for key, _, _ in items]
+    todo = [i for i, a in enumerate(answers) if a is None]
+    if not todo:
+        ai_breaker.release()
+    if len(todo) <= 1:
+        for i in todo:
+            answers[i] = cached_ai_response(*items[i], timeout=timeout)
+        return answers
+    ai_stats["upstream_calls"] += 1
+    prompt = build_batch_prompt([(items[i][1], items[i][2]) for i in todo])
+    started = time.monotonic()
     try:
-        # run blocking cached call in executor with timeout
-        coro = loop.run_in_executor(executor, cached_ai_response, key)
-        result = await asyncio.wait_for(coro, timeout=AI_TIMEOUT_SECS)
-        return result
-    except asyncio.TimeoutError:
+        raw = gemini.generate(prompt, timeout=timeout, max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS * len(todo))
+    except Exception as e:
+        logging.exception("Gemini error (batch of %d): %s", len(todo), e)
+        raw = None
+    elapsed = time.monotonic() - started
+    ai_latency.observe(elapsed)
+    if raw is None or (timeout is not None and elapsed > timeout):
+        ai_breaker.record_failure()
+        for i in todo:
+            answers[i] = AI_ERROR_MSG
+            answer_cache.put(items[i][0], AI_ERROR_MSG, negative=True)
+        return answers
+    ai_breaker.record_success()
+    for i, text in zip(todo, parse_numbered_answers(raw, len(todo))):
+        text = clean_ai_text(text) if text else ""
+        if text:
+            answers[i] = text
+            answer_cache.put(items[i][0], text)
+    return answers
+
+ai_batcher = MicroBatcher(ai_dispatcher, batched_ai_response, cached_ai_response,
+                          window_secs=AI_BATCH_WINDOW_SECS, max_items=AI_BATCH_MAX_ITEMS)
+
+# in-flight Gemini calls keyed like the cache: concurrent identical questions share one call
+ai_inflight: Dict[str, asyncio.Future] = {}
+ai_waiters: Dict[asyncio.Future, int] = {}  # callers awaiting each in-flight call
+
+def release_unsent_probe(fut: asyncio.Future):
+    """Done-callback: an admitted call that expired in the queue (or whose batch wasn't admitted)
+    never reached Gemini, so it can't report to the breaker; hand a half-open probe back."""
+    if fut.cancelled():
+        ai_breaker.release()
+        return
+    exc = fut.exception()
+    if isinstance(exc, DeadlineExceeded) or (exc is None and fut.result() is None):
+        ai_breaker.release()
+
+async def stored_ai_answer(key: str) -> Optional[str]:
+    """Shared-store lookup for when the breaker keeps us from calling Gemini."""
+    return await asyncio.get_running_loop().run_in_executor(executor, answer_cache.get, key)
+ai_stats = {"requests": 0, "dispatched": 0, "upstream_calls": 0, "coalesced": 0, "rejected": 0, "short_circuited": 0}
+
+async def ask_gemini_async(message: str, query: Optional[Query] = None) -> Optional[str]:
+    """
+    Answer from the AI cache, or run cached_ai_response in the AI pool within AI_TIMEOUT_SECS
+    (the Gemini call itself is capped by the adaptive timeout).
+    Returns None when the call was not admitted (it couldn't be answered in time, or circuit open).
+    """
+    deadline = time.monotonic() + AI_TIMEOUT_SECS
+    # normalized cache key; punctuation-only input keeps its raw text so it doesn't share a key
+    key = (query.norm if query else answer_cache.key(message)) or message.strip()
+    ai_stats["requests"] += 1
+    cached = answer_cache.get_local(key)
+    if cached is not None:
+        return cached
+    fut = ai_inflight.get(key)
+    try:
+        if fut is not None:
+            # same question already on its way to Gemini: wait for that call instead
+            ai_stats["coalesced"] += 1
+        elif not ai_breaker.allow():
+            # circuit open: answers other workers already stored can still be served
+            stored = await stored_ai_answer(key)
+            if stored is not None:
+                return stored
+            ai_stats["short_circuited"] += 1
+            return None
+        elif AI_BATCH:
+            # resolves to None if the batch (or its individual retry) isn't admitted
+            fut = ai_batcher.submit(key, message.strip(), query.grounding if query else "", deadline)
+            ai_inflight[key] = fut
+            fut.add_done_callback(lambda _f: ai_inflight.pop(key, None))
+            fut.add_done_callback(release_unsent_probe)
+        else:
+            fut = ai_dispatcher.submit(cached_ai_response, key, message.strip(), query.grounding if query else "",
+                                      deadline=deadline)
+            if fut is None:
+                ai_stats["rejected"] += 1
+                ai_breaker.release()
+                logging.warning("AI pool saturated; rejecting message: %.50s", message)
+                return None
+            ai_stats["dispatched"] += 1
+            ai_inflight[key] = fut
+            fut.add_done_callback(lambda _f: ai_inflight.pop(key, None))
+            fut.add_done_callback(release_unsent_probe)
+        # shield: one caller timing out must not cancel the call the others are waiting on
+        ai_waiters[fut] = ai_waiters.get(fut, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), timeout=max(0.0, deadline - time.monotonic()))
+        finally:
+            if ai_waiters[fut] > 1:
+                ai_waiters[fut] -= 1
+            else:
+                del ai_waiters[fut]
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        # the call only counts as abandoned once its last waiter gave up
+        if fut is not None and fut not in ai_waiters:
+            (ai_batcher if ai_batcher.owns(fut) else ai_dispatcher).abandon(fut)
         logging.warning("Gemini timed out for message: %.50s", message)
-        return "Sorry, the AI is taking too long right now."
+        return AI_TIMEOUT_MSG
     except Exception as e:
         logging.exception("ask_gemini_async error: %s", e)
-        return "Sorry, I couldn't generate an answer right now."
+        return AI_ERROR_MSG
+
+# -----------------------------
+# Streaming AI answers (SSE)
+# -----------------------------
+def stream_ai_answer(key: str, message: str, push, grounding: str = "",
+                     timeout: Optional[float] = None) -> Tuple[str, bool]:
+    """
+    Blocking streaming Gemini call (runs in the AI pool); push(text) gets each cleaned piece.
+    `timeout` is when the first chunk is due, enforced by the caller; the whole stream may run
+    up to AI_STREAM_TIMEOUT_SECS. Returns (answer, ok) and fills the AI cache on success.
+    """
+    cleaner = StreamingTextCleaner()
+    parts = []
+    try:
+        ai_stats["upstream_calls"] += 1
+        for text in gemini.stream(build_prompt(message, grounding), timeout=AI_STREAM_TIMEOUT_SECS):
+            piece = cleaner.feed(text)
+            if piece:
+                parts.append(piece)
+                push(piece)
+    except Exception as e:
+        logging.exception("Gemini stream error: %s", e)
+    answer = "".join(parts)
+    ok = bool(answer)
+    # stream durations aren't comparable to whole-answer latencies, so only the breaker is updated
+    if ok:
+        ai_breaker.record_success()
+        answer_cache.put(key, answer)
+    else:
+        ai_breaker.record_failure()
+    return answer, ok
+
+def _sse(event: str, data: dict) -> str:
+    if event == "done":
+        responses_by_source.inc(data.get("source"))
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_response_events(question: str):
+    """
+    SSE events for one question: rule/FAQ/cached/fallback answers are a single `done`
+    event; Gemini answers are `chunk` events ({"text"}) followed by `done`.
+    """
+    started = time.perf_counter()
+    query = Query(question)
+    async with aclosing(_stream_events(question, query)) as events:
+        async for event, data in events:
+            if event == "done":
+                log_query(question, query, data, time.perf_counter() - started, "stream")
+            yield _sse(event, data)
+
+async def _stream_events(question: str, query: Query):
+    fut = None
+    try:
+        logging.info("Processing question (stream): %s", question)
+        local = answer_locally(question, query)
+        if local:
+            yield "done", local
+            return
+        if not is_college_related(question, query):
+            yield "done", fallback_response()
+            return
+        lexical = answer_lexically(query)
+        if lexical:
+            yield "done", lexical
+            return
+
+        key = query.norm or question.strip()
+        cached = answer_cache.get_local(key)
+        if cached is not None:
+            yield "done", {"response": cached, "source": "ai"}
+            return
+        if not ai_breaker.allow():
+            stored = await stored_ai_answer(key)
+            if stored is not None:
+                yield "done", {"response": stored, "source": "ai"}
+                return
+            ai_stats["short_circuited"] += 1
+            yield "done", {"response": AI_BUSY_MSG, "source": "fallback"}
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        push = lambda text: loop.call_soon_threadsafe(queue.put_nowait, text)
+        first_deadline = time.monotonic() + current_ai_timeout()
+        fut = ai_dispatcher.submit(stream_ai_answer, key, question.strip(), push, query.grounding,
+                                  deadline=first_deadline)
+        if fut is None:
+            ai_stats["rejected"] += 1
+            ai_breaker.release()
+            yield "done", {"response": AI_BUSY_MSG, "source": "fallback"}
+            return
+        ai_stats["dispatched"] += 1
+        fut.add_done_callback(release_unsent_probe)
+        # runs after every push() already queued by the worker thread: marks end of stream
+        fut.add_done_callback(lambda _f: queue.put_nowait(None))
+
+        deadline = first_deadline
+        while True:
+            try:
+                piece = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                logging.warning("Gemini stream timed out for message: %.50s", question)
+                yield "done", {"response": AI_TIMEOUT_MSG, "source": "ai"}
+                return
+            if piece is None:
+                break
+            deadline = first_deadline + AI_STREAM_TIMEOUT_SECS
+            yield "chunk", {"text": piece}
+
+        try:
+            answer, ok = fut.result()
+        except DeadlineExceeded:
+            answer, ok = AI_TIMEOUT_MSG, False
+        yield "done", {"response": answer if ok else AI_ERROR_MSG, "source": "ai"}
+    except Exception as e:
+        logging.exception("Error in stream_response_events: %s", e)
+        yield "done", {"response": "An internal error occurred.", "source": "error"}
+    finally:
+        # client went away or we timed out: the worker keeps running until Gemini returns
+        if fut is not None and not fut.done():
+            ai_dispatcher.abandon(fut)
 
 # -----------------------------
 # College-related detection
 # -----------------------------
-def is_college_related(question: str) -> bool:
-    keywords = [
-        "college", "admission", "fee", "course", "department", "faculty",
-        "placement", "exam", "hod", "cse", "ece", "ise", "ai", "ml", "mba",
-        "hostel", "transport", "canteen", "library", "scholarship"
-    ]
-    return any(word in (question or "").lower() for word in keywords)
+def build_keyword_gate(doc: Optional[Dict[str, Any]]) -> KeywordGate:
+    """Keywords from the settings doc, or DEFAULT_COLLEGE_KEYWORDS."""
+    keywords = (doc or {}).get("keywords") or DEFAULT_COLLEGE_KEYWORDS
+    return KeywordGate(keywords, normalize_text)
+
+def load_keyword_gate():
+    global keyword_gate
+    try:
+        keyword_gate = build_keyword_gate(settings_coll.find_one({"_id": KEYWORDS_SETTING_ID}))
+    except Exception as e:
+        logging.exception("Failed to load college keywords: %s", e)
+        keyword_gate = KeywordGate(DEFAULT_COLLEGE_KEYWORDS, normalize_text)
+
+keyword_gate: KeywordGate = None
+load_keyword_gate()
+
+def is_college_related(question: str, query: Optional[Query] = None) -> bool:
+    # whole-token keyword match ("ai" doesn't match "said", "ml" doesn't match "html")
+    query = query or Query(question)
+    return keyword_gate.matches(query.tokens)
 
 # -----------------------------
 # High-level get_response (async-friendly)
 # -----------------------------
+def answer_locally(question: str, query: Optional[Query] = None) -> Optional[dict]:
+    """Stages that need neither an upstream call nor the keyword gate: HOD rule, then FAQ match."""
+    # 1. HOD rule
+    t0 = time.perf_counter()
+    hod_answer = handle_hod_query(question)
+    t1 = time.perf_counter()
+    stage_seconds.observe(t1 - t0, "rule")
+    if hod_answer:
+        return {"response": hod_answer, "source": "rule"}
+
+    # 2. FAQ matching from in-memory cache (fast)
+    query = query or Query(question)
+    faq = get_best_faq_match(question, query)
+    stage_seconds.observe(time.perf_counter() - t1, "faq")
+    if faq:
+        return {"response": faq.get("answer", "No answer found."), "source": "faq"}
+    return None
+
+def answer_lexically(query: Query) -> Optional[dict]:
+    """BM25 over the FAQs, for questions that passed the keyword gate (sets query.grounding on a miss)."""
+    t0 = time.perf_counter()
+    faq = get_lexical_faq_match(query)
+    stage_seconds.observe(time.perf_counter() - t0, "bm25")
+    if faq:
+        return {"response": faq.get("answer", "No answer found."), "source": "faq"}
+    return None
+
+def fallback_response() -> dict:
+    fallback = (
+        f"Sorry, I can only answer queries related to Global Academy of Technology. "
+        f"Please contact {admin_name} at {admin_email}."
+    )
+    return {"response": fallback, "source": "fallback"}
+
+_CANNED_AI_ANSWERS = {AI_ERROR_MSG, AI_TIMEOUT_MSG, AI_BUSY_MSG}
+
+def log_query(question: str, query: Query, result: dict, secs: float, endpoint: str):
+    # Gemini answers are kept as draft answers for FAQ mining; canned errors aren't worth keeping
+    answer = result["response"] if result["source"] == "ai" and result["response"] not in _CANNED_AI_ANSWERS else None
+    query_log.record(question, query.norm, result["source"], secs, endpoint, answer)
+
 async def get_response_async(question: str) -> dict:
+    started = time.perf_counter()
+    # normalize + tokenize once for the FAQ matcher, keyword gate and AI cache key
+    query = Query(question)
+    result = await _get_response_async(question, query)
+    elapsed = time.perf_counter() - started
+    responses_by_source.inc(result["source"])
+    stage_seconds.observe(elapsed, "total")
+    log_query(question, query, result, elapsed, "chat")
+    return result
+
+async def _get_response_async(question: str, query: Query) -> dict:
     try:
         logging.info("Processing question: %s", question)
 
-        # 1. HOD rule
-        hod_answer = handle_hod_query(question)
-        if hod_answer:
-            return {"response": hod_answer, "source": "rule"}
-
-        # 2. FAQ matching from in-memory cache (fast)
-        faq = get_best_faq_match(question)
-        if faq:
-            return {"response": faq.get("answer", "No answer found."), "source": "faq"}
+        # 1-2. HOD rule, FAQ match
+        local = answer_locally(question, query)
+        if local:
+            return local
 
-        # 3. If college-related, ask AI (cached + timed)
-        if is_college_related(question):
-            ai_answer = await ask_gemini_async(question)
+        # 3. If college-related: BM25 over the FAQs, then ask AI (cached + timed)
+        t0 = time.perf_counter()
+        related = is_college_related(question, query)
+        stage_seconds.observe(time.perf_counter() - t0, "gate")
+        if related:
+            lexical = answer_lexically(query)
+            if lexical:
+                return lexical
+            t1 = time.perf_counter()
+            ai_answer = await ask_gemini_async(question, query)
+            stage_seconds.observe(time.perf_counter() - t1, "ai")
+            if ai_answer is None:
+                # not admitted (AI pool saturated or circuit open): answer immediately instead of waiting
+                return {"response": AI_BUSY_MSG, "source": "fallback"}
             return {"response": ai_answer, "source": "ai"}
 
         # 4. final fallback
-        fallback = (
-            f"Sorry, I can only answer queries related to Global Academy of Technology. "
-            f"Please contact {admin_name} at {admin_email}."
-        )
-        return {"response": fallback, "source": "fallback"}
+        return fallback_response()
 
     except Exception as e:
         logging.exception("Error in get_response_async: %s", e)
         return {"response": "An internal error occurred.", "source": "error"}
 
+async def get_responses_batch(questions: List[str]) -> List[dict]:
+    """
+    Answer many questions at once, in order: identical questions are answered once,
+    HOD rules and FAQ matching run for the whole batch, and only the remaining
+    college-related questions go to Gemini, at most BATCH_AI_CONCURRENCY at a time.
+    """
+    started = time.perf_counter()
+    unique = list(dict.fromkeys(q.strip() for q in questions))
+    answers: Dict[str, dict] = {}
+    answered_at: Dict[str, float] = {}  # per question: when its answer was settled (for the query log)
+    queries: Dict[str, Query] = {}
+
+    def settle(q: str, result: dict):
+        answers[q] = result
+        answered_at[q] = time.perf_counter()
+
+    # 1. HOD rule
+    pending = []
+    for q in unique:
+        hod_answer = handle_hod_query(q)
+        if hod_answer:
+            settle(q, {"response": hod_answer, "source": "rule"})
+        else:
+            pending.append(q)
+
+    # 2. FAQ matching for the whole batch, off the event loop (same candidate pruning as /chat)
+    if pending:
+        queries = {q: Query(q) for q in pending}
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        faqs = await loop.run_in_executor(executor, get_best_faq_matches, list(queries.values()))
+        stage_seconds.observe(time.perf_counter() - t0, "faq_batch")
+        ai_bound = []
+        for q, faq in zip(pending, faqs):
+            if faq:
+                settle(q, {"response": faq.get("answer", "No answer found."), "source": "faq"})
+            elif not is_college_related(q, queries[q]):
+                settle(q, fallback_response())
+            else:
+                lexical = answer_lexically(queries[q])
+                if lexical:
+                    settle(q, lexical)
+                else:
+                    ai_bound.append(q)
+
+        # 3. AI with bounded fan-out
+        sem = asyncio.Semaphore(BATCH_AI_CONCURRENCY)
+
+        async def ask(q: str):
+            async with sem:
+                ai_answer = await ask_gemini_async(q, queries[q])
+            settle(q, {"response": AI_BUSY_MSG, "source": "fallback"} if ai_answer is None
+                   else {"response": ai_answer, "source": "ai"})
+
+        await asyncio.gather(*(ask(q) for q in ai_bound))
+
+    results = [answers[q.strip()] for q in questions]
+    for q in questions:
+        responses_by_source.inc(answers[q.strip()]["source"])
+        stage_seconds.observe(answered_at[q.strip()] - started, "total")
+    # each question's own latency within the batch, not the whole batch's
+    for q in unique:
+        log_query(q, queries.get(q) or Query(q), answers[q], answered_at[q] - started, "batch")
+    return results
+
 # -----------------------------
 # FastAPI setup
 # -----------------------------
@@ -336,6 +1053,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+background_tasks = set()  # strong refs so fire-and-forget tasks aren't garbage collected
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await mongo.connect_async()
+    loop = asyncio.get_running_loop()
+    warm_tasks = [warm_faq_payload()]
+    if gemini_enabled():
+        # before the first request is served: connection setup shouldn't land on a user
+        warm_tasks.append(loop.run_in_executor(executor, gemini.warm_up, GEMINI_WARMUP_TIMEOUT_SECS))
+    await asyncio.gather(*warm_tasks)
+    # start periodic refresh in background (fire-and-forget) on the server's own loop
+    jobs = [periodic_faq_refresh, periodic_rules_refresh]
+    if gemini_enabled():
+        jobs.append(periodic_gemini_keepalive)
+    if not mongo.in_memory:
+        jobs.append(periodic_query_log_flush)  # in-memory mode keeps only the ring buffer
+    for job in jobs:
+        task = asyncio.create_task(job())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in list(background_tasks):
+        task.cancel()
+    if not mongo.in_memory:
+        try:
+            await query_log.flush(mongo.aio("query_log"))
+        except Exception:
+            logging.exception("Final query log flush failed.")
+    await mongo.close()
+
 class ChatInput(BaseModel):
     user_message: str
 
@@ -344,13 +1094,105 @@ async def chat(input: ChatInput):
     # dispatch to async responder
     return await get_response_async(input.user_message)
 
+class ChatBatchInput(BaseModel):
+    messages: List[str]
+
+@app.post("/chat/batch")
+async def chat_batch(input: ChatBatchInput):
+    if len(input.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_MESSAGES} messages per batch.")
+    try:
+        results = await get_responses_batch(input.messages)
+    except Exception as e:
+        logging.exception("Error in get_responses_batch: %s", e)
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+    return {"count": len(results), "results": results}
+
+@app.post("/chat/stream")
+async def chat_stream(input: ChatInput):
+    # Server-Sent Events: first bytes go out as soon as Gemini produces them
+    return StreamingResponse(
+        stream_response_events(input.user_message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+faq_payloads = FaqPayloadCache()  # pre-serialized pages, reset whenever a new FaqStore is installed
+
+async def warm_faq_payload():
+    """Render the full /faqs payload for the current generation before clients ask for it."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, faq_payloads.render, faqs_cache, None, None, None)
+
 @app.get("/faqs")
-async def list_faqs():
-    # return currently cached faqs (fast)
-    docs = faqs_cache or []
-    # return only question/answer pairs
-    out = [{"question": d.get("question", ""), "answer": d.get("answer", "")} for d in docs]
-    return {"count": len(out), "faqs": out}
+async def list_faqs(request: Request, category: Optional[str] = None, cursor: Optional[str] = None,
+                    limit: Optional[int] = None):
+    # pre-rendered bytes per cache generation; polling clients mostly get a 304
+    if limit is not None and not 1 <= limit <= FAQS_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {FAQS_PAGE_MAX}.")
+    store = faqs_cache
+    page = faq_payloads.lookup(store, category, cursor, limit)
+    if page is None:
+        loop = asyncio.get_running_loop()
+        try:
+            page = await loop.run_in_executor(executor, faq_payloads.render, store, category, cursor, limit)
+        except CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=304, headers=headers)
+    if page.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(page.gzipped, media_type="application/json", headers=dict(headers, **{"Content-Encoding": "gzip"}))
+    return Response(page.body, media_type="application/json", headers=headers)
+
+@app.get("/stats")
+async def stats():
+    # dispatched = executor jobs, upstream_calls = actual Gemini calls, coalesced = calls saved by sharing
+    return {"ai": dict(ai_stats, inflight=len(ai_inflight)), "ai_cache": answer_cache.snapshot_stats(),
+            "ai_pool": ai_dispatcher.snapshot_stats(), "ai_batch": dict(ai_batcher.snapshot_stats(), enabled=AI_BATCH),
+            "faq_payloads": faq_payloads.stats,
+            "faq_index": {"count": len(faq_index), "role": faq_role, "generation": faq_generation},
+            "query_log": dict(query_log.stats, buffered=len(query_log))}
+
+@app.get("/ai/health")
+async def ai_health():
+    return {
+        "breaker": ai_breaker.snapshot(),
+        "timeout_secs": round(current_ai_timeout(), 3),
+        "latency": ai_latency.snapshot(),
+        "client": dict(gemini.stats, model=GEMINI_MODEL,
+                       idle_secs=round(gemini.idle_secs, 1) if gemini.last_used else None),
+    }
+
+def _ai_cache_counts() -> Dict[str, int]:
+    s = answer_cache.stats
+    return {"memory_hit": s["memory_hits"], "store_hit": s["store_hits"], "miss": s["misses"]}
+
+metrics.gauge("chatbot_executor_queue_depth", "Jobs waiting for a blocking-executor thread.",
+              lambda: executor._work_queue.qsize())
+metrics.gauge("chatbot_ai_pool_in_flight", "Gemini calls running or queued in the AI pool.",
+              lambda: ai_dispatcher.in_flight)
+metrics.gauge("chatbot_ai_pool_queued", "Live Gemini calls waiting for an AI pool thread.",
+              lambda: ai_dispatcher.queued())
+metrics.gauge("chatbot_ai_pool_expected_wait_seconds", "Estimated AI pool wait for a call submitted now.",
+              lambda: ai_dispatcher.expected_wait())
+metrics.gauge("chatbot_ai_pool_service_seconds", "Running average time a Gemini call holds an AI pool thread.",
+              lambda: ai_dispatcher.service_secs)
+metrics.gauge("chatbot_ai_pool_rejected_total", "Gemini calls turned away by AI pool admission, by reason.",
+              lambda: {"full": ai_dispatcher.stats["rejected_full"],
+                       "deadline": ai_dispatcher.stats["rejected_deadline"]}, label="reason", kind="counter")
+metrics.gauge("chatbot_ai_cache_lookups_total", "AI answer cache lookups, by outcome.",
+              _ai_cache_counts, label="outcome", kind="counter")
+metrics.gauge("chatbot_ai_cache_hit_ratio", "AI answer cache hit ratio since start.",
+              lambda: answer_cache.snapshot_stats()["hit_ratio"])
+metrics.gauge("chatbot_ai_breaker_open", "1 while the Gemini circuit breaker rejects calls.",
+              lambda: int(ai_breaker.state == "open"))
+metrics.gauge("chatbot_faqs", "FAQs in the in-memory index.", lambda: len(faq_index))
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/ping")
 async def ping():
@@ -0,0 +1,130 @@
+# metrics.py
+"""
+Minimal Prometheus-style metrics for the chat pipeline (no client library needed).
+
+- Counter / Histogram keep one optional label each (e.g. stage or source); an update
+  is a dict lookup plus a bisect under a per-metric lock, cheap enough for the hot path
+- Gauge reads its value(s) from a callback at scrape time, so queue depths and cache
+  ratios cost nothing between scrapes
+- Registry.render() produces the text exposition format (version 0.0.4) for /metrics
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; spans a sub-millisecond rule hit up to a slow Gemini call
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def _labels(name: Optional[str], value: Optional[str], extra: str = "") -> str:
+    parts = [f'{name}="{value}"'] if name and value is not None else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name, self.help, self.label = name, help, label
+        self.values: Dict[Optional[str], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: Optional[str] = None, amount: float = 1):
+        with self._lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self.values.items(), key=lambda kv: str(kv[0]))
+        return [f"{self.name}{_labels(self.label, lv)} {_fmt(v)}" for lv, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], label: Optional[str] = None):
+        self.name, self.help, self.label = name, help, label
+        self.buckets = list(buckets)
+        self.series: Dict[Optional[str], list] = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: Optional[str] = None):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self.series.get(label_value)
+            if s is None:
+                s = self.series[label_value] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(((lv, list(s)) for lv, s in self.series.items()), key=lambda kv: str(kv[0]))
+        out = []
+        for lv, s in items:
+            running = 0
+            for bound, n in zip(self.buckets + [float("inf")], s):
+                running += n
+                le = 'le="%s"' % _fmt(bound)
+                out.append(f"{self.name}_bucket{_labels(self.label, lv, le)} {running}")
+            out.append(f"{self.name}_sum{_labels(self.label, lv)} {_fmt(s[-2])}")
+            out.append(f"{self.name}_count{_labels(self.label, lv)} {s[-1]}")
+        return out
+
+
+class Gauge:
+    """Value(s) read at scrape time; kind="counter" for monotonic totals kept elsewhere."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], Union[float, Dict[str, float]]],
+                 label: Optional[str] = None, kind: str = "gauge"):
+        self.name, self.help, self.read, self.label, self.kind = name, help, read, label, kind
+
+    def samples(self) -> List[str]:
+        value = self.read()
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels(self.label, lv)} {_fmt(v)}" for lv, v in sorted(value.items())]
+        return [f"{self.name} {_fmt(value)}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        return self.register(Counter(name, help, label))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = STAGE_BUCKETS,
+                  label: Optional[str] = None) -> Histogram:
+        return self.register(Histogram(name, help, buckets, label))
+
+    def gauge(self, name: str, help: str, read, label: Optional[str] = None, kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, help, read, label, kind))
+
+    def render(self) -> str:
+        lines = []
+        for m in self.metrics:
+            try:
+                samples = m.samples()
+            except Exception as e:  # a broken gauge callback must not take the endpoint down
+                lines.append(f"# {m.name} unavailable: {e}")
+                continue
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+# mine_faq_candidates.py
+"""
+Offline job: turn recurring questions that reached Gemini or the fallback into FAQ candidates.
+
+- Reads the query log (see query_log.py) for the last --days, sources `ai` and `fallback`
+- Groups identical normalized questions, then clusters near-duplicates greedily: the most
+  asked phrasing leads a cluster and later ones join it at token_set_ratio >= --similarity
+- Drops clusters that an existing FAQ now answers (added since the questions were logged)
+- Ranks clusters by how often they were asked; each candidate carries the most asked
+  phrasing, the latest Gemini answer as a draft, counts per source and a few examples
+- Writes JSON that import_data.py accepts: review/edit the answers (candidates with an
+  empty answer are skipped), then run `python import_data.py faqs faq_candidates.json --source mined`
+Run: python mine_faq_candidates.py [--days 30] [--min-count 3] [--limit 100] [--out faq_candidates.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from dotenv import load_dotenv
+from rapidfuzz import fuzz, process
+
+from db import DB_NAME, connect_mongo
+
+FAQ_MATCH_THRESHOLD = 70  # same cut-off as main.py: clusters an FAQ already matches are dropped
+MAX_EXAMPLES = 5
+
+
+def group_questions(entries: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """norm -> {count, sources, phrasings, answer, answer_ts} over query log entries."""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for e in entries:
+        norm = e.get("norm") or (e.get("q") or "").lower().strip()
+        if not norm:
+            continue
+        g = groups.get(norm)
+        if g is None:
+            g = groups[norm] = {"count": 0, "sources": Counter(), "phrasings": Counter(), "answer": "", "answer_ts": None}
+        g["count"] += 1
+        g["sources"][e.get("source")] += 1
+        g["phrasings"][(e.get("q") or norm).strip()] += 1
+        ts = e.get("ts")
+        if e.get("answer") and (g["answer_ts"] is None or (ts and ts >= g["answer_ts"])):
+            g["answer"], g["answer_ts"] = e["answer"], ts
+    return groups
+
+
+def cluster(groups: Dict[str, Dict[str, Any]], similarity: float) -> List[Dict[str, Any]]:
+    """Greedy leader clustering, most asked first: O(groups x clusters) fuzzy comparisons."""
+    leaders: List[str] = []
+    clusters: List[Dict[str, Any]] = []
+    for norm in sorted(groups, key=lambda n: (-groups[n]["count"], n)):
+        g = groups[norm]
+        hit = process.extractOne(norm, leaders, scorer=fuzz.token_set_ratio, score_cutoff=similarity) if leaders else None
+        if hit is None:
+            leaders.append(norm)
+            clusters.append({"norm": norm, "count": 0, "sources": Counter(), "phrasings": Counter(),
+                             "answer": "", "answer_ts": None})
+            c = clusters[-1]
+        else:
+            c = clusters[hit[2]]
+        c["count"] += g["count"]
+        c["sources"].update(g["sources"])
+        c["phrasings"].update(g["phrasings"])
+        if g["answer"] and (c["answer_ts"] is None or (g["answer_ts"] and g["answer_ts"] >= c["answer_ts"])):
+            c["answer"], c["answer_ts"] = g["answer"], g["answer_ts"]
+    return clusters
+
+
+def candidates(clusters: List[Dict[str, Any]], faq_norms: List[str], min_count: int, limit: int) -> List[Dict[str, Any]]:
+    out = []
+    for c in sorted(clusters, key=lambda c: (-c["count"], c["norm"])):
+        if c["count"] < min_count:
+            break
+        if faq_norms and process.extractOne(c["norm"], faq_norms, scorer=fuzz.token_sort_ratio,
+                                            score_cutoff=FAQ_MATCH_THRESHOLD):
+            continue
+        out.append({
+            "question": c["phrasings"].most_common(1)[0][0],
+            "answer": c["answer"],
+            "source": "mined",
+            "count": c["count"],
+            "sources": dict(c["sources"]),
+            "examples": [q for q, _ in c["phrasings"].most_common(MAX_EXAMPLES)],
+        })
+        if len(out) >= limit:
+            break
+    return out
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("--days", type=int, default=30, help="look-back window of the query log")
+    p.add_argument("--min-count", type=int, default=3, help="ignore clusters asked fewer times")
+    p.add_argument("--limit", type=int, default=100, help="candidates to write")
+    p.add_argument("--similarity", type=float, default=85, help="token_set_ratio to join a cluster")
+    p.add_argument("--out", default="-", help="output JSON file ('-' = stdout)")
+    return p.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    load_dotenv()
+    mongo_url = os.getenv("MONGO_URL")
+    if not mongo_url:
+        raise ValueError("MONGO_URL not found in .env. Please add it to your .env file.")
+    db = connect_mongo(mongo_url)[DB_NAME]
+
+    since = datetime.utcnow() - timedelta(days=args.days)
+    entries = db["query_log"].find({"ts": {"$gte": since}, "source": {"$in": ["ai", "fallback"]}},
+                                   {"_id": 0, "q": 1, "norm": 1, "source": 1, "answer": 1, "ts": 1})
+    groups = group_questions(entries)
+    faq_norms = [d.get("q_norm") or (d.get("question") or "").lower() for d in db["faqs"].find({}, {"q_norm": 1, "question": 1})]
+    result = candidates(cluster(groups, args.similarity), faq_norms, args.min_count, args.limit)
+    print(f"{sum(g['count'] for g in groups.values())} logged questions, {len(groups)} distinct, "
+          f"{len(result)} FAQ candidates.", file=sys.stderr)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+# normalize.py
+"""
+The one text normalizer shared by the app, the import/repair scripts and the benchmarks.
+
+- normalize_text(): lowercase, drop "(...)" groups, every character other than a-z/0-9
+  becomes a space, whitespace collapsed. One str.translate pass over a lazily filled
+  per-character table plus split/join; the paren regex only runs when "(" is present
+- normalize_query(): the same with an LRU memo, for user questions (popular questions
+  repeat); corpus text goes through normalize_text so it doesn't evict them
+- NORMALIZER_VERSION tags stored values: writers save `q_norm_v` next to `q_norm`, and
+  readers reuse a stored q_norm only when its version matches (stored_q_norm)
+Bump NORMALIZER_VERSION whenever the output of normalize_text changes.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+NORMALIZER_VERSION = 1
+QUERY_MEMO_SIZE = 4096
+
+_PARENTHESIZED = re.compile(r"\([^)]*\)")
+
+
+class _Table(dict):
+    """str.translate table: a-z, 0-9 and whitespace map to themselves, anything else to a space."""
+
+    def __missing__(self, code: int) -> int:
+        ch = chr(code)
+        keep = ("a" <= ch <= "z") or ("0" <= ch <= "9") or ch.isspace()
+        self[code] = code if keep else 32
+        return self[code]
+
+
+_TABLE = _Table()
+
+
+def normalize_text(s: Optional[str]) -> str:
+    if not s:
+        return ""
+    s = s.lower()
+    if "(" in s:
+        s = _PARENTHESIZED.sub("", s)
+    return " ".join(s.translate(_TABLE).split())
+
+
+normalize_query = lru_cache(maxsize=QUERY_MEMO_SIZE)(normalize_text)
+
+
+def tokenize(s: Optional[str]) -> List[str]:
+    return normalize_text(s).split()
+
+
+def stored_q_norm(doc: Dict[str, Any]) -> Optional[str]:
+    """The doc's q_norm if it was written by this normalizer version, else None."""
+    if doc.get("q_norm_v") == NORMALIZER_VERSION:
+        return doc.get("q_norm")
+    return None
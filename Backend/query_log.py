@@ -0,0 +1,69 @@
+# query_log.py
+"""
+Non-blocking log of answered questions (what was asked, which stage answered, how long it took).
+
+- record() only appends a small dict to a bounded in-memory ring buffer: no I/O on the
+  request path; when the buffer is full the oldest entries are overwritten (and counted)
+- flush() drains the buffer in bulk insert_many(ordered=False) batches; main.py runs it
+  from a background task every few seconds and once more on shutdown
+- Entries land in a collection with a TTL index on `ts`, so the log never outgrows its window
+- mine_faq_candidates.py reads it offline to turn recurring AI/fallback questions into FAQs
+"""
+
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_CAPACITY = 20000     # entries buffered between flushes before the oldest are overwritten
+DEFAULT_BATCH_SIZE = 1000    # entries per insert_many
+DEFAULT_TTL_SECS = 30 * 24 * 3600
+MAX_TEXT_CHARS = 500         # questions longer than this are truncated in the log
+MAX_ANSWER_CHARS = 2000
+
+
+def ensure_indexes(coll, ttl_secs: float = DEFAULT_TTL_SECS):
+    """Blocking: TTL index on ts (the mining job's time-window filter uses it too)."""
+    try:
+        coll.create_index("ts", expireAfterSeconds=int(ttl_secs))
+    except Exception as e:
+        logging.warning("Could not ensure TTL index on the query log: %s", e)
+
+
+class QueryLog:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._buffer: deque = deque(maxlen=capacity)
+        self.stats = {"logged": 0, "overwritten": 0, "flushed": 0, "flush_errors": 0, "lost": 0}
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def record(self, question: str, norm: str, source: str, secs: float, endpoint: str,
+               answer: Optional[str] = None):
+        """Event loop only (deque appends are atomic, but stats aren't locked)."""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats["overwritten"] += 1
+        entry = {"ts": datetime.utcnow(), "q": (question or "")[:MAX_TEXT_CHARS], "norm": norm[:MAX_TEXT_CHARS],
+                 "source": source, "ms": round(secs * 1000, 2), "endpoint": endpoint}
+        if answer:
+            entry["answer"] = answer[:MAX_ANSWER_CHARS]
+        self._buffer.append(entry)
+        self.stats["logged"] += 1
+
+    async def flush(self, coll) -> int:
+        """Drain the buffer into `coll` (an async collection). Returns the number of entries written."""
+        written = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await coll.insert_many(batch, ordered=False)
+            except Exception as e:
+                # the log is best-effort: a failed batch is dropped rather than retried forever
+                self.stats["flush_errors"] += 1
+                self.stats["lost"] += len(batch)
+                logging.warning("Query log flush failed, dropped %d entries: %s", len(batch), e)
+                break
+            written += len(batch)
+        self.stats["flushed"] += written
+        return written
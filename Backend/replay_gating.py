@@ -0,0 +1,87 @@
+# replay_gating.py
+"""
+Replay a corpus of user questions through the old and new college-keyword gates.
+
+- Old gate: plain substring test per keyword (what is_college_related used to do)
+- New gate: KeywordGate over normalized tokens (main.is_college_related today)
+- Questions answered by the HOD rule never reach the gate and are skipped
+- Reports how many Gemini calls the stricter gate avoids, with examples
+Run: python replay_gating.py [questions.txt | questions.jsonl]
+(one question per line, or JSONL with a "question"/"user_message" field)
+"""
+
+import json
+import sys
+
+from dept_matcher import DepartmentMatcher, DEFAULT_DEPARTMENTS
+from keyword_gate import KeywordGate, DEFAULT_COLLEGE_KEYWORDS
+from normalize import normalize_text
+
+SAMPLE = [
+    "what is the fee structure for cse",
+    "hostel fees for first years?",
+    "He said hello",
+    "how to learn html quickly",
+    "I feel sad today",
+    "tell me a joke about maize",
+    "what is the email of the admission office",
+    "is there a library on campus",
+    "what is the capital of france",
+    "explain machine learning ml basics",
+    "which placements happened this year",
+    "where can I find the exam timetable",
+]
+
+
+def old_gate(question: str, keywords) -> bool:
+    return any(word in (question or "").lower() for word in keywords)
+
+
+def load_corpus(path):
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                d = json.loads(line)
+                line = d.get("question") or d.get("user_message") or ""
+            out.append(line)
+    return out
+
+
+def main(argv):
+    corpus = load_corpus(argv[0]) if argv else SAMPLE
+    gate = KeywordGate(DEFAULT_COLLEGE_KEYWORDS, normalize_text)
+    rules = DepartmentMatcher(DEFAULT_DEPARTMENTS)
+
+    reached = old_calls = new_calls = 0
+    avoided, added = [], []
+    for q in corpus:
+        if rules.answer(q):
+            continue
+        reached += 1
+        old = old_gate(q, DEFAULT_COLLEGE_KEYWORDS)
+        new = gate.matches(normalize_text(q).split())
+        old_calls += old
+        new_calls += new
+        if old and not new:
+            avoided.append(q)
+        elif new and not old:
+            added.append(q)
+
+    print(f"questions: {len(corpus)}  reaching the gate: {reached}")
+    print(f"AI calls (upper bound, before FAQ hits): old={old_calls} new={new_calls}")
+    if old_calls:
+        print(f"avoided: {len(avoided)} ({100 * len(avoided) / old_calls:.1f}% of old AI-bound traffic)")
+    for q in avoided[:20]:
+        print("  -", q)
+    if added:
+        print(f"newly AI-bound: {len(added)}")
+        for q in added[:20]:
+            print("  +", q)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,62 @@
+# conftest.py
+"""
+Shared setup for the backend tests: everything runs offline.
+
+- main is imported with MONGO_URL blanked (in-memory collections), no FAQ snapshot and
+  the fake Gemini backend, so no database, network or API key is needed
+- `app` loads the seeded FAQs (data/faqs.jsonl) into main's in-memory collection once
+- `ai_tier` gives a test its own breaker, latency tracker, AI pool and batcher on main,
+  an empty memory cache and a fast, deterministic FakeGemini (all restored afterwards)
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# must happen before main is imported (same as bench_load.py)
+os.environ["MONGO_URL"] = ""
+os.environ["FAQ_SNAPSHOT_PATH"] = ""
+os.environ["GEMINI_BACKEND"] = "fake"
+os.environ.pop("GEMINI_API_KEY", None)
+
+
+def seed_faqs():
+    with open(os.path.join(BACKEND, "data", "faqs.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    if not len(main.faq_index):
+        main.faqs_coll.insert_many(seed_faqs())
+        main.load_faqs_into_cache()
+    return main
+
+
+@pytest.fixture
+def ai_tier(app, monkeypatch):
+    from ai_batcher import MicroBatcher
+    from ai_dispatch import AIDispatcher
+    from circuit_breaker import CircuitBreaker, LatencyTracker
+    from fake_gemini import FakeGemini
+
+    fake = FakeGemini(median_secs=0.05, sigma=0.0, seed=1)
+    dispatcher = AIDispatcher(app.AI_POOL_WORKERS, app.AI_QUEUE_SIZE, abandon_headroom=app.AI_ABANDON_HEADROOM,
+                              call_timeout=app.current_ai_timeout)
+    monkeypatch.setattr(app, "ai_dispatcher", dispatcher)
+    monkeypatch.setattr(app, "ai_batcher", MicroBatcher(dispatcher, app.batched_ai_response, app.cached_ai_response,
+                                                        window_secs=0.02, max_items=app.AI_BATCH_MAX_ITEMS))
+    monkeypatch.setattr(app, "ai_breaker", CircuitBreaker(app.AI_BREAKER_FAILURES, app.AI_BREAKER_RESET_SECS))
+    monkeypatch.setattr(app, "ai_latency", LatencyTracker())
+    monkeypatch.setattr(app, "AI_BATCH", False)
+    app.answer_cache._memory.clear()
+    app.gemini.use_backend(fake.model_class())
+    yield fake
+    app.gemini.use_backend(FakeGemini().model_class())
+    app.answer_cache._memory.clear()
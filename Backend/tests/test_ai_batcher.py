@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+import pytest
+
+from ai_batcher import MicroBatcher, build_batch_prompt, parse_numbered_answers
+from ai_dispatch import AIDispatcher
+from fake_gemini import FakeGemini
+
+
+def test_parse_numbered_answers():
+    text = "[1] Library opens at 9.\n**[2]**: Hostel fee is listed online.\n[3]) Yes, there is a gym."
+    assert parse_numbered_answers(text, 3) == ["Library opens at 9.", "Hostel fee is listed online.",
+                                               "Yes, there is a gym."]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[1] one\n[3] three", ["one", None, "three"]),          # missing number
+    ("[1] one\n[2] two\n[2] again", ["one", None]),          # repeated number is ambiguous
+    ("[1] one\n[2]\n[5] five", ["one", None]),               # empty body, out of range
+    ("one, two", [None, None]),                              # no numbering at all
+    ("", [None, None]),
+    (None, [None, None]),
+])
+def test_parse_numbered_answers_leaves_unmatched_answers_empty(text, expected):
+    assert parse_numbered_answers(text, len(expected)) == expected
+
+
+def test_batch_prompt_round_trips_through_the_fake():
+    prompt = build_batch_prompt([("where is  the library", ""), ("hostel fee", "Q: Hostel?\nA: See the office")])
+    assert "[1] where is the library" in prompt
+    assert "    FAQ entries that may help: Q: Hostel? | A: See the office" in prompt
+    answers = parse_numbered_answers(FakeGemini(median_secs=0).generate(prompt).text, 2)
+    assert all(answers) and "hostel fee" in answers[1]
+
+
+class Upstream:
+    """batch_fn / single_fn for MicroBatcher that record their calls."""
+
+    def __init__(self, batch_answers=None):
+        self.batches, self.singles = [], []
+        self.batch_answers = batch_answers  # item index -> answer override (None = unparsed)
+
+    def batch(self, items, timeout=None):
+        self.batches.append([message for _, message, _ in items])
+        answers = [f"batch: {message}" for _, message, _ in items]
+        for i, answer in (self.batch_answers or {}).items():
+            answers[i] = answer
+        return answers
+
+    def single(self, key, message, grounding, timeout=None):
+        self.singles.append(message)
+        return f"single: {message}"
+
+
+def run_batcher(upstream, messages, dispatcher=None, **kwargs):
+    async def run():
+        batcher = MicroBatcher(dispatcher or AIDispatcher(2, 8), upstream.batch, upstream.single, **kwargs)
+        deadline = time.monotonic() + 5
+        futs = [batcher.submit(m, m, "", deadline) for m in messages]
+        return await asyncio.gather(*futs), batcher
+    return asyncio.run(run())
+
+
+def test_questions_in_one_window_share_a_call():
+    upstream = Upstream()
+    answers, batcher = run_batcher(upstream, ["a", "b", "c"], window_secs=0.02)
+    assert answers == ["batch: a", "batch: b", "batch: c"]
+    assert upstream.batches == [["a", "b", "c"]] and upstream.singles == []
+    assert batcher.snapshot_stats()["avg_batch_size"] == 3
+
+
+def test_lone_question_is_sent_as_a_normal_call():
+    upstream = Upstream()
+    answers, batcher = run_batcher(upstream, ["a"], window_secs=0.01)
+    assert answers == ["single: a"]
+    assert upstream.batches == [] and batcher.stats["singles"] == 1
+
+
+def test_max_items_flushes_without_waiting_for_the_window():
+    upstream = Upstream()
+    started = time.monotonic()
+    answers, _ = run_batcher(upstream, ["a", "b", "c", "d"], window_secs=5, max_items=2)
+    assert time.monotonic() - started < 1
+    assert upstream.batches == [["a", "b"], ["c", "d"]]
+
+
+def test_unparsed_answer_falls_back_to_an_individual_call():
+    upstream = Upstream(batch_answers={1: None})
+    answers, batcher = run_batcher(upstream, ["a", "b", "c"], window_secs=0.02)
+    assert answers == ["batch: a", "single: b", "batch: c"]
+    assert upstream.singles == ["b"]
+    assert batcher.stats["parse_fallbacks"] == 1
+
+
+def test_rejected_batch_resolves_every_caller_with_none():
+    upstream = Upstream()
+    answers, batcher = run_batcher(upstream, ["a", "b"], dispatcher=AIDispatcher(1, max_queue=0), window_secs=0.01)
+    assert answers == [None, None]
+    assert batcher.stats["rejected"] == 1 and upstream.batches == []
+
+
+def test_shared_call_is_abandoned_once_every_caller_gave_up():
+    async def run():
+        dispatcher = AIDispatcher(1, 8)
+        slow = lambda items, timeout=None: time.sleep(0.2) or [None] * len(items)
+        batcher = MicroBatcher(dispatcher, slow, Upstream().single, window_secs=0.01)
+        deadline = time.monotonic() + 5
+        futs = [batcher.submit(m, m, "", deadline) for m in ("a", "b")]
+        await asyncio.sleep(0.05)  # dispatched
+        batcher.abandon(futs[0])
+        first = dispatcher.stats["abandoned"]
+        batcher.abandon(futs[1])
+        for f in futs:
+            f.cancel()
+        await asyncio.sleep(0.3)
+        return first, dispatcher.stats["abandoned"]
+    assert asyncio.run(run()) == (0, 1)
+
+
+def test_main_batches_concurrent_ai_questions(app, ai_tier, monkeypatch):
+    monkeypatch.setattr(app, "AI_BATCH", True)
+    questions = ["what clubs does the college have for robotics", "how do i apply for a college hostel room"]
+
+    async def run():
+        return await asyncio.gather(*(app.ask_gemini_async(q) for q in questions))
+
+    answers = asyncio.run(run())
+    assert ai_tier.calls == 1
+    assert all(q in a for q, a in zip(questions, answers))
+
+
+def test_main_falls_back_when_the_batch_reply_is_garbled(app, ai_tier, monkeypatch):
+    monkeypatch.setattr(app, "AI_BATCH", True)
+    ai_tier.batch_format_error_rate = 1.0
+    questions = ["is there a music club at the college", "does the college library open on sundays"]
+
+    async def run():
+        return await asyncio.gather(*(app.ask_gemini_async(q) for q in questions))
+
+    answers = asyncio.run(run())
+    assert ai_tier.calls == 3  # the garbled batch, then one call per question
+    assert all(q in a for q, a in zip(questions, answers))
+    assert app.ai_batcher.stats["parse_fallbacks"] == 2
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def upstream(ai_tier, app, monkeypatch):
+    """cached_ai_response stand-in that holds its pool thread until `release` is set."""
+    state = {"calls": [], "release": threading.Event()}
+
+    def respond(key, message, grounding="", timeout=None):
+        state["calls"].append(message)
+        state["release"].wait(5)
+        return f"answer to {message}"
+
+    monkeypatch.setattr(app, "cached_ai_response", respond)
+    yield state
+    state["release"].set()
+
+
+def test_identical_questions_share_one_call(app, upstream):
+    async def run():
+        tasks = [asyncio.create_task(app.ask_gemini_async(q))
+                 for q in ("When is the library open?", "when is the library open", "WHEN is the library open")]
+        await asyncio.sleep(0.05)
+        upstream["release"].set()
+        return await asyncio.gather(*tasks)
+
+    coalesced = app.ai_stats["coalesced"]
+    answers = asyncio.run(run())
+    assert len(upstream["calls"]) == 1
+    assert answers == ["answer to When is the library open?"] * 3
+    assert app.ai_stats["coalesced"] - coalesced == 2
+    assert not app.ai_inflight and not app.ai_waiters
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call(app, upstream):
+    async def run():
+        first = asyncio.create_task(app.ask_gemini_async("where is the seminar hall"))
+        second = asyncio.create_task(app.ask_gemini_async("where is the seminar hall"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        upstream["release"].set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "answer to where is the seminar hall"
+    assert len(upstream["calls"]) == 1
+    assert app.ai_dispatcher.stats["abandoned"] == 0
+    assert not app.ai_inflight and not app.ai_waiters
+
+
+def test_call_is_abandoned_only_after_its_last_waiter_times_out(app, upstream, monkeypatch):
+    monkeypatch.setattr(app, "AI_TIMEOUT_SECS", 0.2)
+
+    async def run():
+        first = asyncio.create_task(app.ask_gemini_async("is there a gym on campus"))
+        await asyncio.sleep(0.1)
+        second = asyncio.create_task(app.ask_gemini_async("is there a gym on campus"))
+        assert await first == app.AI_TIMEOUT_MSG
+        abandoned_after_first = app.ai_dispatcher.stats["abandoned"]
+        assert await second == app.AI_TIMEOUT_MSG
+        return abandoned_after_first
+
+    assert asyncio.run(run()) == 0  # the second caller was still waiting
+    assert app.ai_dispatcher.stats["abandoned"] == 1
+    assert len(upstream["calls"]) == 1
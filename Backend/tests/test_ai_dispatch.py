@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai_dispatch import MIN_SERVICE_SAMPLES, AIDispatcher, DeadlineExceeded
+
+
+def blocker():
+    """fn for the pool that holds its thread until the returned event is set."""
+    release = threading.Event()
+
+    def fn(*args, timeout=None):
+        release.wait(5)
+        return "done"
+    return fn, release
+
+
+def timed(dispatcher, secs):
+    for _ in range(MIN_SERVICE_SAMPLES):
+        dispatcher._observe(secs)
+
+
+def test_hard_ceiling_rejects_as_full():
+    async def run():
+        d = AIDispatcher(workers=1, max_queue=1)
+        fn, release = blocker()
+        deadline = time.monotonic() + 5
+        running = d.submit(fn, deadline=deadline)
+        queued = d.submit(fn, deadline=deadline)
+        assert d.queued() == 1
+        assert d.submit(fn, deadline=deadline) is None
+        release.set()
+        assert await running == await queued == "done"
+        return d
+    d = asyncio.run(run())
+    assert d.stats["rejected_full"] == 1 and d.stats["admitted"] == 2
+    assert d.in_flight == 0
+
+
+def test_admission_follows_the_remaining_deadline():
+    async def run():
+        d = AIDispatcher(workers=1, max_queue=64)
+        timed(d, 0.5)
+        fn, release = blocker()
+        busy = d.submit(fn, deadline=time.monotonic() + 5)
+        # one call ahead: ~0.5 s wait + 0.5 s call
+        assert d.expected_wait() == pytest.approx(0.5)
+        assert d.admits(time.monotonic() + 0.8) == "deadline"
+        assert d.admits(time.monotonic() + 1.5) is None
+        assert d.submit(fn, deadline=time.monotonic() + 0.8) is None
+        release.set()
+        await busy
+        return d
+    d = asyncio.run(run())
+    assert d.stats["rejected_deadline"] == 1 and d.stats["rejected"] == 1
+
+
+def test_untimed_pool_admits_up_to_the_ceiling():
+    d = AIDispatcher(workers=1, max_queue=4)
+    d._observe(30.0)  # a single slow sample isn't trusted yet
+    assert d.expected_wait() == 0.0
+    assert d.admits(time.monotonic() + 0.1) is None
+
+
+def test_call_that_waited_past_its_deadline_never_runs():
+    calls = []
+
+    async def run():
+        d = AIDispatcher(workers=1, max_queue=4)
+        fn, release = blocker()
+        busy = d.submit(fn, deadline=time.monotonic() + 5)
+        late = d.submit(lambda timeout=None: calls.append(timeout), deadline=time.monotonic() + 0.05)
+        await asyncio.sleep(0.1)
+        release.set()
+        await busy
+        with pytest.raises(DeadlineExceeded):
+            await late
+        return d
+    d = asyncio.run(run())
+    assert calls == []
+    assert d.stats["expired"] == 1
+
+
+def test_timeout_is_the_remaining_time_capped_by_call_timeout():
+    seen = []
+
+    async def run(cap):
+        d = AIDispatcher(workers=1, max_queue=4, call_timeout=lambda: cap)
+        await d.submit(lambda timeout=None: seen.append(timeout), deadline=time.monotonic() + 10)
+    asyncio.run(run(2.0))
+    asyncio.run(run(60.0))
+    assert seen[0] == 2.0
+    assert 9 < seen[1] <= 10
+
+
+def test_abandoned_calls_use_headroom_then_live_threads():
+    async def run():
+        d = AIDispatcher(workers=2, max_queue=8, abandon_headroom=1)
+        fn, release = blocker()
+        deadline = time.monotonic() + 5
+        futs = [d.submit(fn, deadline=deadline) for _ in range(2)]
+        d.abandon(futs[0])
+        assert d.live == 1 and d.serving_threads() == 2  # covered by the headroom thread
+        d.abandon(futs[1])
+        d.abandon(futs[1])  # counted once
+        assert d.serving_threads() == 1
+        assert d.stats["abandoned"] == 2
+        release.set()
+        await asyncio.gather(*futs)
+        return d
+    d = asyncio.run(run())
+    assert d.in_flight == 0 and not d.abandoned
+
+
+def test_admission_rejections_are_exported(app, monkeypatch):
+    d = AIDispatcher(workers=1, max_queue=0)
+    d.stats.update(rejected_full=3, rejected_deadline=2)
+    monkeypatch.setattr(app, "ai_dispatcher", d)
+    text = app.metrics.render()
+    assert 'chatbot_ai_pool_rejected_total{reason="full"} 3' in text
+    assert 'chatbot_ai_pool_rejected_total{reason="deadline"} 2' in text
+    assert "chatbot_ai_pool_expected_wait_seconds" in text
@@ -0,0 +1,118 @@
+import asyncio
+import types
+
+import pytest
+
+import circuit_breaker
+from ai_dispatch import AIDispatcher
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyTracker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=lambda: now.t))
+    return now
+
+
+def open_breaker(clock, threshold=3, reset_after=10.0):
+    breaker = CircuitBreaker(threshold, reset_after)
+    for _ in range(threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_after_consecutive_failures_only(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=10.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["opened"] == 1
+
+
+def test_open_breaker_short_circuits_until_cool_down(clock):
+    breaker = open_breaker(clock)
+    clock.t += 9.9
+    assert not breaker.allow()
+    assert breaker.snapshot()["short_circuited"] == 1
+    clock.t += 0.1
+    assert breaker.allow()  # the probe
+    assert breaker.state == HALF_OPEN
+
+
+def test_half_open_admits_one_probe(clock):
+    breaker = open_breaker(clock)
+    clock.t += 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = open_breaker(clock)
+    clock.t += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["retry_in_secs"] == 10.0
+
+
+def test_release_hands_the_probe_to_the_next_caller(clock):
+    breaker = open_breaker(clock)
+    clock.t += 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()  # e.g. the probe was answered from the cache
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_release_is_a_no_op_when_closed(clock):
+    breaker = CircuitBreaker(3, 10.0)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["short_circuited"] == 0
+
+
+def test_lost_probe_is_replaced_after_reset_after(clock):
+    breaker = open_breaker(clock)
+    clock.t += 10
+    assert breaker.allow()  # never reports back
+    clock.t += 9
+    assert not breaker.allow()
+    clock.t += 1
+    assert breaker.allow()
+
+
+def test_adaptive_timeout_is_clamped():
+    tracker = LatencyTracker(window=100)
+    assert tracker.adaptive_timeout(default=15, floor=2, factor=3, min_samples=20) == 15
+    for _ in range(20):
+        tracker.observe(0.1)
+    assert tracker.adaptive_timeout(default=15, floor=2, factor=3, min_samples=20) == 2
+    for _ in range(100):
+        tracker.observe(2.0)
+    assert tracker.adaptive_timeout(default=15, floor=2, factor=3, min_samples=20) == 6.0
+    assert tracker.snapshot()["buckets"]["+Inf"] == 120
+
+
+def test_rejected_ai_call_hands_back_the_probe(ai_tier, app, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=0.0)
+    breaker.record_failure()
+    monkeypatch.setattr(app, "ai_breaker", breaker)
+    monkeypatch.setattr(app, "ai_dispatcher", AIDispatcher(1, max_queue=0))  # admits nothing
+
+    assert asyncio.run(app.ask_gemini_async("when does the placement cell open")) is None
+    assert breaker.state == HALF_OPEN and breaker.probe_started is None
+    assert ai_tier.calls == 0
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from faq_bm25 import Bm25Index
+from faq_index import FaqIndex
+from faq_snapshot import load_snapshot, save_snapshot
+from faq_store import FaqStore
+from normalize import normalize_text
+
+from conftest import seed_faqs
+
+# question words, fillers and one-word queries: the baseline sent all of them to the fallback
+STOP_WORD_QUERIES = ["what", "what?", "how", "who", "when", "where", "yes", "help", "is there"]
+
+
+@pytest.fixture(scope="module")
+def bm25():
+    return Bm25Index(FaqStore.from_docs(seed_faqs(), normalize_text), normalize_text)
+
+
+@pytest.mark.parametrize("question", STOP_WORD_QUERIES)
+def test_stop_word_queries_are_not_answered_from_bm25(app, question):
+    assert app.get_lexical_faq_match(app.Query(question)) is None
+    result = asyncio.run(app.get_response_async(question))
+    assert result["source"] == "fallback"
+
+
+def test_stop_words_are_not_search_terms(bm25):
+    assert bm25.terms(["what", "is", "there", "hostel"]) == ["hostel"]
+    assert bm25.search(["what", "is", "there"]) == []
+
+
+def test_single_term_match_counts_one_term(bm25):
+    tokens = ["help"]
+    pos, score = bm25.search(tokens)[0]
+    assert bm25.confidence(tokens, score) > 0.95  # why confidence alone isn't enough
+    assert bm25.matched_terms(tokens, pos) == 1
+
+
+def test_paraphrase_is_answered_from_bm25(app):
+    faq = app.get_lexical_faq_match(app.Query("college anti ragging cell"))
+    assert faq is not None and faq["question"] == "Is there an anti-ragging cell?"
+
+
+def test_off_topic_question_skips_bm25(app):
+    # "help" matches an FAQ word, but the question never passes the keyword gate
+    result = asyncio.run(app.get_response_async("help me with my car insurance"))
+    assert result["source"] == "fallback"
+
+
+def test_unknown_words_lower_confidence(bm25):
+    tokens = normalize_text("fee for courses in canada").split()
+    pos, score = bm25.search(tokens)[0]
+    assert bm25.confidence(tokens, score) < 0.85
+
+
+def test_refresh_normalizes_only_changed_answers():
+    docs = [dict(doc, _id=i) for i, doc in enumerate(seed_faqs())]
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return normalize_text(text)
+
+    store = FaqStore.from_docs(docs, counting)
+    calls.clear()
+    changed = dict(docs[0], answer="The anti-ragging cell meets every Monday.")
+    new = store.with_changes({0: changed}, set(), counting)
+    assert calls == [changed["answer"]]
+    assert new.a_norms[0] == normalize_text(changed["answer"])
+    assert new.a_norms[1:] == store.a_norms[1:]
+
+
+def test_snapshot_attaches_stored_bm25(tmp_path, monkeypatch):
+    docs = [dict(doc, _id=i) for i, doc in enumerate(seed_faqs())]
+    lexical = lambda store, **kw: Bm25Index(store, normalize_text, **kw)
+    built = FaqIndex(FaqStore.from_docs(docs, normalize_text), lexical=lexical)
+    path = str(tmp_path / "faq.snapshot")
+    save_snapshot(path, built, "test", None)
+
+    monkeypatch.setattr(Bm25Index, "_build", staticmethod(lambda *a: pytest.fail("BM25 rebuilt on load")))
+    loaded, _, _ = load_snapshot(path, "test", lexical)
+    tokens = normalize_text("college anti ragging cell").split()
+    assert loaded.lexical.search(tokens) == built.lexical.search(tokens)
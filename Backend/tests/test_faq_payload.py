@@ -0,0 +1,124 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+
+from faq_payload import GZIP_MIN_BYTES, CursorError, FaqPayloadCache, etag_matches
+from faq_store import FaqStore
+from normalize import normalize_text
+
+
+def faq(i, category="campus", **extra):
+    return dict(_id=i, question=f"Where is room {i}?", answer=f"Block {i}.", category=category, **extra)
+
+
+def store_of(docs):
+    return FaqStore.from_docs(docs, normalize_text)
+
+
+def page(cache, store, cursor=None, limit=None, category=None):
+    return json.loads(cache.render(store, category, cursor, limit).body)
+
+
+def questions(body):
+    return [f["question"] for f in body["faqs"]]
+
+
+def test_pages_cover_every_faq_once():
+    store = store_of([faq(i) for i in range(7)])
+    cache, seen, cursor = FaqPayloadCache(), [], None
+    while True:
+        body = page(cache, store, cursor, limit=3)
+        seen += questions(body)
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(store.questions)
+    assert body["total"] == 7
+
+
+def test_cursor_survives_a_refresh():
+    store = store_of([faq(i) for i in range(6)])
+    cache = FaqPayloadCache()
+    first = page(cache, store, limit=2)
+    assert first["next_cursor"] == "id:1"
+    refreshed = store.with_changes({9: faq(9)}, removed={0, 3}, normalize=normalize_text)
+    rest = page(cache, refreshed, first["next_cursor"])
+    assert questions(rest) == ["Where is room 2?", "Where is room 4?", "Where is room 5?", "Where is room 9?"]
+
+
+def test_cursor_of_a_deleted_faq_is_rejected():
+    store = store_of([faq(i) for i in range(4)])
+    cache = FaqPayloadCache()
+    cursor = page(cache, store, limit=2)["next_cursor"]
+    refreshed = store.with_changes({}, removed={1}, normalize=normalize_text)
+    with pytest.raises(CursorError, match="no longer valid"):
+        cache.render(refreshed, None, cursor, 2)
+
+
+@pytest.mark.parametrize("cursor", ["bogus", "pos:x:abc", "id", "offset:3"])
+def test_malformed_cursor(cursor):
+    store = store_of([faq(i) for i in range(3)])
+    with pytest.raises(CursorError):
+        FaqPayloadCache().render(store, None, cursor, 1)
+
+
+def test_rows_without_id_get_store_bound_cursors():
+    docs = [dict(faq(i), _id=None) for i in range(4)]
+    store = store_of(docs)
+    cache = FaqPayloadCache()
+    cursor = page(cache, store, limit=2)["next_cursor"]
+    assert cursor.startswith("pos:1:")
+    assert questions(page(cache, store, cursor, limit=2)) == ["Where is room 2?", "Where is room 3?"]
+    changed = store_of(docs[:3] + [dict(docs[3], question="Where is the gym?")])
+    with pytest.raises(CursorError):
+        cache.render(changed, None, cursor, 2)
+
+
+def test_category_filter_is_case_insensitive():
+    store = store_of([faq(0), faq(1, category="Admissions"), faq(2), faq(3, category="admissions")])
+    body = page(FaqPayloadCache(), store, category="ADMISSIONS", limit=1)
+    assert questions(body) == ["Where is room 1?"]
+    assert body["total"] == 2 and body["next_cursor"] == "id:1"
+
+
+def test_pages_are_reused_until_the_store_changes():
+    store = store_of([faq(i) for i in range(3)])
+    cache = FaqPayloadCache()
+    assert cache.lookup(store, None, None, None) is None
+    rendered = cache.render(store, None, None, None)
+    assert cache.lookup(store, None, None, None) is rendered
+    assert cache.lookup(store_of([faq(i) for i in range(3)]), None, None, None) is None
+
+
+def test_etag_is_a_content_hash_and_gzip_is_size_gated():
+    docs = [faq(i) for i in range(40)]
+    a = FaqPayloadCache().render(store_of(docs), None, None, None)
+    b = FaqPayloadCache().render(store_of(docs), None, None, None)  # another worker
+    assert a.etag == b.etag and len(a.body) >= GZIP_MIN_BYTES
+    assert gzip.decompress(a.gzipped) == a.body
+    assert FaqPayloadCache().render(store_of(docs[:1]), None, None, None).gzipped is None
+
+
+@pytest.mark.parametrize("header, match", [
+    ('W/"abc"', True), ('"abc"', True), ('"x", W/"abc"', True), ("*", True), ('"x"', False), (None, False),
+])
+def test_etag_matches(header, match):
+    assert etag_matches(header, 'W/"abc"') is match
+
+
+def test_faqs_endpoint(app):
+    async def run():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/faqs", params={"limit": 2})
+            again = await client.get("/faqs", params={"limit": 2}, headers={"If-None-Match": first.headers["etag"]})
+            bad = await client.get("/faqs", params={"cursor": "bogus"})
+            return first, again, bad
+
+    first, again, bad = asyncio.run(run())
+    assert first.status_code == 200 and first.json()["count"] == 2
+    assert again.status_code == 304
+    assert bad.status_code == 400
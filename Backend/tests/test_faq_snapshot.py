@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+import faq_snapshot
+from faq_bm25 import Bm25Index
+from faq_index import FaqIndex
+from faq_snapshot import MAGIC, load_snapshot, read_header, save_snapshot
+from faq_store import FaqStore
+from normalize import normalize_text
+
+from conftest import seed_faqs
+
+SYNC = datetime(2025, 3, 4, 5, 6, 7, 890000)
+
+
+def lexical(store, **kwargs):
+    return Bm25Index(store, normalize_text, **kwargs)
+
+
+def build(docs):
+    return FaqIndex(FaqStore.from_docs(docs, normalize_text), lexical=lexical)
+
+
+@pytest.fixture
+def docs():
+    return [dict(doc, _id=ObjectId()) for doc in seed_faqs()]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "faq_index.snapshot")
+
+
+def test_round_trip(docs, path):
+    built = build(docs)
+    save_snapshot(path, built, "src", SYNC, generation=4)
+    loaded, last_sync, generation = load_snapshot(path, "src", lexical)
+    assert (last_sync, generation) == (SYNC, 4)
+    a, b = built.store, loaded.store
+    assert list(b.ids) == list(a.ids) and all(isinstance(_id, ObjectId) for _id in b.ids)
+    for column in ("questions", "q_norms", "answers", "a_norms", "categories"):
+        assert list(getattr(b, column)) == list(getattr(a, column)), column
+    assert b.by_id == a.by_id
+    for doc in docs:
+        q = normalize_text(doc["question"])
+        assert loaded.best_match(q) == built.best_match(q)
+        assert loaded.lexical.search(q.split()) == built.lexical.search(q.split())
+
+
+def test_other_id_types_round_trip(path):
+    docs = [dict(question=f"Where is room {i}?", answer="Block A.", _id=_id)
+            for i, _id in enumerate(["slug-1", 7, None])]
+    save_snapshot(path, build(docs), "src", None)
+    loaded, last_sync, _ = load_snapshot(path, "src")
+    assert list(loaded.store.ids) == ["slug-1", 7, None]
+    assert last_sync is None and loaded.lexical is None
+
+
+def test_saving_an_attached_index_rewrites_the_same_bytes(docs, path, tmp_path):
+    save_snapshot(path, build(docs), "src", SYNC)
+    loaded, _, _ = load_snapshot(path, "src", lexical)
+    copy = str(tmp_path / "copy.snapshot")
+    save_snapshot(copy, loaded, "src", SYNC)
+    assert open(copy, "rb").read() == open(path, "rb").read()
+
+
+def test_payload_sections_are_aligned(docs, path):
+    save_snapshot(path, build(docs), "src", None)
+    with open(path, "rb") as f:
+        assert f.read(len(MAGIC)) == MAGIC
+        header_len = len(f.readline())
+    assert (len(MAGIC) + header_len) % 8 == 0
+    assert all(offset % 8 == 0 for offset, _, _ in read_header(path)["sections"].values())
+
+
+def test_other_source_or_version_is_ignored(docs, path, monkeypatch):
+    save_snapshot(path, build(docs), "src", None)
+    assert load_snapshot(path, "other-db") is None
+    monkeypatch.setattr(faq_snapshot, "SNAPSHOT_VERSION", faq_snapshot.SNAPSHOT_VERSION + 1)
+    assert load_snapshot(path, "src") is None
+
+
+def test_corrupt_or_missing_snapshot_is_ignored(docs, path, tmp_path):
+    assert load_snapshot(str(tmp_path / "missing"), "src") is None
+    save_snapshot(path, build(docs), "src", None)
+    data = bytearray(open(path, "rb").read())
+    data[-3] ^= 0xFF
+    open(path, "wb").write(bytes(data))
+    assert load_snapshot(path, "src") is None
+    open(path, "wb").write(b"not a snapshot")
+    assert load_snapshot(path, "src") is None
+
+
+def test_stale_bm25_params_rebuild_the_lexical_index(docs, path, monkeypatch):
+    save_snapshot(path, build(docs), "src", None)
+    monkeypatch.setattr(faq_snapshot, "BM25_PARAMS", (9.0, 0.1, 1))
+    built, original = [], Bm25Index._build
+
+    def counting(store, normalize):
+        built.append(1)
+        return original(store, normalize)
+
+    monkeypatch.setattr(Bm25Index, "_build", staticmethod(counting))
+    loaded, _, _ = load_snapshot(path, "src", lexical)
+    assert built and loaded.lexical is not None
+
+
+def test_write_is_atomic(docs, path, tmp_path):
+    save_snapshot(path, build(docs), "src", None, generation=1)
+    header = read_header(path)
+    assert header["generation"] == 1 and header["count"] == len(docs)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["faq_index.snapshot"]  # no temp files left
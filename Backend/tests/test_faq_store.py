@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import AsyncCollectionAdapter, InMemoryCollection
+from faq_columns import StrColumn
+from faq_store import FaqStore
+from normalize import NORMALIZER_VERSION, normalize_text
+
+T0 = datetime(2025, 1, 1)
+T1 = T0 + timedelta(hours=1)
+
+
+def faq(i, question=None, answer=None, updated_at=T0, **extra):
+    return dict(_id=i, question=question or f"Where is room {i}?", answer=answer or f"Block {i}.",
+                category="campus", updated_at=updated_at, **extra)
+
+
+class Counting:
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, text):
+        self.seen.append(text)
+        return normalize_text(text)
+
+
+def test_with_changes_replaces_drops_and_appends():
+    store = FaqStore.from_docs([faq(i) for i in range(5)], normalize_text)
+    new = store.with_changes({1: faq(1, answer="Block 1, first floor.", updated_at=T1), 7: faq(7, updated_at=T1)},
+                             removed={2}, normalize=normalize_text)
+    assert list(new.ids) == [0, 1, 3, 4, 7]
+    assert new.answers[1] == "Block 1, first floor."
+    assert new.by_id == {0: 0, 1: 1, 3: 2, 4: 3, 7: 4}
+    assert new.last_sync == T1
+    assert len(store) == 5 and store.answers[1] == "Block 1."  # the old store is untouched
+
+
+def test_with_changes_normalizes_only_what_changed():
+    normalize = Counting()
+    store = FaqStore.from_docs([faq(i) for i in range(5)], normalize)
+    normalize.seen.clear()
+    new = store.with_changes({3: faq(3, question="Where is the new lab?"), 9: faq(9)}, set(), normalize)
+    assert sorted(normalize.seen) == sorted(["Where is the new lab?", "Where is room 9?", "Block 9."])
+    # unchanged rows keep their string objects
+    assert new.q_norms[0] is store.q_norms[0] and new.answers[4] is store.answers[4]
+
+
+def test_answer_only_change_keeps_the_normalized_question():
+    normalize = Counting()
+    store = FaqStore.from_docs([faq(0)], normalize)
+    normalize.seen.clear()
+    new = store.with_changes({0: faq(0, answer="Moved to block 2.")}, set(), normalize)
+    assert normalize.seen == ["Moved to block 2."]
+    assert new.q_norms[0] == store.q_norms[0]
+
+
+def test_current_stored_q_norm_is_used_as_is():
+    normalize = Counting()
+    docs = [faq(0, q_norm="stored form", q_norm_v=NORMALIZER_VERSION),
+            faq(1, q_norm="stale form", q_norm_v=NORMALIZER_VERSION - 1)]
+    store = FaqStore.from_docs(docs, normalize)
+    assert store.q_norms == ["stored form", normalize_text("Where is room 1?")]
+    assert docs[0]["question"] not in normalize.seen
+
+
+def test_same_compares_question_answer_and_category():
+    store = FaqStore.from_docs([faq(0)], normalize_text)
+    assert store.same(faq(0, updated_at=T1))
+    assert not store.same(faq(0, answer="Elsewhere."))
+    assert not store.same(dict(faq(0), category="admissions"))
+    assert not store.same(faq(5))
+
+
+def test_with_changes_on_packed_columns():
+    # a store attached to a snapshot holds packed columns; the refreshed one holds lists again
+    base = FaqStore.from_docs([faq(i) for i in range(3)], normalize_text)
+    packed = FaqStore(list(base.ids), StrColumn.pack(base.questions), base.q_norms, StrColumn.pack(base.answers),
+                      StrColumn.pack(base.categories), base.last_sync, StrColumn.pack(base.a_norms))
+    new = packed.with_changes({1: faq(1, answer="Gone.")}, {0}, normalize_text)
+    assert new.answers == ["Gone.", "Block 2."] and new.categories == ["campus", "campus"]
+    assert new.a_norms[1] == normalize_text("Block 2.")
+
+
+@pytest.fixture
+def faqs_coll(app, monkeypatch):
+    coll = InMemoryCollection([faq(i) for i in range(5)])
+    monkeypatch.setattr(app.mongo, "aio", lambda name: AsyncCollectionAdapter(coll, offload=False))
+    return coll
+
+
+def test_refresh_applies_only_the_diff(app, faqs_coll):
+    current = app.build_faq_index(FaqStore.from_docs(faqs_coll.find(), normalize_text))
+    assert asyncio.run(app.build_refreshed_faq_index(current, T0)) is None
+
+    faqs_coll.update_one({"_id": 1}, {"$set": {"answer": "Block 1, first floor.", "updated_at": T1}})
+    faqs_coll.update_one({"_id": 3}, {"$set": {"updated_at": T1}})  # touched, not changed
+    faqs_coll.delete_one({"_id": 2})
+    faqs_coll.insert_one({"_id": 8, "question": "Is there a canteen?", "answer": "Yes."})  # no updated_at
+    new = asyncio.run(app.build_refreshed_faq_index(current, T0))
+    assert list(new.store.ids) == [0, 1, 3, 4, 8]
+    assert new.store.answers[1] == "Block 1, first floor."
+    assert new.store.q_norms[2] is current.store.q_norms[3]
+    assert new.best_match(normalize_text("is there a canteen"))[0] == 4
@@ -0,0 +1,117 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from pymongo import errors
+
+import import_data
+from db import InMemoryCollection
+from normalize import NORMALIZER_VERSION, normalize_text
+
+
+class BulkCollection(InMemoryCollection):
+    """InMemoryCollection with an unordered bulk_write that can fail on purpose."""
+
+    def __init__(self, docs=None, failing_keys=(), fail_times=1, outages=0):
+        super().__init__(docs)
+        self.failing_keys = set(failing_keys)  # ops on these keys fail with a write error...
+        self.fail_times = fail_times           # ...this many times each
+        self.outages = outages                 # whole calls that fail before writing anything
+        self.calls = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.calls.append(len(ops))
+        if self.outages:
+            self.outages -= 1
+            raise errors.AutoReconnect("connection reset")
+        upserted = modified = 0
+        write_errors = []
+        for i, op in enumerate(ops):
+            key = next(iter(op._filter.values()))
+            if key in self.failing_keys and self.fail_times:
+                write_errors.append({"index": i, "code": 11000, "errmsg": f"E11000 duplicate key {key}"})
+                continue
+            if self.find_one(op._filter) is None:
+                upserted += 1
+            else:
+                modified += 1
+            self.update_one(op._filter, op._doc, upsert=op._upsert)
+        if write_errors:
+            self.fail_times -= 1
+            raise errors.BulkWriteError({"nUpserted": upserted, "nModified": modified, "writeErrors": write_errors})
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+
+def stats():
+    return {"upserted": 0, "modified": 0, "failed": 0, "round_trips": 0}
+
+
+def ops_for(keys):
+    return [import_data.UpdateOne({"k": k}, {"$set": {"k": k}}, upsert=True) for k in keys]
+
+
+KEYS = [f"key-{i}" for i in range(16)]
+
+
+def test_only_failed_ops_are_retried():
+    coll = BulkCollection(failing_keys={"key-3", "key-11"})
+    s = stats()
+    import_data.write_bisect(coll, ops_for(KEYS), KEYS, s)
+    assert coll.calls == [16, 2]
+    assert s == {"upserted": 16, "modified": 0, "failed": 0, "round_trips": 2}
+    assert sorted(d["k"] for d in coll.docs) == sorted(KEYS)
+
+
+def test_ops_failing_again_are_counted_once(capsys):
+    coll = BulkCollection(failing_keys={"key-3"}, fail_times=2)
+    s = stats()
+    import_data.write_bisect(coll, ops_for(KEYS), KEYS, s)
+    assert coll.calls == [16, 1]
+    assert s == {"upserted": 15, "modified": 0, "failed": 1, "round_trips": 2}
+    assert "key-3" in capsys.readouterr().out
+
+
+def test_whole_call_failure_is_bisected():
+    coll = BulkCollection(outages=1)
+    s = stats()
+    import_data.write_bisect(coll, ops_for(KEYS), KEYS, s)
+    assert coll.calls == [16, 8, 8]
+    assert s["upserted"] == 16 and s["failed"] == 0 and s["round_trips"] == 3
+
+
+def test_single_op_outage_is_a_failure():
+    coll = BulkCollection(outages=5)
+    s = stats()
+    import_data.write_bisect(coll, ops_for(KEYS[:2]), KEYS[:2], s)
+    assert coll.calls == [2, 1, 1]
+    assert s["failed"] == 2 and s["upserted"] == 0
+
+
+@pytest.fixture
+def faq_file(tmp_path):
+    path = tmp_path / "faqs.jsonl"
+    rows = [{"question": f"Where is room {i}?", "answer": f"Block {i}.", "category": "campus"} for i in range(5)]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_reimport_writes_only_changes(faq_file):
+    db = {"faqs": BulkCollection()}
+    first = import_data.import_files(db, "faqs", [faq_file], chunk_size=2)
+    assert first["upserted"] == 5 and first["failed"] == 0
+    assert all(d["q_norm_v"] == NORMALIZER_VERSION and d["content_hash"] for d in db["faqs"].docs)
+
+    calls = len(db["faqs"].calls)
+    again = import_data.import_files(db, "faqs", [faq_file], chunk_size=2)
+    assert again["unchanged"] == 5 and again["changed"] == 0
+    assert len(db["faqs"].calls) == calls  # nothing to write
+
+
+def test_legacy_docs_get_hash_and_normalizer_stamp_without_new_updated_at(faq_file):
+    legacy = {"q_norm": normalize_text("Where is room 0?"), "question": "Where is room 0?", "answer": "Block 0.",
+              "category": "campus", "tags": [], "updated_at": "old"}
+    db = {"faqs": BulkCollection([legacy])}
+    s = import_data.import_files(db, "faqs", [faq_file])
+    assert s["unchanged"] == 1 and s["changed"] == 4
+    assert legacy["q_norm_v"] == NORMALIZER_VERSION and legacy["content_hash"]
+    assert legacy["updated_at"] == "old"
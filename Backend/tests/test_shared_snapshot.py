@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from faq_columns import IdColumn, StrColumn
+from faq_index import FaqIndex
+from faq_snapshot import LeaderLock, load_rules, load_snapshot, read_header, save_rules, save_snapshot
+from faq_store import FaqStore
+from normalize import normalize_text
+
+from conftest import seed_faqs
+
+pytestmark = pytest.mark.skipif(not LeaderLock.supported(), reason="shared mode needs flock")
+
+
+@pytest.fixture
+def shared(app, tmp_path, monkeypatch):
+    """main wired to a snapshot under tmp_path; its FAQ globals are restored afterwards."""
+    path = str(tmp_path / "faq_index.snapshot")
+    for name in ("faq_index", "faqs_cache", "faqs_last_sync", "faq_generation", "faq_role"):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    monkeypatch.setattr(app, "FAQ_SNAPSHOT_PATH", path)
+    monkeypatch.setattr(app, "FAQ_RULES_PATH", path + ".rules")
+    monkeypatch.setattr(app, "faq_leader_lock", LeaderLock(path + ".lock"))
+    return path
+
+
+def index_of(n):
+    docs = [dict(doc, _id=ObjectId()) for doc in seed_faqs()[:n]]
+    return FaqIndex(FaqStore.from_docs(docs, normalize_text))
+
+
+def test_leader_lock_is_exclusive(tmp_path):
+    lock_path = str(tmp_path / "lock")
+    leader, other = LeaderLock(lock_path), LeaderLock(lock_path)
+    assert leader.try_acquire() and leader.try_acquire()  # re-entrant for its holder
+    assert not other.try_acquire()
+
+
+def test_each_write_bumps_the_generation(app, shared):
+    save_snapshot(shared, index_of(3), app._snapshot_source(), None, generation=7)  # written by an earlier leader
+    app.save_faq_snapshot(index_of(4), None)
+    assert read_header(shared)["generation"] == 8 and app.faq_generation == 8
+    app.save_faq_snapshot(index_of(5), None)
+    assert read_header(shared)["generation"] == 9
+
+
+def test_follower_attaches_only_when_the_generation_moves(app, shared):
+    assert LeaderLock(shared + ".lock").try_acquire()  # another worker leads
+    app.faq_role, app.faq_generation = "follower", 0
+    save_snapshot(shared, index_of(3), app._snapshot_source(), None, generation=1)
+
+    asyncio.run(app.follow_shared_snapshot_async())
+    attached = app.faq_index
+    assert len(attached) == 3 and app.faq_generation == 1 and app.faqs_cache is attached.store
+
+    asyncio.run(app.follow_shared_snapshot_async())
+    assert app.faq_index is attached  # same generation: nothing reloaded
+
+    save_snapshot(shared, index_of(5), app._snapshot_source(), None, generation=2)
+    asyncio.run(app.follow_shared_snapshot_async())
+    assert len(app.faq_index) == 5 and app.faq_generation == 2
+
+
+def test_follower_takes_over_when_the_leader_is_gone(app, shared, monkeypatch):
+    refreshed = []
+
+    async def refresh():
+        refreshed.append(True)
+
+    monkeypatch.setattr(app, "refresh_faqs_async", refresh)
+    app.faq_role = "follower"
+    asyncio.run(app.follow_shared_snapshot_async())
+    assert app.faq_role == "leader" and refreshed
+
+
+def test_follower_installs_the_leaders_rules(app, shared, monkeypatch):
+    for name in ("dept_matcher", "keyword_gate", "rules_mtime"):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    rules = {"departments": [], "keywords": {"_id": app.KEYWORDS_SETTING_ID, "keywords": ["zebra crossing"]}}
+    save_rules(app.FAQ_RULES_PATH, rules)
+    assert load_rules(app.FAQ_RULES_PATH) == rules
+
+    assert not app.is_college_related("is the zebra crossing painted")
+    asyncio.run(app.follow_shared_rules_async())
+    assert app.is_college_related("is the zebra crossing painted")
+    gate = app.keyword_gate
+    asyncio.run(app.follow_shared_rules_async())
+    assert app.keyword_gate is gate  # unchanged file: not reinstalled
+
+
+def test_attached_index_views_the_mapped_file(app, shared):
+    save_snapshot(shared, index_of(5), app._snapshot_source(), None)
+    index, _, _ = load_snapshot(shared, app._snapshot_source())
+    store = index.store
+    assert isinstance(store.answers, StrColumn) and isinstance(store.ids, IdColumn)
+    for arr in (index.postings.ids, index.postings.offsets, index.sorted_positions, store.answers.offsets):
+        assert not arr.flags.owndata and not arr.flags.writeable  # a view of the read-only mapping
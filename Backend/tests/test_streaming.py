@@ -0,0 +1,61 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+ALPHABET = "ab c\n\t*_#`>~.é  **"
+
+
+def chunks_of(text, rng):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 6)))) if len(text) > 1 else []
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+def streamed(app, pieces):
+    cleaner = app.StreamingTextCleaner()
+    return "".join(cleaner.feed(p) for p in pieces)
+
+
+@pytest.mark.parametrize("pieces", [
+    ["**Answer:**", " The library", " opens at 9."],
+    ["Hello ", "", "  ", "world"],
+    ["Hello", "**", "world"],
+    ["Hello", "* *", "world"],
+    ["  ", "\n", "leading"],
+    ["trailing", "  \n"],
+    ["", "", ""],
+    ["line one\n\n", "## Heading\n", "- item"],
+])
+def test_cleaner_matches_clean_ai_text(app, pieces):
+    assert streamed(app, pieces) == app.clean_ai_text("".join(pieces))
+
+
+def test_cleaner_matches_clean_ai_text_on_random_splits(app):
+    rng = random.Random(8)
+    for _ in range(3000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 24)))
+        pieces = chunks_of(text, rng)
+        assert streamed(app, pieces) == app.clean_ai_text(text), pieces
+
+
+def sse_events(body):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        yield event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def test_stream_chunks_add_up_to_the_cached_answer(app, ai_tier):
+    ai_tier.chunks, ai_tier.chunk_gap_secs = 5, 0.0
+    question = "how do i join the college photography club"
+
+    async def run():
+        return "".join([part async for part in app.stream_response_events(question)])
+
+    events = list(sse_events(asyncio.run(run())))
+    *chunks, (last, done) = events
+    assert last == "done" and done["source"] == "ai"
+    assert len(chunks) > 1 and all(event == "chunk" for event, _ in chunks)
+    streamed_text = "".join(data["text"] for _, data in chunks)
+    assert streamed_text == done["response"] == app.answer_cache.get_local(app.Query(question).norm)
+    assert "**" not in streamed_text
@@ -32,7 +32,7 @@ Write-Host "Activating virtual environment..." -ForegroundColor Cyan
 # Upgrade pip and install backend dependencies
 Write-Host "Installing backend dependencies..." -ForegroundColor Cyan
 pip install --upgrade pip
-pip install fastapi uvicorn pymongo python-dotenv certifi google-generativeai rapidfuzz
+pip install -r requirements.txt
 
 # Verify uvicorn path
 Write-Host "Checking uvicorn path..." -ForegroundColor DarkCyan